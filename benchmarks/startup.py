@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+# Add the parent directory to the path (for config.py and models)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Code timed in a fresh interpreter, so imports and first-time initialization are included
+STARTUP_SCRIPT = """
+import os, sys, time, json
+start_time = time.perf_counter()
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+sys.path.insert(0, {root!r})
+import config
+config.TRACK_CONFIG["CACHE_DIRECTORY"] = {cache_directory!r}
+from models.environment import Environment
+from models.vehicle import Vehicle
+imported = time.perf_counter()
+environment = Environment(headless=True)
+vehicle = Vehicle(environment)
+ready = time.perf_counter()
+environment.init_display()
+displayed = time.perf_counter()
+print(json.dumps({{"imports": imported - start_time, "environment_and_vehicle": ready - imported,
+                  "total_to_first_step": ready - start_time, "init_display": displayed - ready}}))
+"""
+
+def measure(cache_directory, repeats, clear_cache):
+    """
+    Time the startup of Environment and Vehicle in fresh interpreters.
+
+    Args:
+        cache_directory (str): Track cache directory used by the measured processes.
+        repeats (int): Number of processes to time.
+        clear_cache (bool): Empty the cache before each process (cold start).
+
+    Returns:
+        dict: Median seconds of each startup phase.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = STARTUP_SCRIPT.format(root=root, cache_directory=cache_directory)
+    samples = []
+    for _ in range(repeats):
+        if clear_cache:
+            for entry in os.listdir(cache_directory):
+                path = os.path.join(cache_directory, entry)
+                if os.path.isdir(path):
+                    for filename in os.listdir(path):
+                        os.remove(os.path.join(path, filename))
+                    os.rmdir(path)
+                else:
+                    os.remove(path)
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {phase: statistics.median(sample[phase] for sample in samples) for phase in samples[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of the simulator.")
+    parser.add_argument("--repeats", type=int, default=5, help="Processes timed per scenario")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_directory:
+        results = {
+            "cold": measure(cache_directory, args.repeats, clear_cache=True),  # Track compiled on startup
+            "warm": measure(cache_directory, args.repeats, clear_cache=False)  # Cached bundle loaded
+        }
+
+    for scenario, phases in results.items():
+        print(f"{scenario:>5}: " + " | ".join(f"{phase}: {seconds * 1000:.1f} ms" for phase, seconds in phases.items()))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+# Headless: the benchmarks never open a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+# Add the parent directory to the path (for config.py, models and machine_learning)
+PROJECT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIRECTORY)
+
+import numpy as np
+from config import QL_CONFIG, SESSION_CONFIG, VEHICLE_CONFIG
+
+# Version of the results file layout
+RESULTS_FORMAT_VERSION = 1
+
+# name -> setup function, see benchmark()
+BENCHMARKS = {}
+
+# Backend of the end-to-end benchmarks, the agent benchmarks override it
+DEFAULT_BACKEND = QL_CONFIG["Q_TABLE_BACKEND"]
+
+def benchmark(name):
+    """
+    Register a benchmark.
+
+    The decorated function prepares the benchmark and returns (run, ops): run() is
+    the timed code and performs ops operations per call.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+_environments = {}
+_scratch_directory = None
+
+def _temp_directory():
+    """Create a temporary directory, removed when the benchmarks exit."""
+    global _scratch_directory
+    if _scratch_directory is None:
+        _scratch_directory = tempfile.TemporaryDirectory(prefix="benchmarks_")
+    return tempfile.mkdtemp(dir=_scratch_directory.name)
+
+def _environment(circuit="circuit_2.png"):
+    """Get a shared headless environment of the given circuit."""
+    from models.environment import Environment
+    if circuit not in _environments:
+        _environments[circuit] = Environment(headless=True, circuit=circuit)
+    return _environments[circuit]
+
+def _agent(backend=None):
+    """Create a seeded agent whose Q-table lives in memory only (nothing is loaded or saved)."""
+    from models.vehicle import Vehicle
+    from machine_learning.q_learning.agent import QLearningAgent
+    # The agent reads its settings when it is created, the shared config is restored afterwards
+    saved_config = dict(QL_CONFIG)
+    QL_CONFIG.update(SEED=0, Q_TABLE_BACKEND=backend or DEFAULT_BACKEND)
+    try:
+        agent = QLearningAgent(6, 4, state_bounds=Vehicle.get_state_bounds())
+    finally:
+        QL_CONFIG.clear()
+        QL_CONFIG.update(saved_config)
+    agent.close()  # Stop the unused saving thread
+    return agent
+
+def _poses(vehicle, count, seed=0):
+    """
+    Record the poses, states and rewards of a seeded random drive.
+
+    Returns:
+        list: (previous_position, x, y, angle, speed, state, action, reward, next_state) per step.
+    """
+    rng = random.Random(seed)
+    poses = []
+    vehicle.reset()
+    while len(poses) < count:
+        state = vehicle.get_state()
+        action = rng.choices([0, 1, 2, 3], weights=[5, 2, 2, 1])[0]
+        vehicle.handle_agent_action(action)
+        reward = round(vehicle.calculate_reward(), 1)
+        poses.append((vehicle.previous_position, vehicle.x, vehicle.y, vehicle.angle, vehicle.speed,
+                      state, action, reward, vehicle.get_state()))
+        if vehicle.collided:
+            vehicle.reset()
+    vehicle.reset()
+    return poses
+
+@benchmark("sensor_update")
+def _sensor_update():
+    from models.vehicle import Vehicle
+    environment = _environment()
+    vehicle = Vehicle(environment)
+    poses = _poses(vehicle, 1000)
+
+    def run():
+        for _, x, y, angle, _, _, _, _, _ in poses:
+            vehicle.x, vehicle.y, vehicle.angle = x, y, angle
+            for sensor in vehicle.sensors:
+                sensor.update(environment)
+    return run, len(poses) * len(vehicle.sensors)
+
+@benchmark("vehicle_check_road_status")
+def _check_road_status():
+    from models.vehicle import Vehicle
+    vehicle = Vehicle(_environment())
+    poses = _poses(vehicle, 1000)
+
+    def run():
+        for _, x, y, angle, _, _, _, _, _ in poses:
+            vehicle.angle = angle
+            vehicle.check_road_status(x, y)
+    return run, len(poses)
+
+@benchmark("vehicle_check_checkpoint")
+def _check_checkpoint():
+    from models.vehicle import Vehicle
+    vehicle = Vehicle(_environment("circuit_1.png"))  # The circuit with checkpoint lines
+    poses = _poses(vehicle, 1000)
+
+    def run():
+        for previous_position, x, y, _, _, _, _, _, _ in poses:
+            vehicle.previous_position, vehicle.x, vehicle.y = previous_position, x, y
+            vehicle.next_checkpoint = 0
+            vehicle.check_checkpoint(0, {})
+    return run, len(poses)
+
+@benchmark("vehicle_get_state")
+def _get_state():
+    from models.vehicle import Vehicle
+    vehicle = Vehicle(_environment())
+    poses = _poses(vehicle, 100)
+
+    def run():
+        for _ in range(10):
+            for _, _, _, _, speed, _, _, _, _ in poses:
+                vehicle.speed = speed
+                vehicle.get_state()
+    return run, 10 * len(poses)
+
+def _agent_benchmarks(backend):
+    """Register the agent benchmarks of a Q-table backend."""
+    def transitions():
+        from models.vehicle import Vehicle
+        agent = _agent(backend)
+        poses = _poses(Vehicle(_environment()), 2000)
+        for _, _, _, _, _, state, action, reward, next_state in poses:
+            agent.update_q_value(state, action, reward, next_state)  # Realistic, partly filled table
+        return agent, poses
+
+    @benchmark(f"agent_get_action[{backend}]")
+    def _get_action():
+        agent, poses = transitions()
+        agent.exploration_rate = 0.1
+
+        def run():
+            for _, _, _, _, _, state, _, _, _ in poses:
+                agent.get_action(state)
+        return run, len(poses)
+
+    @benchmark(f"agent_update_q_value[{backend}]")
+    def _update_q_value():
+        agent, poses = transitions()
+
+        def run():
+            for _, _, _, _, _, state, action, reward, next_state in poses:
+                agent.update_q_value(state, action, reward, next_state)
+        return run, len(poses)
+
+for _backend in ("dict", "dense"):
+    _agent_benchmarks(_backend)
+
+@benchmark("agent_step")
+def _agent_step():
+    """One training step of the episode loop: act, simulate, reward, learn."""
+    from models.vehicle import Vehicle
+    vehicle = Vehicle(_environment())
+    agent = _agent()
+    steps = 1000
+
+    def run():
+        vehicle.reset()
+        state = vehicle.get_state()
+        for _ in range(steps):
+            action = agent.get_action(state)
+            next_state, reward, done = vehicle.step(action)
+            agent.update_q_value(state, action, round(reward, 1), next_state)
+            agent.decay_exploration()
+            state = next_state
+            if done:
+                vehicle.reset()
+                state = vehicle.get_state()
+    return run, steps
+
+def _episode_benchmarks(circuit):
+    """Register the end-to-end episode benchmark of a circuit."""
+    @benchmark(f"episode[{circuit}]")
+    def _episode():
+        from main import run_episode
+        from models.vehicle import Vehicle
+        environment = _environment(circuit)
+        vehicle = Vehicle(environment)
+        episodes = 5
+
+        def run():
+            agent = _agent()  # Fresh Q-table and exploration rate, so every round replays the same episodes
+            for _ in range(episodes):
+                vehicle.reset()
+                run_episode(environment, vehicle, agent, manual_control=False, render=False)
+        return run, episodes
+
+for _circuit in ("circuit_1.png", "circuit_2.png", "circuit_3.png"):
+    _episode_benchmarks(_circuit)
+
+def _q_table_benchmarks(backend, num_states):
+    """Register the save and load benchmarks of a Q-table of the given size."""
+    from machine_learning.q_learning.persistence import QTableStore
+
+    def filled_agent(directory):
+        agent = _agent(backend)
+        agent.q_table_store = QTableStore(directory, "bench")
+        rng = np.random.default_rng(0)
+        bounds = np.array(agent_bounds())
+        states = np.column_stack([rng.integers(low, high + 1, size=num_states) for low, high in bounds])
+        # Sensors are either all positive (on road) or all negative
+        states[:, 1:] = np.abs(states[:, 1:]) * np.where(rng.random(num_states) < 0.5, 1, -1)[:, None]
+        for state in map(tuple, states.tolist()):
+            agent.q_table.visit(state)[:] = rng.random(4)
+        return agent
+
+    def agent_bounds():
+        from models.vehicle import Vehicle
+        return Vehicle.get_state_bounds()
+
+    @benchmark(f"q_table_save_full[{backend},{num_states}]")
+    def _save():
+        agent = filled_agent(_temp_directory())
+
+        def run():
+            agent.save(full=True)
+            agent.q_table_store.flush()
+        return run, 1
+
+    @benchmark(f"q_table_load[{backend},{num_states}]")
+    def _load():
+        directory = _temp_directory()
+        agent = filled_agent(directory)
+        agent.save(full=True)
+        agent.q_table_store.close()
+
+        def run():
+            loader = _agent(backend)
+            loader.q_table_store = QTableStore(directory, "bench")
+            loader.load()
+            loader.q_table_store.close()
+        return run, 1
+
+for _backend in ("dict", "dense"):
+    for _num_states in (1000, 10000, 100000):
+        _q_table_benchmarks(_backend, _num_states)
+
+def measure(run, ops, repeats, min_time):
+    """
+    Time a benchmark.
+
+    The run is called in rounds until a round lasts min_time seconds, then repeats more rounds are timed.
+
+    Returns:
+        dict: Seconds per operation (best and median of the rounds) and operations per second.
+    """
+    run()  # Warm up caches and lazy initialization
+    calls = 1
+    while True:
+        start_time = time.perf_counter()
+        for _ in range(calls):
+            run()
+        elapsed = time.perf_counter() - start_time
+        if elapsed >= min_time or calls >= 1 << 20:
+            break
+        calls *= 2
+    samples = [elapsed / (calls * ops)]
+    for _ in range(repeats - 1):
+        start_time = time.perf_counter()
+        for _ in range(calls):
+            run()
+        samples.append((time.perf_counter() - start_time) / (calls * ops))
+    best = min(samples)
+    return {"seconds_per_op": best, "median_seconds_per_op": statistics.median(samples),
+            "ops_per_sec": 1 / best, "rounds": len(samples), "calls_per_round": calls, "ops_per_call": ops}
+
+def _machine_info():
+    """Describe the machine and the code the results were measured on."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIRECTORY,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "kernel_backend": VEHICLE_CONFIG["KERNEL_BACKEND"],
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+
+def run_benchmarks(args):
+    """Run the selected benchmarks and write the results as JSON."""
+    import pygame
+    output = os.path.abspath(args.output) if args.output else None
+    os.chdir(PROJECT_DIRECTORY)  # The agent resolves its Q-table directory from the working directory
+    names = [name for name in BENCHMARKS if not args.filter or any(f in name for f in args.filter)]
+    if not names:
+        sys.exit(f"No benchmark matches {args.filter}")
+    SESSION_CONFIG["TRAINING_MODE"] = True
+    if args.kernels:
+        VEHICLE_CONFIG["KERNEL_BACKEND"] = args.kernels  # Read by every Vehicle the benchmarks create
+
+    results = {}
+    for name in names:
+        run, ops = BENCHMARKS[name]()
+        results[name] = measure(run, ops, args.repeats, args.min_time)
+        result = results[name]
+        print(f"{name:<40} {result['seconds_per_op'] * 1e6:12.2f} us/op {result['ops_per_sec']:14.1f} ops/s")
+    pygame.quit()
+
+    if output:
+        with open(output, "w") as f:
+            json.dump({"format_version": RESULTS_FORMAT_VERSION, "machine": _machine_info(), "results": results}, f, indent=2)
+        print(f"Results written to {output}")
+
+def compare_results(args):
+    """Compare two results files and exit with an error if a benchmark regressed beyond the threshold."""
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)["results"]
+    with open(args.current, "r") as f:
+        current = json.load(f)["results"]
+
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline us/op':>15} {'current us/op':>15} {'change':>9}")
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            print(f"{name:<40} {'only in ' + ('current' if name in current else 'baseline'):>41}")
+            continue
+        before, after = baseline[name]["seconds_per_op"], current[name]["seconds_per_op"]
+        change = after / before - 1
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -args.threshold:
+            flag = "  faster"
+        print(f"{name:<40} {before * 1e6:15.2f} {after * 1e6:15.2f} {change:+9.1%}{flag}")
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"No regression beyond {args.threshold:.0%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the simulator and agent hot paths.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("-o", "--output", help="Write the results to this JSON file")
+    run_parser.add_argument("-k", "--filter", action="append", help="Only run benchmarks whose name contains this text (repeatable)")
+    run_parser.add_argument("--repeats", type=int, default=5, help="Timed rounds per benchmark")
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="Minimum duration of a round in seconds")
+    run_parser.add_argument("--kernels", choices=["auto", "numba", "python"], help="Road/sensor kernel backend (default: config.py)")
+    run_parser.set_defaults(handler=run_benchmarks)
+
+    list_parser = subparsers.add_parser("list", help="List the benchmarks")
+    list_parser.set_defaults(handler=lambda args: print("\n".join(BENCHMARKS)))
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two results files")
+    compare_parser.add_argument("baseline", help="Results of the reference version")
+    compare_parser.add_argument("current", help="Results of the version to check")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown reported as a regression (default 0.10)")
+    compare_parser.set_defaults(handler=compare_results)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 # Session parameters
 SESSION_CONFIG = {
     "TRAINING_MODE": True,    # Toggle between training and evaluation modes
+    "AGENT": "q_learning",    # "q_learning" (tabular, see QL_CONFIG) or "dqn" (NumPy deep Q-network, see DQN_CONFIG)
     "NUM_EPISODES": 50,       # Number of episodes to run
-    "EPISODE_DURATION": 20,   # Duration of each episode in seconds
+    "EPISODE_STEPS": 1200,    # Simulation steps per episode (20 seconds at 60 FPS)
+    "FPS": 60,                # Frame rate limit while rendering
+    "HEADLESS": False,        # Run without a window and without frame rate limit
+    "RENDER_EVERY": 1,        # Render every Nth episode (0 = never), ignored when headless
+    "RECORD_TRAJECTORIES": False,  # Save the agent's actions and rewards to logs/trajectories for replay
+    "LOG_FLUSH_INTERVAL": 10,  # Seconds between writes of the buffered episode metrics
     "MANUAL_CONTROL": False   # Enable manual control with arrow keys
 }
 
@@ -11,9 +17,72 @@ QL_CONFIG = {
     "LEARNING_RATE": 0.1,  # Alpha: learning rate for Q-learning updates
     "DISCOUNT_FACTOR": 0.95,  # Gamma: how much to discount future rewards
     "EXPLORATION_RATE": 1.0,  # Epsilon: initial exploration rate
-    "EXPLORATION_DECAY": 0.995,  # How fast to decay epsilon over episodes
+    "EXPLORATION_DECAY": 0.995,  # Exponential schedule: factor applied to epsilon every unit (minimum after ~600 episodes)
     "MIN_EXPLORATION_RATE": 0.05,  # Minimum exploration rate (to always explore a little)
-    "Q_TABLE_FILENAME": "v1.pkl"  # Agent 'knowledge' filename
+    "EXPLORATION_SCHEDULE": "exponential",  # "exponential", "linear", "cosine" or "adaptive" (driven by the scores)
+    # Legacy setting: EXPLORATION_DECAY 0.995 with EXPLORATION_UNIT "step", epsilon reached its minimum within the first episode
+    "EXPLORATION_UNIT": "episode",  # What advances the schedule: "step" (every learning step) or "episode"
+    "EXPLORATION_HORIZON": 600,  # Linear and cosine schedules: units to reach MIN_EXPLORATION_RATE
+    "ADAPTIVE_WINDOW": 20,  # Adaptive schedule: episodes per evaluation of the mean score
+    "ADAPTIVE_FACTOR": 0.7,  # Adaptive schedule: epsilon factor when the mean score improved (divided when it did not)
+    "Q_TABLE_BACKEND": "dict",  # "dict" (sparse, grows with visited states) or "dense" (flat float32 array)
+    "Q_TABLE_FILENAME": "v1",  # Agent 'knowledge' base filename (v1.json, v1.<n>.npy and v1.journal)
+    "SAVE_INTERVAL": 10,  # Episodes between Q-table saves (only the changed rows are written)
+    "REPLAY_CAPACITY": 0,  # Transitions kept for experience replay (0 = learn online from every transition)
+    "REPLAY_BATCH_SIZE": 256,  # Transitions per sampled minibatch
+    "REPLAY_INTERVAL": 16,  # Transitions between replay updates
+    "REPLAY_BATCHES": 4,  # Minibatches applied by each replay update
+    "TRACE_LAMBDA": 0.0,  # Lambda of Watkins Q(lambda) eligibility traces (0 = one-step Q-learning)
+    "TRACE_THRESHOLD": 0.01,  # Eligibility traces below this value are dropped
+    "MAX_TRACES": 256,  # Maximum number of traced state-actions per vehicle (bounds the cost of a step)
+    "SEED": None  # Seed of the exploration random generator (None = different every run)
+}
+
+# Deep Q-network agent parameters (raw sensor inputs, NumPy on the CPU)
+DQN_CONFIG = {
+    "HIDDEN_SIZES": (64, 64),  # Units of each hidden layer
+    "LEARNING_RATE": 0.001,  # Adam step size
+    "DISCOUNT_FACTOR": 0.99,  # Gamma: how much to discount future rewards
+    "EXPLORATION_RATE": 1.0,  # Epsilon: initial exploration rate
+    "EXPLORATION_DECAY": 0.9995,  # Exponential schedule: factor applied to epsilon every unit
+    "MIN_EXPLORATION_RATE": 0.05,  # Minimum exploration rate
+    "EXPLORATION_SCHEDULE": "exponential",  # "exponential", "linear", "cosine" or "adaptive" (see QL_CONFIG)
+    "EXPLORATION_UNIT": "step",  # What advances the schedule: "step" or "episode"
+    "EXPLORATION_HORIZON": 50000,  # Linear and cosine schedules: units to reach MIN_EXPLORATION_RATE
+    "ADAPTIVE_WINDOW": 20,  # Adaptive schedule: episodes per evaluation of the mean score
+    "ADAPTIVE_FACTOR": 0.7,  # Adaptive schedule: epsilon factor when the mean score improved
+    "REPLAY_CAPACITY": 100000,  # Transitions kept in the replay buffer
+    "BATCH_SIZE": 64,  # Transitions per training minibatch
+    "LEARNING_STARTS": 1000,  # Transitions collected before training starts
+    "TRAIN_INTERVAL": 4,  # Transitions between training minibatches
+    "TARGET_UPDATE_INTERVAL": 1000,  # Transitions between copies of the network to the target network
+    "MODEL_FILENAME": "v1",  # Network weights filename (machine_learning/dqn/models/v1.npz)
+    "SAVE_INTERVAL": 10,  # Episodes between saves
+    "SEED": None  # Seed of the weights, exploration and replay sampling (None = different every run)
+}
+
+# Parallel training parameters (actor-learner)
+PARALLEL_CONFIG = {
+    "ENABLED": False,          # Train with rollout worker processes (training mode only)
+    "NUM_WORKERS": 4,          # Number of rollout worker processes
+    "VEHICLES_PER_WORKER": 8,  # Vehicles simulated together by each worker
+    "BATCH_SIZE": 1024,        # Transitions per batch sent from a worker to the learner
+    "SYNC_INTERVAL": 10000,    # Transitions learned between policy broadcasts to the workers
+    "REPORT_INTERVAL": 5       # Seconds between steps/sec reports
+}
+
+# Profiling of the episode loop (single-process runs of main.py)
+PROFILING_CONFIG = {
+    "PHASE_TIMING": False,             # Time each phase of the episode loop and print a summary per episode
+    "PROFILE_EPISODES": None,          # (first, last) episodes to run under cProfile, None to disable
+    "PROFILE_DIRECTORY": "logs/profiles"  # Where the .pstats files are written
+}
+
+# Live training metrics served over HTTP in the Prometheus text format
+TELEMETRY_CONFIG = {
+    "ENABLED": False,     # Serve GET /metrics while main.py runs
+    "HOST": "127.0.0.1",  # Interface to listen on (localhost only by default)
+    "PORT": 0             # 0 picks a free port (printed at startup), so several runs can share a node
 }
 
 # Vehicle parameters
@@ -26,7 +95,36 @@ VEHICLE_CONFIG = {
     "ACCELERATION": 0.2,
     "DESACCELERATION": 0.95,  # Natural deceleration
     "ROTATION_SPEED": 5,  # Rotation speed
-    "COLLISION_TYPE": "CIRCUIT" # "WINDOW" or "CIRCUIT"
+    "COLLISION_TYPE": "CIRCUIT", # "WINDOW" or "CIRCUIT"
+    "CHECKPOINT_REWARD": 10,  # Reward for crossing the next checkpoint line in driving order (0 = disabled)
+    "KERNEL_BACKEND": "auto"  # Road/sensor kernels: "auto" (Numba if installed), "numba" or "python"
+}
+
+# Sensor parameters
+SENSOR_CONFIG = {
+    "SENSORS": [(-90, 100), (-45, 150), (0, 200), (45, 150), (90, 100)],  # (Angle offset, length) of each sensor
+    "USE_DISTANCE_FIELD": True  # Skip along sensor rays with a cached distance-to-edge field
+}
+
+# State quantization of the tabular agent (speed and sensor readings to small integers)
+STATE_CONFIG = {
+    "SPEED_BINS": None,  # Ascending edges of the speed buckets (e.g. [1, 3, 5] gives 4 buckets), None = int(speed)
+    "SENSOR_BINS": "uniform",  # "uniform", "log" (finer near the walls) or a list of ascending edges (px) per sensor
+    "UNIFORM_BIN_WIDTH": 10,  # Width in px of the uniform sensor bins
+    "LOG_BINS": 6,  # Number of edges of the log-scale sensor bins, from LOG_MIN_DISTANCE to the sensor length
+    "LOG_MIN_DISTANCE": 5,  # First log-scale edge in px
+    "SENSOR_CLIP": None  # Readings beyond this distance (px) share the last bin, None = up to the sensor length
+}
+
+# Track data parameters
+TRACK_CONFIG = {
+    "CIRCUIT": "circuit_2.png",  # Circuit image in assets/images
+    "CIRCUITS": None,  # Circuits to train on, e.g. ["circuit_1.png", "circuit_2.png", "circuit_3.png"] (None = CIRCUIT only)
+    "CURRICULUM": "round_robin",  # Circuit of each episode: "round_robin", "weighted" or "performance" (lowest scores first)
+    "CURRICULUM_WEIGHTS": None,  # Weighted curriculum: relative weight of every circuit of CIRCUITS
+    "CURRICULUM_WINDOW": 20,  # Recent scores per circuit for the performance curriculum and the summary
+    "CURRICULUM_TEMPERATURE": 0.5,  # Performance curriculum: lower favors the weakest circuits more
+    "CACHE_DIRECTORY": "assets/cache"  # Precomputed track data, relative to the project root
 }
 
 # General window configuration
@@ -1,36 +1,196 @@
 import os
+import time
+import atexit
+import numpy as np
+from config import SESSION_CONFIG
+
+# Metrics file layout: a 16-byte header followed by one fixed-size little-endian record per episode
+METRICS_MAGIC = b"RLMETRIC"
+METRICS_FORMAT_VERSION = 1
+METRICS_HEADER_DTYPE = np.dtype([("magic", "S8"), ("version", "<u4"), ("record_size", "<u4")])
+METRICS_DTYPE = np.dtype([
+    ("episode", "<u4"),        # 1-based episode number
+    ("score", "<f8"),          # Final score of the episode
+    ("steps", "<u4"),          # Simulation steps of the episode (0 if unknown)
+    ("epsilon", "<f8"),        # Exploration rate at the end of the episode (NaN if unknown)
+    ("q_table_size", "<u8"),   # States in the Q-table at the end of the episode (0 if unknown)
+    ("wall_time", "<f8"),      # Seconds since the start of the session (NaN if unknown)
+    ("steps_per_sec", "<f8")   # Simulation steps per second of the episode (NaN if unknown)
+])
+
+# Bytes read per seek when looking for the last lines of a plain-text log
+TEXT_TAIL_BLOCK_SIZE = 4096
+
+# Bytes parsed at a time when loading a whole plain-text log
+TEXT_CHUNK_SIZE = 1 << 20
+
+def _is_metrics_file(path):
+    """Return True if the file starts with the metrics header, False for a plain-text score log."""
+    with open(path, "rb") as f:
+        return f.read(len(METRICS_MAGIC)) == METRICS_MAGIC
+
+def _count_records(f, path):
+    """
+    Validate the header of an open metrics file and count its complete records.
+
+    Raises:
+        ValueError: If the file was written with another format version or record layout.
+    """
+    header = np.frombuffer(f.read(METRICS_HEADER_DTYPE.itemsize), dtype=METRICS_HEADER_DTYPE)
+    if len(header) == 0 or header["magic"][0] != METRICS_MAGIC:
+        raise ValueError(f"{path} is not a metrics file.")
+    if header["version"][0] != METRICS_FORMAT_VERSION or header["record_size"][0] != METRICS_DTYPE.itemsize:
+        raise ValueError(f"Unsupported metrics format version {header['version'][0]} in {path}.")
+    size = f.seek(0, os.SEEK_END)
+    # A record cut by a crash is ignored
+    return (size - METRICS_HEADER_DTYPE.itemsize) // METRICS_DTYPE.itemsize
+
+def _text_tail_lines(path, last):
+    """Read the last `last` non-empty lines of a text file by seeking back from the end."""
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        data = b""
+        while position > 0 and data.count(b"\n") <= last:
+            step = min(TEXT_TAIL_BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = [line for line in data.decode().splitlines() if line.strip()]
+    return lines[-last:] if last else []
+
+def _text_scores(path):
+    """Parse a plain-text score log chunk by chunk into a float array."""
+    chunks = []
+    remainder = b""
+    with open(path, "rb") as f:
+        for data in iter(lambda: f.read(TEXT_CHUNK_SIZE), b""):
+            data = remainder + data
+            end = data.rfind(b"\n") + 1  # Complete lines only, the rest goes with the next chunk
+            remainder = data[end:]
+            chunks.append(np.array(data[:end].split(), dtype=np.float64))
+    chunks.append(np.array(remainder.split(), dtype=np.float64))
+    return np.concatenate(chunks)
+
+def _scores_to_records(scores, first_episode=1):
+    """Convert bare scores of a plain-text log to metrics records with the other fields unknown."""
+    records = np.zeros(len(scores), dtype=METRICS_DTYPE)
+    records["episode"] = np.arange(first_episode, first_episode + len(scores))
+    records["score"] = scores
+    for field in ("epsilon", "wall_time", "steps_per_sec"):
+        records[field] = np.nan
+    return records
+
+def read_metrics(path, last=None, start=0, memory_map=False):
+    """
+    Load episode metrics into a NumPy structured array (one column per METRICS_DTYPE field).
+
+    Both the binary metrics files written by Logger and the plain-text score logs of
+    earlier versions (one score per line) are read; for the latter only the episode and
+    score columns are known. A missing file reads as no episodes.
+
+    Args:
+        path (str): Path of the log file.
+        last (int): Only read the last `last` episodes. None reads everything. Only
+            metrics files read in O(last): the records have a fixed size, so the tail is
+            one seek away. Text logs store no episode numbers, so numbering their tail
+            still scans the whole file (counting newlines, only the tail is parsed).
+        start (int): Skip the first `start` episodes (e.g. the ones already read while
+            following a growing log).
+        memory_map (bool): Map a metrics file read-only instead of reading it, so columns
+            are only paged in when used. Text logs are always parsed.
+
+    Returns:
+        np.ndarray: Records with METRICS_DTYPE, in episode order.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=METRICS_DTYPE)
+    if not _is_metrics_file(path):
+        if last is None:
+            return _scores_to_records(_text_scores(path))[start:]
+        lines = _text_tail_lines(path, last)
+        with open(path, "rb") as f:
+            # The episode number of the tail needs the line count of the whole file (O(file size));
+            # counting newlines is cheap, the scores are only parsed for the tail
+            num_lines = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(TEXT_CHUNK_SIZE), b""))
+            f.seek(-1, os.SEEK_END)
+            num_lines += f.read(1) != b"\n"  # Last line without a newline
+        first_episode = num_lines - len(lines) + 1
+        records = _scores_to_records(np.array([float(line) for line in lines]), max(first_episode, 1))
+        return records[max(0, start - first_episode + 1):]
+    with open(path, "rb") as f:
+        count = _count_records(f, path)
+        first = start if last is None else max(start, count - last)
+        first = min(first, count)
+        offset = METRICS_HEADER_DTYPE.itemsize + first * METRICS_DTYPE.itemsize
+        if memory_map and count > first:
+            return np.memmap(path, dtype=METRICS_DTYPE, mode="r", offset=offset, shape=(count - first,))
+        f.seek(offset)
+        return np.fromfile(f, dtype=METRICS_DTYPE, count=count - first)
 
 class Logger:
-    def __init__(self, log_file="training_log.txt"):
+    def __init__(self, log_file="training_log.metrics", flush_interval=None):
         """
         Initialize the Logger with a specified log file.
 
+        Episodes are logged as fixed-size binary records (see METRICS_DTYPE). Records are
+        buffered in memory and appended to the file every `flush_interval` seconds and on
+        close(), which also runs at interpreter exit. The first time a metrics file is
+        created, the scores of a plain-text log with the same name (e.g. v1.txt for
+        v1.metrics) are imported so the history is kept.
+
         Args:
-            log_file (str): Name of the log file. Defaults to "training_log.txt".
+            log_file (str): Name of the log file, relative to the logs directory. Defaults to "training_log.metrics".
+            flush_interval (float): Seconds between writes. Defaults to SESSION_CONFIG["LOG_FLUSH_INTERVAL"].
         """
         self.log_directory = "logs"  # Define the base directory for logs
         self.log_file = os.path.join(self.log_directory, log_file)  # Construct the full path to the log file
+        self.flush_interval = SESSION_CONFIG["LOG_FLUSH_INTERVAL"] if flush_interval is None else flush_interval
 
         # Ensure the log directory exists
-        os.makedirs(self.log_directory, exist_ok=True)
+        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
 
-    def get_last_score(self):
+        self.num_episodes = self._open_log()
+        self._buffer = []  # Records not written yet
+        self._start_time = time.perf_counter()
+        self._last_flush = self._start_time
+        atexit.register(self.close)
+
+    def _open_log(self):
+        """Create or validate the metrics file and return the number of episodes it holds."""
+        if os.path.exists(self.log_file) and os.path.getsize(self.log_file) > 0:
+            with open(self.log_file, "r+b") as f:
+                count = _count_records(f, self.log_file)
+                f.truncate(METRICS_HEADER_DTYPE.itemsize + count * METRICS_DTYPE.itemsize)  # Drop a record cut by a crash
+            return count
+
+        header = np.array([(METRICS_MAGIC, METRICS_FORMAT_VERSION, METRICS_DTYPE.itemsize)], dtype=METRICS_HEADER_DTYPE)
+        text_log = os.path.splitext(self.log_file)[0] + ".txt"
+        records = read_metrics(text_log) if text_log != self.log_file else np.zeros(0, dtype=METRICS_DTYPE)
+        temp_path = f"{self.log_file}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            header.tofile(f)
+            records.tofile(f)
+        os.replace(temp_path, self.log_file)
+        if len(records):
+            print(f"Imported {len(records)} scores from {text_log}")
+        return len(records)
+
+    def log_episode(self, score, steps=0, epsilon=float("nan"), q_table_size=0, steps_per_sec=float("nan")):
         """
-        Read the last score from the log file.
+        Log the metrics of a finished episode.
 
-        Returns:
-            float: The last logged score. Returns 0.0 if the file is empty or doesn't exist.
+        Args:
+            score (float): Final score of the episode.
+            steps (int): Simulation steps of the episode.
+            epsilon (float): Exploration rate at the end of the episode.
+            q_table_size (int): Number of states in the Q-table.
+            steps_per_sec (float): Simulation throughput of the episode.
         """
-        try:
-            with open(self.log_file, "r") as log_file:
-                lines = log_file.readlines()
-                if lines:
-                    last_line = lines[-1]  # Get the last line
-                    last_score = float(last_line.strip())  # Convert the score to float
-                    return last_score
-        except FileNotFoundError:
-            return 0.0  # If the file doesn't exist, return 0.0
-        return 0.0  # If the file is empty, return 0.0
+        now = time.perf_counter()
+        self.num_episodes += 1
+        self._buffer.append((self.num_episodes, score, steps, epsilon, q_table_size, now - self._start_time, steps_per_sec))
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
 
     def log_score(self, score):
         """
@@ -39,5 +199,29 @@ class Logger:
         Args:
             score (float): The score to be logged.
         """
-        with open(self.log_file, "a") as log_file:
-            log_file.write(f"{score}\n")  # Write the score followed by a newline
\ No newline at end of file
+        self.log_episode(score)
+
+    def flush(self):
+        """Append the buffered episodes to the log file."""
+        self._last_flush = time.perf_counter()
+        if not self._buffer:
+            return
+        with open(self.log_file, "ab") as log_file:
+            np.array(self._buffer, dtype=METRICS_DTYPE).tofile(log_file)
+        self._buffer = []
+
+    def close(self):
+        """Write the buffered episodes (safe to call several times)."""
+        self.flush()
+
+    def get_last_score(self):
+        """
+        Read the last score from the log file.
+
+        Returns:
+            float: The last logged score. Returns 0.0 if the file is empty or doesn't exist.
+        """
+        if self._buffer:
+            return float(self._buffer[-1][1])
+        records = read_metrics(self.log_file, last=1)  # Seeks to the last record
+        return float(records["score"][0]) if len(records) else 0.0
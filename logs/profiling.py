@@ -0,0 +1,144 @@
+import os
+import time
+import cProfile
+import functools
+import numpy as np
+
+class PhaseTimer:
+    def __init__(self):
+        """
+        Time the phases of the episode loop.
+
+        The loop calls lap(phase) at the end of each phase: the time since the previous
+        lap is added to that phase. end_step() closes a simulation step, and
+        end_episode() prints the per-step statistics of every phase.
+
+        Timing is switched off by not creating a timer: the loop only checks
+        `if timer:` around each lap, so it costs next to nothing when disabled.
+        """
+        self._clock = time.perf_counter_ns
+        self._last = self._clock()
+        self._step = {}  # Phase -> nanoseconds in the current step
+        self._samples = {}  # Phase -> list of nanoseconds per step in the current episode
+        self._steps = 0
+
+    def instrument(self, obj, method_name, phase):
+        """
+        Make a method of an object end the given phase when it returns.
+
+        The wrapper is set on the instance only, other instances are not affected.
+
+        Args:
+            obj: Object whose method is timed (e.g. a Vehicle).
+            method_name (str): Name of the method.
+            phase (str): Phase the time up to the end of the call is added to.
+        """
+        method = getattr(obj, method_name)
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            result = method(*args, **kwargs)
+            self.lap(phase)
+            return result
+        setattr(obj, method_name, timed)
+
+    def start(self):
+        """Start timing from now (the time since the last lap is discarded)."""
+        self._last = self._clock()
+
+    def lap(self, phase):
+        """Add the time since the previous lap to the given phase."""
+        now = self._clock()
+        self._step[phase] = self._step.get(phase, 0) + now - self._last
+        self._last = now
+
+    def end_step(self):
+        """Close the current simulation step."""
+        for phase, elapsed in self._step.items():
+            samples = self._samples.get(phase)
+            if samples is None:
+                # A phase first seen late did not happen in the earlier steps
+                samples = self._samples[phase] = [0] * self._steps
+            samples.append(elapsed)
+        self._steps += 1
+        for phase, samples in self._samples.items():
+            if len(samples) < self._steps:
+                samples.append(0)
+        self._step = {}
+
+    def summary(self):
+        """
+        Get the statistics of the current episode.
+
+        Returns:
+            dict: Phase -> dict with "count" (steps where the phase ran), "total" (seconds)
+                and "p50", "p95", "p99" (seconds per step).
+        """
+        statistics = {}
+        for phase, samples in self._samples.items():
+            samples = np.array(samples, dtype=np.float64) / 1e9
+            ran = samples[samples > 0]
+            percentiles = np.percentile(ran, [50, 95, 99]) if len(ran) else np.zeros(3)
+            statistics[phase] = {"count": len(ran), "total": float(samples.sum()),
+                                 "p50": percentiles[0], "p95": percentiles[1], "p99": percentiles[2]}
+        return statistics
+
+    def end_episode(self, episode):
+        """
+        Print the phase statistics of the episode and start a new one.
+
+        Args:
+            episode (int): Episode number, for the printed header.
+        """
+        statistics = self.summary()
+        total = sum(phase["total"] for phase in statistics.values())
+        print(f"Episode {episode} phase timing: {self._steps} steps, {total * 1000:.1f} ms")
+        print(f"  {'phase':<14} {'count':>6} {'total ms':>9} {'share':>6} {'p50 us':>8} {'p95 us':>8} {'p99 us':>8}")
+        for phase, stats in sorted(statistics.items(), key=lambda item: -item[1]["total"]):
+            print(f"  {phase:<14} {stats['count']:>6} {stats['total'] * 1000:>9.1f} {stats['total'] / max(total, 1e-12):>6.1%} "
+                  f"{stats['p50'] * 1e6:>8.1f} {stats['p95'] * 1e6:>8.1f} {stats['p99'] * 1e6:>8.1f}")
+        self._samples = {}
+        self._step = {}
+        self._steps = 0
+
+class EpisodeProfiler:
+    def __init__(self, first_episode, last_episode, path):
+        """
+        Run cProfile over a range of episodes and save the statistics as a pstats file.
+
+        Read the file with `python -m pstats <path>` or snakeviz.
+
+        Args:
+            first_episode (int): First profiled episode (1-based, as printed by main.py).
+            last_episode (int): Last profiled episode (inclusive).
+            path (str): Path of the .pstats file.
+        """
+        if first_episode > last_episode:
+            raise ValueError(f"Invalid profiled episode range {first_episode}-{last_episode}.")
+        self.first_episode = first_episode
+        self.last_episode = last_episode
+        self.path = path
+        self._profile = None
+
+    def start_episode(self, episode):
+        """Start profiling if the episode is in the range."""
+        if self.first_episode <= episode <= self.last_episode:
+            if self._profile is None:
+                self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def end_episode(self, episode):
+        """Pause profiling, and save the statistics after the last episode of the range."""
+        if self._profile is not None and self.first_episode <= episode <= self.last_episode:
+            self._profile.disable()
+            if episode == self.last_episode:
+                self.close()
+
+    def close(self):
+        """Save the statistics collected so far (e.g. when the session ends early)."""
+        if self._profile is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._profile.dump_stats(self.path)
+        print(f"Profile of episodes {self.first_episode}-{self.last_episode} saved to {self.path}")
+        self._profile = None
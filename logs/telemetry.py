@@ -0,0 +1,115 @@
+import math
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Number of recent episodes averaged by the mean score metric
+MEAN_SCORE_EPISODES = 100
+
+# (name, type, help) of the published metrics, in output order
+METRICS = [
+    ("racing_episodes_total", "counter", "Episodes completed in this session."),
+    ("racing_steps_total", "counter", "Simulation steps completed in this session."),
+    ("racing_steps_per_second", "gauge", "Simulation steps per second of the last episode."),
+    ("racing_exploration_rate", "gauge", "Current exploration rate (epsilon)."),
+    ("racing_q_table_states", "gauge", "Number of states in the Q-table."),
+    ("racing_last_score", "gauge", "Score of the last completed episode."),
+    ("racing_mean_score", "gauge", f"Mean score of the last {MEAN_SCORE_EPISODES} episodes."),
+    ("racing_q_table_save_seconds", "gauge", "Duration of the last Q-table save.")
+]
+
+class TelemetryServer:
+    def __init__(self, host="127.0.0.1", port=0, labels=None):
+        """
+        Serve live training metrics over HTTP in the Prometheus text format (GET /metrics).
+
+        The server runs on a daemon thread. The training loop only calls record_episode(),
+        which updates a few numbers under a lock, so scrapes never slow the simulation.
+
+        Args:
+            host (str): Interface to listen on, localhost by default.
+            port (int): Port to listen on. 0 picks a free port, so several training
+                processes on one node can each serve their own metrics (see self.port).
+            labels (dict): Labels added to every metric (e.g. {"model": "v1"}).
+        """
+        self._values = {name: 0.0 for name, _, _ in METRICS}
+        self._values["racing_q_table_save_seconds"] = math.nan  # No save yet
+        self._recent_scores = deque(maxlen=MEAN_SCORE_EPISODES)
+        self._lock = threading.Lock()
+        self._labels = "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in (labels or {}).items()) + "}" if labels else ""
+
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are not worth a line on the console
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="TelemetryServer", daemon=True)
+        self._thread.start()
+
+    def record_episode(self, score, steps, exploration_rate, q_table_states, steps_per_sec, save_seconds=None):
+        """
+        Publish the metrics of a finished episode.
+
+        Args:
+            score (float): Final score of the episode.
+            steps (int): Simulation steps of the episode.
+            exploration_rate (float): Current epsilon.
+            q_table_states (int): Number of states in the Q-table.
+            steps_per_sec (float): Simulation throughput.
+            save_seconds (float): Duration of the last Q-table save, None if unchanged.
+        """
+        with self._lock:
+            self._recent_scores.append(score)
+            values = self._values
+            values["racing_episodes_total"] += 1
+            values["racing_steps_total"] += steps
+            values["racing_steps_per_second"] = steps_per_sec
+            values["racing_exploration_rate"] = exploration_rate
+            values["racing_q_table_states"] = q_table_states
+            values["racing_last_score"] = score
+            values["racing_mean_score"] = sum(self._recent_scores) / len(self._recent_scores)
+            if save_seconds is not None:
+                values["racing_q_table_save_seconds"] = save_seconds
+
+    def render(self):
+        """Return the current metrics in the Prometheus text format."""
+        with self._lock:
+            values = dict(self._values)
+        lines = []
+        for name, metric_type, description in METRICS:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"{name}{self._labels} {_format_value(values[name])}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+def _escape(value):
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_value(value):
+    """Format a sample value for the Prometheus text format."""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
@@ -0,0 +1,136 @@
+import os
+import json
+import numpy as np
+
+# Version of the trajectory file layout (2 added the circuit of every episode)
+TRAJECTORY_FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+
+# Rewards and scores always have one decimal, they are stored exactly as integer tenths
+REWARD_SCALE = 10
+
+class TrajectoryRecorder:
+    def __init__(self, path, metadata=None):
+        """
+        Record the episodes of a session into one compact .npz file.
+
+        For every episode the circuit and the start state of the vehicle are stored, followed by one
+        entry per step: the agent action (uint8), the reward (int16 tenths) and the
+        score after the step (int32 tenths). The physics is deterministic, so the
+        positions are not stored: replaying the actions through Vehicle rebuilds them
+        (see visualization/replay.py).
+
+        Args:
+            path (str): Path of the .npz file, written by close().
+            metadata (dict): JSON-serializable session information (circuit, configs...).
+        """
+        self.path = path
+        self.metadata = dict(metadata or {})
+        self.start_states = []  # (x, y, angle, speed, max_speed) of each episode
+        self.circuits = []  # Circuits driven, in order of first use
+        self.circuit_indices = []  # Index in self.circuits of the circuit of each episode
+        self.episode_lengths = []
+        self.actions = []  # One array per finished episode
+        self.rewards = []
+        self.scores = []
+        self._episode = None  # Per-step lists of the episode being recorded
+
+    def start_episode(self, vehicle):
+        """Record the start state of a new episode (call after vehicle.reset())."""
+        # max_speed is not restored by Vehicle.reset, so it is part of the start state
+        self.start_states.append((vehicle.x, vehicle.y, vehicle.angle, vehicle.speed, vehicle.max_speed))
+        circuit = vehicle.environment.circuit
+        if circuit not in self.circuits:
+            self.circuits.append(circuit)
+        self.circuit_indices.append(self.circuits.index(circuit))
+        self._episode = ([], [], [])
+
+    def record_step(self, action, reward, score):
+        """
+        Record one step of the current episode.
+
+        Args:
+            action (int): Action applied to the vehicle.
+            reward (float): Reward of the step.
+            score (float): Vehicle score after the step.
+        """
+        actions, rewards, scores = self._episode
+        actions.append(action)
+        rewards.append(reward)
+        scores.append(score)
+
+    def end_episode(self):
+        """Convert the current episode to typed arrays."""
+        actions, rewards, scores = self._episode
+        self.episode_lengths.append(len(actions))
+        self.actions.append(np.array(actions, dtype=np.uint8))
+        self.rewards.append(np.rint(np.array(rewards, dtype=np.float64) * REWARD_SCALE).astype(np.int16))
+        self.scores.append(np.rint(np.array(scores, dtype=np.float64) * REWARD_SCALE).astype(np.int32))
+        self._episode = None
+
+    def close(self):
+        """Write the recorded episodes (an unfinished episode is dropped)."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        metadata = dict(self.metadata, format_version=TRAJECTORY_FORMAT_VERSION, circuits=self.circuits)
+        num_episodes = len(self.episode_lengths)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                metadata=np.array(json.dumps(metadata)),
+                start_states=np.array(self.start_states[:num_episodes], dtype=np.float64).reshape(-1, 5),
+                circuit_indices=np.array(self.circuit_indices[:num_episodes], dtype=np.uint8),
+                episode_offsets=np.concatenate(([0], np.cumsum(self.episode_lengths, dtype=np.int64))),
+                actions=np.concatenate(self.actions) if self.actions else np.zeros(0, dtype=np.uint8),
+                rewards=np.concatenate(self.rewards) if self.rewards else np.zeros(0, dtype=np.int16),
+                scores=np.concatenate(self.scores) if self.scores else np.zeros(0, dtype=np.int32)
+            )
+        os.replace(temp_path, self.path)
+
+class TrajectoryLog:
+    def __init__(self, path):
+        """
+        Read a trajectory file written by TrajectoryRecorder.
+
+        Args:
+            path (str): Path of the .npz file.
+
+        Raises:
+            ValueError: If the file was written with an unsupported format version.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            self.metadata = json.loads(str(data["metadata"]))
+            if self.metadata.get("format_version") not in SUPPORTED_FORMAT_VERSIONS:
+                raise ValueError(f"Unsupported trajectory format version {self.metadata.get('format_version')} in {path}.")
+            self.start_states = data["start_states"]
+            if "circuit_indices" in data:
+                self.circuits = self.metadata["circuits"]
+                self.circuit_indices = data["circuit_indices"]
+            else:  # Version 1: every episode on the session circuit
+                self.circuits = [self.metadata.get("circuit")]
+                self.circuit_indices = np.zeros(len(self.start_states), dtype=np.uint8)
+            self.episode_offsets = data["episode_offsets"]
+            self.actions = data["actions"]
+            self.rewards = data["rewards"]
+            self.scores = data["scores"]
+
+    def __len__(self):
+        """Return the number of recorded episodes."""
+        return len(self.start_states)
+
+    def episode(self, index):
+        """
+        Get the recorded data of one episode.
+
+        Returns:
+            dict: "circuit", "start_state" (x, y, angle, speed, max_speed), "actions"
+                (uint8 array), "rewards" and "scores" (float arrays).
+        """
+        start, end = self.episode_offsets[index], self.episode_offsets[index + 1]
+        return {
+            "circuit": self.circuits[self.circuit_indices[index]],
+            "start_state": tuple(self.start_states[index].tolist()),
+            "actions": self.actions[start:end],
+            "rewards": self.rewards[start:end] / REWARD_SCALE,
+            "scores": self.scores[start:end] / REWARD_SCALE
+        }
@@ -0,0 +1,104 @@
+from abc import ABC, abstractmethod
+
+class Agent(ABC):
+    # Whether the agent takes the raw observation of the vehicle (Vehicle.get_observation)
+    # instead of the quantized state tuple (Vehicle.get_state)
+    RAW_STATE = False
+
+    # Exploration schedule (ExplorationScheduler), created by the subclasses
+    exploration = None
+
+    @property
+    def exploration_rate(self):
+        """Current exploration rate (epsilon)."""
+        return self.exploration.rate
+
+    @exploration_rate.setter
+    def exploration_rate(self, rate):
+        self.exploration.rate = rate
+
+    @abstractmethod
+    def get_action(self, state, use_epsilon=True):
+        """
+        Choose an action for the given state.
+
+        Args:
+            state: The current state (see RAW_STATE).
+            use_epsilon (bool): Whether to explore (learning mode) or always act greedily.
+
+        Returns:
+            int: The chosen action index.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def observe(self, state, action, reward, next_state, done, stream=0):
+        """
+        Learn from one transition.
+
+        Args:
+            state: The state before the action.
+            action (int): The action taken.
+            reward (float): The reward received.
+            next_state: The state after the action.
+            done (bool): Whether next_state is terminal (the vehicle collided).
+            stream: Key of the trajectory the transition belongs to, for agents that keep
+                per-trajectory state (eligibility traces); the others ignore it.
+        """
+        raise NotImplementedError
+
+    def decay_exploration(self):
+        """Advance the exploration schedule by one learning step."""
+        self.exploration.step()
+
+    def end_episode(self, score):
+        """
+        Called at the end of every training episode.
+
+        Args:
+            score (float): Final score of the episode (drives the adaptive exploration schedule).
+        """
+        self.exploration.end_episode(score)
+
+    @abstractmethod
+    def load(self):
+        """Load the saved model. Returns True if successful, False if no saved model exists."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, full=False):
+        """
+        Save the model.
+
+        Args:
+            full (bool): Write the whole model, for agents that can save incrementally.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Wait for pending saves and release the resources of the agent."""
+
+    def __len__(self):
+        """Return the size of the learned model (Q-table states, network parameters)."""
+        raise NotImplementedError
+
+def create_agent(kind, state_size, action_size, state_bounds=None):
+    """
+    Create the agent selected in the configuration.
+
+    Args:
+        kind (str): "q_learning" (tabular) or "dqn" (NumPy deep Q-network).
+        state_size (int): The number of variables in a state.
+        action_size (int): The number of possible actions.
+        state_bounds (list): (low, high) bounds of every quantized state variable (dense Q-table).
+
+    Returns:
+        Agent: The new agent.
+    """
+    if kind == "q_learning":
+        from machine_learning.q_learning.agent import QLearningAgent
+        return QLearningAgent(state_size, action_size, state_bounds)
+    if kind == "dqn":
+        from machine_learning.dqn.agent import DQNAgent
+        return DQNAgent(state_size, action_size)
+    raise ValueError(f"Unknown agent: {kind}")
@@ -0,0 +1,112 @@
+from collections import deque
+import numpy as np
+
+# Available curricula, see TrackCurriculum
+CURRICULA = ("round_robin", "weighted", "performance")
+
+class TrackCurriculum:
+    def __init__(self, circuits, mode="round_robin", weights=None, window=20, temperature=0.5, seed=None):
+        """
+        Choose the circuit of every training episode.
+
+        - "round_robin": the circuits take turns.
+        - "weighted": each episode draws a circuit with the probabilities given by `weights`.
+        - "performance": circuits are first driven in turn until each has `window` scores.
+          Then each episode draws a circuit, favoring those with the lowest mean score
+          over the last `window` episodes on them. The weight of a circuit is
+          exp(-(mean - lowest mean) / (spread * temperature)), so the best circuit keeps
+          exp(-1 / temperature) of the weight of the worst one and is never dropped.
+
+        Args:
+            circuits (list): Circuit images to train on.
+            mode (str): One of CURRICULA.
+            weights (list): Relative weight of every circuit for the "weighted" curriculum.
+            window (int): Recent scores kept per circuit.
+            temperature (float): Spread of the "performance" curriculum, lower favors the
+                weakest circuits more.
+            seed (int): Seed of the draws (None = different every run).
+
+        Raises:
+            ValueError: If the mode is unknown or the weights do not match the circuits.
+        """
+        if mode not in CURRICULA:
+            raise ValueError(f"Unknown curriculum: {mode}")
+        if not circuits:
+            raise ValueError("The curriculum needs at least one circuit.")
+        self.circuits = list(circuits)
+        self.mode = mode
+        self.window = window
+        self.temperature = temperature
+        self.rng = np.random.default_rng(seed)
+
+        self.probabilities = None
+        if mode == "weighted":
+            if weights is None or len(weights) != len(self.circuits):
+                raise ValueError(f"The weighted curriculum needs one weight per circuit ({len(self.circuits)}), got {weights}.")
+            weights = np.asarray(weights, dtype=np.float64)
+            if (weights < 0).any() or weights.sum() <= 0:
+                raise ValueError(f"Curriculum weights must be positive, got {list(weights)}.")
+            self.probabilities = weights / weights.sum()
+
+        self.episodes = 0  # Circuits chosen so far
+        self.recent_scores = {circuit: deque(maxlen=window) for circuit in self.circuits}
+        self.episode_counts = {circuit: 0 for circuit in self.circuits}
+
+    @classmethod
+    def from_config(cls, track_config, circuits, seed=None):
+        """
+        Build the curriculum configured in TRACK_CONFIG.
+
+        Args:
+            track_config (dict): TRACK_CONFIG.
+            circuits (list): Circuit images to train on (see Environment.circuits).
+            seed (int): Seed of the draws.
+        """
+        return cls(circuits, track_config["CURRICULUM"], track_config["CURRICULUM_WEIGHTS"],
+                   track_config["CURRICULUM_WINDOW"], track_config["CURRICULUM_TEMPERATURE"], seed)
+
+    def next_circuit(self):
+        """Get the circuit of the next episode."""
+        index = self.episodes % len(self.circuits)
+        if self.mode == "weighted":
+            index = self.rng.choice(len(self.circuits), p=self.probabilities)
+        elif self.mode == "performance":
+            probabilities = self.performance_probabilities()
+            if probabilities is not None:
+                index = self.rng.choice(len(self.circuits), p=probabilities)
+        self.episodes += 1
+        return self.circuits[index]
+
+    def record(self, circuit, score):
+        """
+        Record the score of an episode.
+
+        Args:
+            circuit (str): Circuit of the episode.
+            score (float): Final score of the episode.
+        """
+        self.recent_scores[circuit].append(score)
+        self.episode_counts[circuit] += 1
+
+    def mean_scores(self):
+        """Get the mean of the recent scores of every circuit (None before its first episode)."""
+        return {circuit: (sum(scores) / len(scores) if scores else None) for circuit, scores in self.recent_scores.items()}
+
+    def performance_probabilities(self):
+        """Get the draw probabilities of the "performance" curriculum, None until every circuit has a full window."""
+        if any(len(scores) < self.window for scores in self.recent_scores.values()):
+            return None
+        means = np.array([sum(scores) / len(scores) for scores in self.recent_scores.values()])
+        spread = means.max() - means.min()
+        if spread <= 0:
+            return np.full(len(means), 1 / len(means))
+        weights = np.exp(-(means - means.min()) / (spread * self.temperature))
+        return weights / weights.sum()
+
+    def format_summary(self):
+        """Format the episodes and the recent mean score of every circuit, one line per circuit."""
+        lines = []
+        for circuit, mean_score in self.mean_scores().items():
+            mean_text = "-" if mean_score is None else f"{mean_score:.1f}"
+            lines.append(f"{circuit}: {self.episode_counts[circuit]} episodes, mean score {mean_text} (last {self.window})")
+        return "\n".join(lines)
@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+from config import DQN_CONFIG
+
+# Add the grandparent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from machine_learning.agent import Agent
+from machine_learning.exploration import ExplorationScheduler
+from machine_learning.dqn.network import QNetwork, Adam
+from machine_learning.q_learning.replay_buffer import ReplayBuffer
+
+class DQNAgent(Agent):
+    RAW_STATE = True  # The network generalizes across nearby sensor readings, no quantization needed
+
+    def __init__(self, state_size, action_size):
+        """
+        Deep Q-network agent in NumPy: a small network trained on minibatches sampled from
+        an experience replay buffer, with a target network for the TD targets.
+
+        Args:
+            state_size (int): The number of variables in an observation.
+            action_size (int): The number of possible actions.
+        """
+        self.state_size = state_size
+        self.action_size = action_size
+        self.rng = np.random.default_rng(DQN_CONFIG["SEED"])
+        layer_sizes = [state_size, *DQN_CONFIG["HIDDEN_SIZES"], action_size]
+        self.network = QNetwork(layer_sizes, self.rng)
+        self.target_network = QNetwork(layer_sizes, self.rng)
+        self.target_network.copy_from(self.network)
+        self.optimizer = Adam(self.network.parameters(), DQN_CONFIG["LEARNING_RATE"])
+        self.replay = ReplayBuffer(DQN_CONFIG["REPLAY_CAPACITY"], state_size, self.rng.integers(2 ** 32), state_dtype=np.float32)
+
+        self.discount_factor = DQN_CONFIG["DISCOUNT_FACTOR"]  # Gamma
+        self.exploration = ExplorationScheduler.from_config(DQN_CONFIG)  # Epsilon schedule, saved with the weights
+        self.batch_size = DQN_CONFIG["BATCH_SIZE"]
+        self.learning_starts = DQN_CONFIG["LEARNING_STARTS"]
+        self.train_interval = DQN_CONFIG["TRAIN_INTERVAL"]
+        self.target_update_interval = DQN_CONFIG["TARGET_UPDATE_INTERVAL"]
+        self.save_interval = DQN_CONFIG["SAVE_INTERVAL"]  # Episodes between saves
+        self.path = os.path.join("machine_learning", "dqn", "models", DQN_CONFIG["MODEL_FILENAME"] + ".npz")
+        self.last_save_duration = 0.0  # Seconds spent writing the last save
+        self.transitions = 0  # Transitions observed since the start of the session
+
+    def get_action(self, state, use_epsilon=True):
+        """
+        Get an action for an observation using the epsilon-greedy strategy.
+
+        Args:
+            state (np.ndarray): The observation (see Vehicle.get_observation).
+            use_epsilon (bool): Whether to use epsilon-greedy exploration.
+                            If False, always choose the best action.
+
+        Returns:
+            int: The chosen action index.
+        """
+        if use_epsilon and self.rng.random() < self.exploration_rate:
+            return int(self.rng.integers(self.action_size))
+        return int(np.argmax(self.network.forward(state[np.newaxis])[0]))
+
+    def observe(self, state, action, reward, next_state, done, stream=0):
+        """Store a transition and train on a minibatch every TRAIN_INTERVAL transitions (the stream is not used)."""
+        self.replay.add(state, action, reward, next_state, done)
+        self.transitions += 1
+        if len(self.replay) >= max(self.learning_starts, self.batch_size) and self.transitions % self.train_interval == 0:
+            self.train_step()
+        if self.transitions % self.target_update_interval == 0:
+            self.target_network.copy_from(self.network)
+
+    def train_step(self):
+        """
+        Train the network on one minibatch sampled from the replay buffer.
+
+        Returns:
+            float: The mean Huber loss of the minibatch.
+        """
+        states, actions, rewards, next_states, dones = self.replay.sample(self.batch_size)
+        td_targets = rewards + self.discount_factor * self.target_network.forward(next_states).max(axis=1) * ~dones
+        rows = np.arange(len(actions))
+        td_errors = None
+
+        def output_gradients(q_values):
+            nonlocal td_errors
+            td_errors = q_values[rows, actions] - td_targets
+            gradients = np.zeros_like(q_values)
+            gradients[rows, actions] = np.clip(td_errors, -1, 1) / len(actions)  # Huber loss, delta 1
+            return gradients
+
+        _, gradients = self.network.gradients(states, output_gradients)
+        self.optimizer.step(gradients)
+        absolute_errors = np.abs(td_errors)
+        return float(np.mean(np.where(absolute_errors < 1, 0.5 * absolute_errors ** 2, absolute_errors - 0.5)))
+
+    def load(self):
+        """Load the network weights. Returns True if successful, False if no saved model exists."""
+        if not os.path.exists(self.path):
+            return False
+        with np.load(self.path) as model:
+            if list(model["layer_sizes"]) != self.network.layer_sizes:
+                raise ValueError(f"{self.path} has layers {list(model['layer_sizes'])}, expected {self.network.layer_sizes}.")
+            for i, parameter in enumerate(self.network.parameters()):
+                parameter[...] = model[f"parameter_{i}"]
+            if "exploration" in model:  # Continue the schedule instead of exploring from scratch
+                self.exploration.load_state(json.loads(str(model["exploration"])))
+        self.target_network.copy_from(self.network)
+        return True
+
+    def save(self, full=False):
+        """
+        Save the network weights (a few thousand values, so the whole model is always written).
+
+        The file is written next to the target and renamed over it, so a crash never
+        leaves a truncated model.
+        """
+        start_time = time.perf_counter()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_path = self.path + ".tmp.npz"
+        parameters = {f"parameter_{i}": parameter for i, parameter in enumerate(self.network.parameters())}
+        np.savez(temporary_path, layer_sizes=np.array(self.network.layer_sizes),
+                 exploration=np.array(json.dumps(self.exploration.state_dict())), **parameters)
+        os.replace(temporary_path, self.path)
+        self.last_save_duration = time.perf_counter() - start_time
+
+    def __len__(self):
+        """Return the number of network parameters."""
+        return self.network.num_parameters()
@@ -0,0 +1,113 @@
+import numpy as np
+
+class QNetwork:
+    def __init__(self, layer_sizes, rng):
+        """
+        Fully connected network with ReLU hidden layers, in float32 NumPy.
+
+        Args:
+            layer_sizes (list): Sizes of the input, hidden and output layers.
+            rng (np.random.Generator): Generator of the initial weights.
+        """
+        self.layer_sizes = list(layer_sizes)
+        self.weights = []
+        self.biases = []
+        for fan_in, fan_out in zip(self.layer_sizes[:-1], self.layer_sizes[1:]):
+            # He initialization, suited to ReLU
+            self.weights.append((rng.standard_normal((fan_in, fan_out)) * np.sqrt(2 / fan_in)).astype(np.float32))
+            self.biases.append(np.zeros(fan_out, dtype=np.float32))
+
+    def parameters(self):
+        """Return the weight and bias arrays (updated in place by the optimizer)."""
+        return self.weights + self.biases
+
+    def num_parameters(self):
+        """Return the number of trainable values."""
+        return sum(parameter.size for parameter in self.parameters())
+
+    def copy_from(self, other):
+        """Copy the parameters of another network of the same shape."""
+        for parameter, source in zip(self.parameters(), other.parameters()):
+            parameter[...] = source
+
+    def forward(self, inputs):
+        """
+        Compute the Q-values of a batch of inputs.
+
+        Args:
+            inputs (np.ndarray): float32 array of shape (batch, input size).
+
+        Returns:
+            np.ndarray: Q-values of shape (batch, output size).
+        """
+        activations = inputs
+        last = len(self.weights) - 1
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            activations = activations @ weight + bias
+            if i < last:
+                np.maximum(activations, 0, out=activations)
+        return activations
+
+    def gradients(self, inputs, output_gradients):
+        """
+        Backpropagate the gradient of a loss with respect to the outputs.
+
+        Args:
+            inputs (np.ndarray): float32 array of shape (batch, input size).
+            output_gradients (callable): Function of the outputs returning the gradient of
+                the loss with respect to them.
+
+        Returns:
+            tuple: (outputs, gradients) - the outputs of the forward pass and the gradients
+                of the parameters, in the order of parameters().
+        """
+        layer_inputs = []
+        activations = inputs
+        last = len(self.weights) - 1
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            layer_inputs.append(activations)
+            activations = activations @ weight + bias
+            if i < last:
+                np.maximum(activations, 0, out=activations)
+        outputs = activations
+
+        weight_gradients = [None] * len(self.weights)
+        bias_gradients = [None] * len(self.biases)
+        gradient = output_gradients(outputs)
+        for i in range(last, -1, -1):
+            weight_gradients[i] = layer_inputs[i].T @ gradient
+            bias_gradients[i] = gradient.sum(axis=0)
+            if i > 0:
+                gradient = gradient @ self.weights[i].T
+                gradient *= layer_inputs[i] > 0  # ReLU derivative, the layer input is the previous activation
+        return outputs, weight_gradients + bias_gradients
+
+class Adam:
+    def __init__(self, parameters, learning_rate, beta1=0.9, beta2=0.999, epsilon=1e-8):
+        """
+        Adam optimizer updating a list of arrays in place.
+
+        Args:
+            parameters (list): The arrays to optimize.
+            learning_rate (float): Step size.
+            beta1, beta2 (float): Decay rates of the moment estimates.
+            epsilon (float): Added to the denominator for numerical stability.
+        """
+        self.parameters = parameters
+        self.learning_rate = learning_rate
+        self.beta1, self.beta2, self.epsilon = beta1, beta2, epsilon
+        self.first_moments = [np.zeros_like(parameter) for parameter in parameters]
+        self.second_moments = [np.zeros_like(parameter) for parameter in parameters]
+        self.steps = 0
+
+    def step(self, gradients):
+        """Apply one update with the given gradients (in the order of the parameters)."""
+        self.steps += 1
+        # Bias corrections folded into the step size
+        step_size = self.learning_rate * np.sqrt(1 - self.beta2 ** self.steps) / (1 - self.beta1 ** self.steps)
+        for parameter, gradient, first, second in zip(self.parameters, gradients, self.first_moments, self.second_moments):
+            first *= self.beta1
+            first += (1 - self.beta1) * gradient
+            second *= self.beta2
+            second += (1 - self.beta2) * gradient * gradient
+            parameter -= (step_size * first / (np.sqrt(second) + self.epsilon)).astype(parameter.dtype)
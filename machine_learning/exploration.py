@@ -0,0 +1,168 @@
+import math
+
+# Available schedules, see ExplorationScheduler
+SCHEDULES = ("exponential", "linear", "cosine", "adaptive")
+
+class ExplorationScheduler:
+    def __init__(self, schedule="exponential", unit="step", initial_rate=1.0, min_rate=0.05, decay=0.995,
+                 horizon=1000, adaptive_window=20, adaptive_factor=0.7):
+        """
+        Exploration rate (epsilon) schedule of an agent.
+
+        - "exponential": epsilon is multiplied by `decay` every unit, down to `min_rate`.
+        - "linear": epsilon goes from `initial_rate` to `min_rate` in `horizon` units.
+        - "cosine": same with a half cosine, slow at both ends.
+        - "adaptive": every `adaptive_window` episodes, epsilon is multiplied by
+          `adaptive_factor` if the mean score beat the best earlier window, and divided by
+          it otherwise (more exploration when learning stalls), between `min_rate` and
+          `initial_rate`.
+
+        Args:
+            schedule (str): One of SCHEDULES.
+            unit (str): "step" (every learning step) or "episode": what advances the
+                exponential, linear and cosine schedules.
+            initial_rate (float): Epsilon at the start of training.
+            min_rate (float): Lowest epsilon.
+            decay (float): Factor per unit of the exponential schedule.
+            horizon (int): Units to reach min_rate with the linear and cosine schedules.
+            adaptive_window (int): Episodes per evaluation of the adaptive schedule.
+            adaptive_factor (float): Factor applied by the adaptive schedule.
+        """
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown exploration schedule: {schedule}")
+        if unit not in ("step", "episode"):
+            raise ValueError(f"Unknown exploration schedule unit: {unit}")
+        self.schedule = schedule
+        self.unit = unit
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.decay = decay
+        self.horizon = horizon
+        self.adaptive_window = adaptive_window
+        self.adaptive_factor = adaptive_factor
+
+        self.rate = initial_rate
+        self.steps = 0  # Learning steps since the start of training
+        self.episodes = 0  # Training episodes since the start of training
+        self.best_mean_score = None  # Best window mean of the adaptive schedule
+        self.window_scores = []  # Scores of the current adaptive window
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build the schedule configured in an agent configuration.
+
+        Args:
+            config (dict): QL_CONFIG or DQN_CONFIG.
+        """
+        return cls(config["EXPLORATION_SCHEDULE"], config["EXPLORATION_UNIT"], config["EXPLORATION_RATE"],
+                   config["MIN_EXPLORATION_RATE"], config["EXPLORATION_DECAY"], config["EXPLORATION_HORIZON"],
+                   config["ADAPTIVE_WINDOW"], config["ADAPTIVE_FACTOR"])
+
+    @property
+    def position(self):
+        """Units elapsed in the schedule (steps or episodes)."""
+        return self.steps if self.unit == "step" else self.episodes
+
+    def step(self):
+        """Advance by one learning step."""
+        self.steps += 1
+        if self.unit == "step":
+            self._advance()
+
+    def end_episode(self, score):
+        """
+        Advance by one episode.
+
+        Args:
+            score (float): Score of the episode, used by the adaptive schedule.
+        """
+        self.episodes += 1
+        if self.schedule == "adaptive":
+            self.window_scores.append(score)
+            if len(self.window_scores) >= self.adaptive_window:
+                mean_score = sum(self.window_scores) / len(self.window_scores)
+                if self.best_mean_score is None or mean_score > self.best_mean_score:
+                    self.best_mean_score = mean_score
+                    self.rate = max(self.min_rate, self.rate * self.adaptive_factor)
+                else:
+                    self.rate = min(self.initial_rate, self.rate / self.adaptive_factor)
+                self.window_scores = []
+        elif self.unit == "episode":
+            self._advance()
+
+    def _advance(self):
+        """Move the exponential, linear or cosine schedule to the current position."""
+        if self.schedule == "exponential":
+            self.rate = max(self.min_rate, self.rate * self.decay)
+        elif self.schedule != "adaptive":
+            self.rate = self.rate_at(self.position)
+
+    def rate_at(self, position):
+        """Get epsilon of the linear or cosine schedule after `position` units."""
+        progress = min(position / max(self.horizon, 1), 1.0)
+        if self.schedule == "linear":
+            return self.initial_rate + (self.min_rate - self.initial_rate) * progress
+        return self.min_rate + (self.initial_rate - self.min_rate) * 0.5 * (1 + math.cos(math.pi * progress))
+
+    def preview(self, units):
+        """
+        Get the next epsilons of the schedule without changing it.
+
+        Args:
+            units (int): Number of units (steps or episodes) ahead.
+
+        Returns:
+            list: Epsilon after each of the next units (constant for the adaptive
+                schedule, which depends on future scores).
+        """
+        if self.schedule == "adaptive":
+            return [self.rate] * units
+        if self.schedule == "exponential":
+            rates = []
+            rate = self.rate
+            for _ in range(units):
+                rate = max(self.min_rate, rate * self.decay)
+                rates.append(rate)
+            return rates
+        return [self.rate_at(self.position + i) for i in range(1, units + 1)]
+
+    def units_to_min(self):
+        """Get the number of units until epsilon reaches its minimum (0 for the adaptive schedule)."""
+        if self.schedule == "adaptive" or self.rate <= self.min_rate:
+            return 0
+        if self.schedule == "exponential":
+            return math.ceil(math.log(self.min_rate / self.rate) / math.log(self.decay)) if 0 < self.decay < 1 else 0
+        return max(0, self.horizon - self.position)
+
+    def state_dict(self):
+        """Get the state saved with the model, to continue the schedule after a restart."""
+        return {
+            "schedule": self.schedule,
+            "unit": self.unit,
+            "rate": self.rate,
+            "steps": self.steps,
+            "episodes": self.episodes,
+            "best_mean_score": self.best_mean_score,
+            "window_scores": list(self.window_scores)
+        }
+
+    def load_state(self, state):
+        """
+        Restore a state saved by state_dict().
+
+        The counters always carry over. If the schedule was changed in the configuration
+        since the save, epsilon is recomputed for the new schedule at the same position.
+        """
+        self.steps = state["steps"]
+        self.episodes = state["episodes"]
+        if state["schedule"] == self.schedule and state["unit"] == self.unit:
+            self.rate = state["rate"]
+            self.best_mean_score = state["best_mean_score"]
+            self.window_scores = list(state["window_scores"])
+        elif self.schedule == "exponential":
+            self.rate = max(self.min_rate, self.initial_rate * self.decay ** self.position)
+        elif self.schedule == "adaptive":
+            self.rate = state["rate"]
+        else:
+            self.rate = self.rate_at(self.position)
@@ -1,29 +1,60 @@
 import sys
 import os
-import pickle
 import numpy as np
 import random
-from collections import defaultdict
 from config import QL_CONFIG
 
 # Add the grandparent directory to the path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-class QLearningAgent:
-    def __init__(self, state_size, action_size):
-        """Initialize the Q-learning agent with state and action sizes, and load the Q-learning parameters from config."""
+from machine_learning.agent import Agent
+from machine_learning.exploration import ExplorationScheduler
+from models.quantizer import StateQuantizer, legacy_quantizer, quantizer_id
+from machine_learning.q_learning.q_table import create_q_table, DictQTable
+from machine_learning.q_learning.persistence import QTableStore, record_dtype
+from machine_learning.q_learning.replay_buffer import ReplayBuffer
+from machine_learning.q_learning.traces import EligibilityTraces
+
+class QLearningAgent(Agent):
+    def __init__(self, state_size, action_size, state_bounds=None):
+        """
+        Initialize the Q-learning agent with state and action sizes, and load the Q-learning parameters from config.
+
+        Args:
+            state_size (int): The number of variables in a state.
+            action_size (int): The number of possible actions.
+            state_bounds (list): (low, high) bounds of every state variable, required by the dense Q-table backend.
+        """
         self.state_size = state_size  # The number of possible states
         self.action_size = action_size  # The number of possible actions
-        self.q_table = defaultdict(self._default_q_values)  # Initialize Q-table with default values for unseen states
-        self.q_table_path = os.path.join("machine_learning", "q_learning", "q_tables", QL_CONFIG["Q_TABLE_FILENAME"])
+        self.backend = QL_CONFIG["Q_TABLE_BACKEND"]  # Saved with the table
+        self.q_table = create_q_table(self.backend, action_size, state_bounds)
+        self.quantizer = StateQuantizer.from_config().describe()  # Saved with the table, checked on load
+        self.q_table_store = QTableStore(os.path.join("machine_learning", "q_learning", "q_tables"), QL_CONFIG["Q_TABLE_FILENAME"])
+        self.path = self.q_table_store.metadata_path
+        self.save_interval = QL_CONFIG["SAVE_INTERVAL"]  # Episodes between saves
         self.learning_rate = QL_CONFIG["LEARNING_RATE"]  # Alpha
         self.discount_factor = QL_CONFIG["DISCOUNT_FACTOR"]  # Gamma
-        self.exploration_rate = QL_CONFIG["EXPLORATION_RATE"]  # Epsilon
-        self.exploration_decay = QL_CONFIG["EXPLORATION_DECAY"]  # Epsilon decay
-        self.min_exploration_rate = QL_CONFIG["MIN_EXPLORATION_RATE"]  # Minimum epsilon
+        self.exploration = ExplorationScheduler.from_config(QL_CONFIG)  # Epsilon schedule, saved with the Q-table
+        self.rng = random.Random(QL_CONFIG["SEED"])  # Private generator, so a seeded run is reproducible
+
+        # Experience replay (None = learn online from every transition)
+        self.replay = None
+        if QL_CONFIG["REPLAY_CAPACITY"] > 0:
+            self.replay = ReplayBuffer(QL_CONFIG["REPLAY_CAPACITY"], state_size, QL_CONFIG["SEED"])
+        self.replay_batch_size = QL_CONFIG["REPLAY_BATCH_SIZE"]
+        self.replay_interval = QL_CONFIG["REPLAY_INTERVAL"]
+        self.replay_batches = QL_CONFIG["REPLAY_BATCHES"]
+        self._transitions_since_replay = 0
+
+        # Watkins Q(lambda) (lambda = 0 is one-step Q-learning)
+        self.trace_lambda = QL_CONFIG["TRACE_LAMBDA"]
+        if self.trace_lambda > 0 and self.replay is not None:
+            raise ValueError("Eligibility traces (TRACE_LAMBDA > 0) and experience replay (REPLAY_CAPACITY > 0) cannot be combined.")
+        self.traces = {}  # Stream -> EligibilityTraces, one stream per simulated vehicle
 
     def _default_q_values(self):
-        """Return a zero-initialized vector for the Q-table."""
+        """Return a zero-initialized vector (kept so Q-tables pickled by earlier versions still load)."""
         return np.zeros(self.action_size)
 
     def get_action(self, state, use_epsilon=True):
@@ -42,32 +73,191 @@ class QLearningAgent:
             print(f"Warning: State has {len(state)} variables, but state_size is {self.state_size}")
         
         # Use epsilon-greedy only when use_epsilon is True (learning mode)
-        if use_epsilon and random.uniform(0, 1) < self.exploration_rate:
-            return random.randint(0, self.action_size - 1)
+        if use_epsilon and self.rng.uniform(0, 1) < self.exploration_rate:
+            return self.rng.randint(0, self.action_size - 1)
         else:
             return np.argmax(self.q_table[state])
 
     def update_q_value(self, state, action, reward, next_state):
         """Update the Q-value for a state-action pair using the Q-learning formula."""
-        best_next_action = np.argmax(self.q_table[next_state])
-        td_target = reward + self.discount_factor * self.q_table[next_state][best_next_action]
-        td_error = td_target - self.q_table[state][action]
-        self.q_table[state][action] += self.learning_rate * td_error
-
-    def decay_exploration(self):
-        """Gradually decay the exploration rate (epsilon)."""
-        self.exploration_rate = max(self.min_exploration_rate, self.exploration_rate * self.exploration_decay)
-
-    def load_q_table(self):
-        """Load the Q-table from a file. Returns True if successful, False if the file does not exist."""
-        try:
-            with open(self.q_table_path, "rb") as f:
-                self.q_table = pickle.load(f)
-                return True
-        except FileNotFoundError:
+        next_q_values = self.q_table[next_state]
+        q_values = self.q_table.visit(state)
+        td_target = reward + self.discount_factor * next_q_values.max()
+        td_error = td_target - q_values[action]
+        q_values[action] += self.learning_rate * td_error
+
+    def update_q_lambda(self, state, action, reward, next_state, done, stream=0):
+        """
+        Update the Q-values of the recently visited state-actions with Watkins Q(lambda).
+
+        The TD error of the transition is credited to every traced pair of the stream. An
+        exploratory (non-greedy) action cuts the traces first, since the earlier pairs did
+        not lead to it under the greedy policy.
+
+        Args:
+            state: The state tuple before the action.
+            action (int): The action taken.
+            reward (float): The reward received.
+            next_state: The state tuple after the action.
+            done (bool): Whether next_state is terminal (no bootstrapping).
+            stream: Key of the trajectory the transition belongs to.
+        """
+        traces = self.traces.get(stream)
+        if traces is None:
+            traces = self.traces[stream] = EligibilityTraces(self.discount_factor * self.trace_lambda,
+                                                             QL_CONFIG["TRACE_THRESHOLD"], QL_CONFIG["MAX_TRACES"])
+        key, q_values = self.q_table.entry(state)
+        self.q_table.visit(state)
+        if q_values[action] < q_values.max():
+            traces.clear()
+        td_target = reward if done else reward + self.discount_factor * self.q_table[next_state].max()
+        td_error = td_target - q_values[action]
+        traces.add(key, q_values, action)
+        traces.update(self.learning_rate * td_error, self.q_table.changed)
+
+    def clear_traces(self, stream=0):
+        """Drop the eligibility traces of a finished episode."""
+        traces = self.traces.get(stream)
+        if traces is not None:
+            traces.clear()
+
+    def observe(self, state, action, reward, next_state, done, stream=0):
+        """
+        Learn from one transition: online, with eligibility traces, or through the replay
+        buffer, depending on the configuration.
+
+        Args:
+            state: The state tuple before the action.
+            action (int): The action taken.
+            reward (float): The reward received.
+            next_state: The state tuple after the action.
+            done (bool): Whether next_state is terminal (used by the trace and replay updates).
+            stream: Key of the trajectory the transition belongs to (used by the traces).
+        """
+        if self.trace_lambda > 0:
+            self.update_q_lambda(state, action, reward, next_state, done, stream)
+            return
+        if self.replay is None:
+            self.update_q_value(state, action, reward, next_state)
+            return
+        self.replay.add(state, action, reward, next_state, done)
+        self._transitions_since_replay += 1
+        if self._transitions_since_replay >= self.replay_interval:
+            self._transitions_since_replay = 0
+            self.replay_update()
+
+    def observe_many(self, states, actions, rewards, next_states, dones):
+        """
+        Store a batch of transitions in the replay buffer and run the replay updates that fell due.
+
+        Args:
+            states, next_states (np.ndarray): int arrays of shape (n, state_size).
+            actions, rewards, dones (np.ndarray): Arrays of shape (n,).
+        """
+        self.replay.add_many(states, actions, rewards, next_states, dones)
+        self._transitions_since_replay += len(actions)
+        while self._transitions_since_replay >= self.replay_interval:
+            self._transitions_since_replay -= self.replay_interval
+            self.replay_update()
+
+    def replay_update(self):
+        """Apply REPLAY_BATCHES minibatch updates sampled from the replay buffer (once it holds a full minibatch)."""
+        if len(self.replay) < self.replay_batch_size:
+            return
+        for _ in range(self.replay_batches):
+            states, actions, rewards, next_states, dones = self.replay.sample(self.replay_batch_size)
+            self.q_table.update_batch(states, actions, rewards, next_states, dones, self.learning_rate, self.discount_factor)
+
+    def end_episode(self, score):
+        """Drop the eligibility traces and advance the exploration schedule at the end of an episode."""
+        self.clear_traces()
+        self.exploration.end_episode(score)
+
+    def load(self):
+        """
+        Load the Q-table from its files. Returns True if successful, False if no saved table exists.
+
+        The saved rows are memory-mapped, not deserialized. A table pickled by earlier
+        versions (<name>.pkl) is imported once into the new format.
+        """
+        loaded = self.q_table_store.load()
+        if loaded is None:
+            return self._import_pickled_q_table()
+        snapshot, journal, metadata = loaded
+        # Tables saved before quantizers were configurable used the legacy one
+        self._check_quantizer(metadata.get("quantizer") or legacy_quantizer().describe(), self.path)
+        if "exploration" in metadata:  # Continue the schedule instead of exploring from scratch
+            self.exploration.load_state(metadata["exploration"])
+        self.q_table.load_records(snapshot)
+        self.q_table.load_records(journal)
+        return True
+
+    def _import_pickled_q_table(self):
+        """Import a Q-table pickled by earlier versions. Returns True if one was found."""
+        pickle_path = os.path.splitext(self.path)[0] + ".pkl"
+        if not os.path.exists(pickle_path):
             return False
+        self._check_quantizer(legacy_quantizer().describe(), pickle_path)
+        legacy_table = DictQTable(self.action_size)
+        legacy_table.load_pickle(pickle_path)
+        self.q_table.load_records(legacy_table.to_records(self._record_dtype()))
+        self.save(full=True)
+        self.q_table_store.flush()
+        print(f"Imported pickled Q-table {pickle_path} into {self.path}")
+        return True
+
+    def save(self, full=False):
+        """
+        Save the Q-table on a background thread.
+
+        Only the rows updated since the last save are written, unless a full snapshot is
+        requested or due (see QTableStore.needs_snapshot).
+
+        Args:
+            full (bool): Write every row instead of the changed ones.
+        """
+        dtype = self._record_dtype()
+        changed = self.q_table.take_changes()
+        full = full or self.q_table_store.needs_snapshot(len(changed), dtype)
+        rows = self.q_table.to_records(dtype, None if full else changed)
+        self.q_table_store.save(rows, self._q_table_metadata(), full)
+
+    def close(self):
+        """Wait for pending saves and stop the background saving thread."""
+        self.q_table_store.close()
+
+    def __len__(self):
+        """Return the number of states in the Q-table."""
+        return len(self.q_table)
+
+    @property
+    def last_save_duration(self):
+        """Duration in seconds of the last completed save (0 before the first one)."""
+        return self.q_table_store.last_save_duration
+
+    def _record_dtype(self):
+        """Get the persistence record dtype of the Q-table."""
+        return record_dtype(self.state_size, self.action_size, self.q_table.VALUE_DTYPE)
+
+    def _check_quantizer(self, saved, path):
+        """
+        Check that a saved table was built with the configured state quantizer.
+
+        Raises:
+            ValueError: If the quantizers differ, the states of the table would mean something else.
+        """
+        if saved != self.quantizer:
+            raise ValueError(f"{path} was saved with state quantizer {quantizer_id(saved)}, but STATE_CONFIG "
+                             f"gives quantizer {quantizer_id(self.quantizer)}. Use another Q_TABLE_FILENAME "
+                             f"or the STATE_CONFIG of that table.")
 
-    def save_q_table(self):
-        """Guarda la Q-table en un archivo."""
-        with open(self.q_table_path, "wb") as f:
-            pickle.dump(self.q_table, f)
\ No newline at end of file
+    def _q_table_metadata(self):
+        """Get the metadata saved with the Q-table."""
+        return {
+            "backend": self.backend,
+            "state_size": self.state_size,
+            "action_size": self.action_size,
+            "states": len(self.q_table),
+            "quantizer": self.quantizer,
+            "exploration": self.exploration.state_dict()
+        }
@@ -0,0 +1,85 @@
+import os
+import sys
+import argparse
+import numpy as np
+
+# Add the grandparent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import QL_CONFIG
+from machine_learning.q_learning.persistence import read_q_table
+from models.quantizer import StateQuantizer, legacy_quantizer, quantizer_id
+
+def coverage_report(states, visits, state_bounds):
+    """
+    Summarize which states a Q-table holds and how often they were updated.
+
+    Args:
+        states (np.ndarray): int array of shape (n, state_size), one row per stored state.
+        visits (np.ndarray): Number of updates of every state.
+        state_bounds (list): (low, high) bounds of every state variable.
+
+    Returns:
+        dict: Counts of stored and visited states, the size of the state space, visit
+            statistics, the histogram of visit counts in power-of-two buckets and the
+            number of distinct values used by every state variable.
+    """
+    visits = np.asarray(visits, dtype=np.int64)
+    visited = visits > 0
+    state_space = int(np.prod([high - low + 1 for low, high in state_bounds], dtype=np.float64))
+    # Bucket k holds the visit counts in [2^k, 2^(k+1))
+    buckets = np.bincount(np.log2(visits[visited]).astype(np.int64)) if visited.any() else np.zeros(0, dtype=np.int64)
+    return {
+        "stored_states": len(visits),
+        "visited_states": int(visited.sum()),
+        "state_space": state_space,
+        "total_visits": int(visits.sum()),
+        "median_visits": float(np.median(visits[visited])) if visited.any() else 0.0,
+        "max_visits": int(visits.max()) if len(visits) else 0,
+        "visit_histogram": [(2 ** k, 2 ** (k + 1) - 1, int(count)) for k, count in enumerate(buckets)],
+        "values_used": [(len(np.unique(states[visited, column])), high - low + 1)
+                        for column, (low, high) in enumerate(state_bounds)]
+    }
+
+def format_coverage(report):
+    """Format a coverage report as a text table."""
+    visited = report["visited_states"]
+    lines = [
+        f"Stored states:  {report['stored_states']}",
+        f"Visited states: {visited} ({visited / max(report['state_space'], 1):.2%} of {report['state_space']} possible states)",
+        f"Visits:         {report['total_visits']} in total, median {report['median_visits']:g}, max {report['max_visits']}",
+        "",
+        f"{'Visits':>15} {'States':>10} {'Share':>8}"
+    ]
+    for low, high, count in report["visit_histogram"]:
+        label = str(low) if low == high else f"{low}-{high}"
+        lines.append(f"{label:>15} {count:>10} {count / max(visited, 1):>8.1%}")
+    lines.append("")
+    lines.append("Distinct values per state variable: " + ", ".join(f"{used}/{possible}" for used, possible in report["values_used"]))
+    return "\n".join(lines)
+
+def main():
+    """Print the coverage report of a saved Q-table."""
+    parser = argparse.ArgumentParser(description="Report how many states a saved Q-table visited and how often.")
+    parser.add_argument("name", nargs="?", default=QL_CONFIG["Q_TABLE_FILENAME"], help="Q-table name (default: QL_CONFIG)")
+    parser.add_argument("--directory", default=os.path.join("machine_learning", "q_learning", "q_tables"), help="Q-table directory")
+    args = parser.parse_args()
+
+    # Read-only: the report never changes the files of a table that may be in training
+    loaded = read_q_table(args.directory, args.name)
+    if loaded is None:
+        sys.exit(f"No Q-table named {args.name} in {args.directory}.")
+    snapshot, journal, metadata = loaded
+
+    # Later records of a state overwrite earlier ones, like when the table is loaded
+    records = np.concatenate((snapshot, journal))
+    _, last = np.unique(records["state"][::-1], axis=0, return_index=True)
+    records = records[len(records) - 1 - last]
+
+    description = metadata.get("quantizer") or legacy_quantizer().describe()
+    bounds = StateQuantizer.from_description(description).state_bounds()
+    print(f"Q-table {args.name} (state quantizer {quantizer_id(description)})")
+    print(format_coverage(coverage_report(records["state"], records["visits"], bounds)))
+
+if __name__ == "__main__":
+    main()
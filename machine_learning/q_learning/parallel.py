@@ -0,0 +1,229 @@
+import os
+import sys
+import time
+import queue
+import multiprocessing
+import numpy as np
+from config import PARALLEL_CONFIG, QL_CONFIG, TRACK_CONFIG
+
+# Add the grandparent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+def _rollout_worker(worker_id, transition_queue, policy_queue, stop_event):
+    """
+    Run rollouts on a private headless environment and stream the transitions to the learner.
+
+    The worker acts epsilon-greedily with the latest greedy actions broadcast by the learner.
+    With several TRACK_CONFIG["CIRCUITS"], the workers are spread over the circuits in turn
+    (a batch of vehicles shares one circuit, so the curriculum does not apply here).
+    Transitions are sent in compact batches: int8 states, uint8 actions and rewards as int16
+    tenths (rewards always have one decimal, so they survive the round trip exactly).
+
+    Args:
+        worker_id (int): Index of the worker.
+        transition_queue (multiprocessing.Queue): Queue the transition batches are put on.
+        policy_queue (multiprocessing.Queue): Queue the learner broadcasts policy updates on.
+        stop_event (multiprocessing.Event): Set by the learner when training is over.
+    """
+    from models.environment import Environment
+    from models.batch_environment import BatchEnvironment, round_like_python
+
+    circuits = TRACK_CONFIG["CIRCUITS"] or [TRACK_CONFIG["CIRCUIT"]]
+    environment = Environment(headless=True, circuit=circuits[worker_id % len(circuits)])
+    batch = BatchEnvironment(environment, PARALLEL_CONFIG["VEHICLES_PER_WORKER"])
+    seed = QL_CONFIG["SEED"]
+    rng = np.random.default_rng(None if seed is None else (seed, worker_id))  # Distinct stream per worker
+    greedy_actions = {}  # State tuple -> greedy action, unseen states pick 0 like argmax over zeros
+    exploration_rate = 1.0
+
+    batch_size = PARALLEL_CONFIG["BATCH_SIZE"]
+    buffers = {"states": [], "actions": [], "rewards": [], "next_states": [], "dones": [], "ends": []}
+    buffered = 0
+    scores = []
+    episode_steps = []
+
+    states = batch.reset()
+    while not stop_event.is_set():
+        # Apply every policy update broadcast since the last step
+        try:
+            while True:
+                update = policy_queue.get_nowait()
+                greedy_actions.update(update["greedy_actions"])
+                exploration_rate = update["exploration_rate"]
+        except queue.Empty:
+            pass
+
+        greedy = np.array([greedy_actions.get(tuple(state), 0) for state in states.tolist()])
+        explore = rng.random(batch.num_vehicles) < exploration_rate
+        actions = np.where(explore, rng.integers(0, 4, size=batch.num_vehicles), greedy)
+        next_states, rewards, dones = batch.step(actions)
+
+        buffers["states"].append(states.astype(np.int8))
+        buffers["actions"].append(actions.astype(np.uint8))
+        buffers["rewards"].append(np.rint(round_like_python(rewards) * 10).astype(np.int16))
+        buffers["next_states"].append(next_states.astype(np.int8))
+        buffers["dones"].append(batch.collided.copy())  # Terminal transitions, reaching the step budget is not terminal
+        buffers["ends"].append(dones)  # Last transitions of an episode
+        buffered += batch.num_vehicles
+
+        if dones.any():
+            scores.extend(batch.score[dones].tolist())
+            episode_steps.extend(batch.steps[dones].tolist())
+            next_states = batch.reset(dones)
+        states = next_states
+
+        if buffered >= batch_size:
+            transition_queue.put({
+                "worker_id": worker_id,
+                "states": np.concatenate(buffers["states"]),
+                "actions": np.concatenate(buffers["actions"]),
+                "rewards": np.concatenate(buffers["rewards"]),
+                "next_states": np.concatenate(buffers["next_states"]),
+                "dones": np.concatenate(buffers["dones"]),
+                "ends": np.concatenate(buffers["ends"]),
+                "scores": scores,
+                "episode_steps": episode_steps
+            })
+            buffers = {key: [] for key in buffers}
+            buffered = 0
+            scores = []
+            episode_steps = []
+
+class ParallelTrainer:
+    def __init__(self, agent, logger, telemetry=None):
+        """
+        Train one agent with several rollout worker processes (actor-learner).
+
+        The learner (this process) owns the Q-table: it applies every transition the
+        workers send and periodically broadcasts the greedy actions of the states it
+        updated, together with the current exploration rate.
+
+        Args:
+            agent (QLearningAgent): The agent whose Q-table is trained.
+            logger (Logger): Logger receiving the metrics of every finished episode.
+            telemetry (TelemetryServer): Optional live metrics endpoint, updated for every finished episode.
+
+        Raises:
+            ValueError: If the agent is not a tabular Q-learning agent.
+        """
+        if not hasattr(agent, "q_table"):
+            raise ValueError("Parallel training only supports the q_learning agent.")
+        self.agent = agent
+        self.logger = logger
+        self.telemetry = telemetry
+        self.num_workers = PARALLEL_CONFIG["NUM_WORKERS"]
+        self.sync_interval = PARALLEL_CONFIG["SYNC_INTERVAL"]
+        self.report_interval = PARALLEL_CONFIG["REPORT_INTERVAL"]
+        self.save_interval = QL_CONFIG["SAVE_INTERVAL"]
+        self.vehicles_per_worker = PARALLEL_CONFIG["VEHICLES_PER_WORKER"]
+
+    def train(self, num_episodes):
+        """
+        Run the workers until num_episodes episodes have finished.
+
+        Args:
+            num_episodes (int): Number of episodes to complete across all workers.
+        """
+        transition_queue = multiprocessing.Queue(maxsize=4 * self.num_workers)  # Bounded for backpressure
+        policy_queues = [multiprocessing.Queue() for _ in range(self.num_workers)]
+        stop_event = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(target=_rollout_worker, args=(i, transition_queue, policy_queues[i], stop_event), daemon=True)
+            for i in range(self.num_workers)
+        ]
+
+        # Start every worker from the greedy policy of the loaded Q-table
+        initial_policy = self._greedy_actions(self.agent.q_table.states())
+        for policy_queue in policy_queues:
+            policy_queue.put({"greedy_actions": initial_policy, "exploration_rate": self.agent.exploration_rate})
+        for worker in workers:
+            worker.start()
+
+        episodes = 0
+        total_steps = 0
+        steps_since_sync = 0
+        updated_states = set()
+        start_time = last_report_time = time.perf_counter()
+        last_report_steps = 0
+
+        try:
+            while episodes < num_episodes:
+                try:
+                    batch = transition_queue.get(timeout=1)
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        raise RuntimeError("All rollout workers stopped unexpectedly.")
+                    continue
+
+                states = [tuple(state) for state in batch["states"].tolist()]
+                if self.agent.trace_lambda > 0:
+                    # Transitions are step-major, one per vehicle, and batches start at the first vehicle
+                    next_states = [tuple(state) for state in batch["next_states"].tolist()]
+                    transitions = zip(states, batch["actions"].tolist(), batch["rewards"].tolist(), next_states,
+                                      batch["dones"].tolist(), batch["ends"].tolist())
+                    for i, (state, action, reward, next_state, done, end) in enumerate(transitions):
+                        stream = (batch["worker_id"], i % self.vehicles_per_worker)
+                        self.agent.update_q_lambda(state, action, reward / 10, next_state, done, stream)
+                        if end:
+                            self.agent.clear_traces(stream)
+                        self.agent.decay_exploration()
+                elif self.agent.replay is None:
+                    next_states = [tuple(state) for state in batch["next_states"].tolist()]
+                    for state, action, reward, next_state in zip(states, batch["actions"].tolist(), batch["rewards"].tolist(), next_states):
+                        self.agent.update_q_value(state, action, reward / 10, next_state)
+                        self.agent.decay_exploration()
+                else:
+                    self.agent.observe_many(batch["states"], batch["actions"], batch["rewards"] / 10, batch["next_states"], batch["dones"])
+                    for _ in range(len(states)):
+                        self.agent.decay_exploration()
+                updated_states.update(states)
+                total_steps += len(states)
+                steps_since_sync += len(states)
+
+                # Throughput of the whole learner since the start, the episodes ran concurrently
+                steps_per_sec = total_steps / max(time.perf_counter() - start_time, 1e-9)
+                for score, steps in zip(batch["scores"], batch["episode_steps"]):
+                    if episodes < num_episodes:
+                        episodes += 1
+                        self.agent.exploration.end_episode(score)  # The traces are cleared per vehicle above
+                        self.logger.log_episode(score, steps, self.agent.exploration_rate, len(self.agent.q_table), steps_per_sec)
+                        if self.telemetry:
+                            self.telemetry.record_episode(score, steps, self.agent.exploration_rate, len(self.agent.q_table),
+                                                          steps_per_sec, self.agent.last_save_duration or None)
+                        if episodes % self.save_interval == 0:
+                            self.agent.save()  # Written on a background thread
+
+                if steps_since_sync >= self.sync_interval:
+                    update = {"greedy_actions": self._greedy_actions(updated_states), "exploration_rate": self.agent.exploration_rate}
+                    for policy_queue in policy_queues:
+                        policy_queue.put(update)
+                    updated_states = set()
+                    steps_since_sync = 0
+
+                now = time.perf_counter()
+                if now - last_report_time >= self.report_interval:
+                    steps_per_sec = (total_steps - last_report_steps) / (now - last_report_time)
+                    print(f"Episodes: {episodes}/{num_episodes} | Steps/sec: {steps_per_sec:.0f} "
+                          f"({steps_per_sec / self.num_workers:.0f} per worker) | Epsilon: {self.agent.exploration_rate:.3f}")
+                    last_report_time, last_report_steps = now, total_steps
+        finally:
+            stop_event.set()
+            # Drain the queue so workers blocked on put() can exit
+            try:
+                while True:
+                    transition_queue.get_nowait()
+            except queue.Empty:
+                pass
+            for worker in workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+
+        elapsed = time.perf_counter() - start_time
+        print(f"Parallel training finished: {episodes} episodes, {total_steps} steps in {elapsed:.1f}s "
+              f"({total_steps / elapsed:.0f} steps/sec with {self.num_workers} workers)")
+        self.agent.save()
+
+    def _greedy_actions(self, states):
+        """Map each of the given states to its greedy action."""
+        return {state: int(np.argmax(self.agent.q_table[state])) for state in states}
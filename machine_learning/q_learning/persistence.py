@@ -0,0 +1,280 @@
+import os
+import json
+import time
+import queue
+import struct
+import threading
+import numpy as np
+
+# Version of the on-disk layout written in the metadata file
+FORMAT_VERSION = 1
+
+# Journal header: magic bytes followed by the generation of the snapshot it extends
+JOURNAL_MAGIC = b"QJOURNAL"
+JOURNAL_HEADER = struct.Struct("<8sQ")
+
+def record_dtype(state_size, action_size, value_dtype):
+    """
+    Get the dtype of one persisted Q-table row.
+
+    Args:
+        state_size (int): Number of variables in a state.
+        action_size (int): Number of possible actions.
+        value_dtype (np.dtype): dtype of the Q-values.
+
+    Returns:
+        np.dtype: Structured dtype with "state", "q_values" and "visits" fields.
+    """
+    return np.dtype([
+        ("state", "<i2", (state_size,)),
+        ("q_values", np.dtype(value_dtype).newbyteorder("<"), (action_size,)),
+        ("visits", "<u4")
+    ])
+
+def _write_atomically(path, write):
+    """
+    Write a file through a temporary file and an atomic rename, so readers never see a partial file.
+
+    Args:
+        path (str): Destination path.
+        write (callable): Called with the open binary temporary file.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def _describe_dtype(dtype):
+    """Describe a dtype the way it reads back from the JSON metadata file (lists instead of tuples)."""
+    return json.loads(json.dumps(np.lib.format.dtype_to_descr(np.dtype(dtype))))
+
+def _journal_generation(path):
+    """Get the snapshot generation a journal extends, None if the journal is missing or has no valid header."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(JOURNAL_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < JOURNAL_HEADER.size:
+        return None
+    magic, generation = JOURNAL_HEADER.unpack(header)
+    return generation if magic == JOURNAL_MAGIC else None
+
+def read_q_table(directory, name):
+    """
+    Read a saved Q-table without modifying its files (see QTableStore for the layout).
+
+    Args:
+        directory (str): Directory of the Q-table files.
+        name (str): Base name of the Q-table files.
+
+    Returns:
+        tuple: (snapshot, journal, metadata): the snapshot rows memory-mapped read-only,
+            the valid journal rows (memory-mapped, empty if the journal is missing or left
+            over from an older snapshot) and the metadata dict. None if no table is saved.
+
+    Raises:
+        ValueError: If the table was saved in an unsupported format version.
+    """
+    metadata_path = os.path.join(directory, f"{name}.json")
+    try:
+        with open(metadata_path, "r") as f:
+            metadata = json.load(f)
+    except FileNotFoundError:
+        return None
+    if metadata["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported Q-table format version {metadata['format_version']} in {metadata_path}.")
+
+    snapshot = np.load(os.path.join(directory, metadata["snapshot"]), mmap_mode="r")
+    journal = np.zeros(0, dtype=snapshot.dtype)
+    journal_path = os.path.join(directory, f"{name}.journal")
+    if _journal_generation(journal_path) == metadata["generation"]:
+        # A partial record a crash left at the end is not part of the journal
+        rows = (os.path.getsize(journal_path) - JOURNAL_HEADER.size) // snapshot.dtype.itemsize
+        if rows > 0:
+            journal = np.memmap(journal_path, dtype=snapshot.dtype, mode="r", offset=JOURNAL_HEADER.size, shape=(rows,))
+    return snapshot, journal, metadata
+
+class QTableStore:
+    def __init__(self, directory, name):
+        """
+        Crash-safe, incremental storage of a Q-table.
+
+        A table named "v1" is stored as three files:
+        - v1.<generation>.npy: full snapshot of the rows, a memory-mappable structured array.
+        - v1.journal: rows changed since that snapshot, appended in order (last write wins).
+        - v1.json: metadata naming the current snapshot. Replacing it commits a new snapshot.
+
+        Every file is replaced through an atomic rename and the journal only ever grows,
+        so a crash at any point leaves the previous consistent state (a partial journal
+        record at the end is ignored). The journal carries the generation of its snapshot,
+        so a journal already folded into a newer snapshot is never replayed.
+
+        Writes run on a background thread, see save().
+
+        Args:
+            directory (str): Directory of the Q-table files.
+            name (str): Base name of the Q-table files.
+        """
+        self.directory = directory
+        self.name = name
+        self.metadata_path = os.path.join(directory, f"{name}.json")
+        self.journal_path = os.path.join(directory, f"{name}.journal")
+
+        self.metadata = None  # Metadata of the committed snapshot, None until loaded or saved
+        self.snapshot_rows = 0
+        self.journal_rows = 0
+        self.last_save_duration = 0.0  # Seconds spent writing the last save
+
+        # Layout and sizes the files will have once every queued save is written. The fields
+        # above are updated by the background thread, needs_snapshot only reads these.
+        self._queued_dtype = None  # Row layout of the last snapshot (described as in the metadata), None before the first
+        self._queued_snapshot_rows = 0
+        self._queued_journal_rows = 0
+
+        self._jobs = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name=f"QTableStore-{name}", daemon=True)
+        self._thread.start()
+
+    def exists(self):
+        """Check whether a saved table exists."""
+        return os.path.exists(self.metadata_path)
+
+    def load(self):
+        """
+        Load the saved rows without copying them into memory (see read_q_table), and
+        restart the journal if it is missing or left over from an older snapshot.
+
+        Returns:
+            tuple: (snapshot, journal, metadata): the snapshot rows memory-mapped read-only,
+                the valid journal rows (memory-mapped, possibly empty) and the metadata dict.
+                Returns None if no table is saved.
+        """
+        loaded = read_q_table(self.directory, self.name)
+        if loaded is None:
+            return None
+        snapshot, journal, metadata = loaded
+        if _journal_generation(self.journal_path) != metadata["generation"]:
+            # Missing, or left over from an older snapshot after a crash: restart it for this snapshot
+            _write_atomically(self.journal_path, lambda f: f.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, metadata["generation"])))
+
+        self.metadata = metadata
+        self.snapshot_rows = len(snapshot)
+        self.journal_rows = len(journal)
+        self._queued_dtype = metadata["dtype"]
+        self._queued_snapshot_rows = len(snapshot)
+        self._queued_journal_rows = len(journal)
+        return snapshot, journal, metadata
+
+    def save(self, rows, metadata, full):
+        """
+        Queue a save on the background thread and return immediately.
+
+        Args:
+            rows (np.ndarray): Records (see record_dtype) owned by the store from now on.
+                All the rows of the table for a full save, the changed rows otherwise.
+            metadata (dict): Table metadata (backend, sizes, agent state...).
+            full (bool): Write a new snapshot instead of appending to the journal.
+        """
+        self._raise_pending_error()
+        if full:
+            self._queued_dtype = _describe_dtype(rows.dtype)
+            self._queued_snapshot_rows = len(rows)
+            self._queued_journal_rows = 0
+        else:
+            self._queued_journal_rows += len(rows)
+        self._jobs.put((rows, dict(metadata), full))
+
+    def needs_snapshot(self, pending_rows, dtype):
+        """
+        Check whether the next save has to be a full snapshot.
+
+        That is the case before the first snapshot, when the row layout changed, and when
+        the journal would outgrow the snapshot (which keeps loading and saving amortized O(1) per row).
+        Saves still queued count as written, so the answer does not depend on the progress
+        of the background thread.
+        """
+        if self._queued_dtype is None or self._queued_dtype != _describe_dtype(dtype):
+            return True
+        return self._queued_journal_rows + pending_rows > max(self._queued_snapshot_rows, 1024)
+
+    def flush(self):
+        """Wait until every queued save is written."""
+        self._jobs.join()
+        self._raise_pending_error()
+
+    def close(self):
+        """Write the queued saves and stop the background thread."""
+        self._jobs.put(None)
+        self._thread.join()
+        self._raise_pending_error()
+
+    def _raise_pending_error(self):
+        """Re-raise, on the caller's thread, an error raised by the background thread."""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        """Background thread: write the queued saves in order."""
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                rows, metadata, full = job
+                start_time = time.perf_counter()
+                if full:
+                    self._write_snapshot(rows, metadata)
+                else:
+                    self._append_journal(rows, metadata)
+                self.last_save_duration = time.perf_counter() - start_time
+            except Exception as error:  # Surfaced on the training thread by the next save/flush
+                self._error = error
+            finally:
+                self._jobs.task_done()
+
+    def _write_snapshot(self, rows, metadata):
+        """Write a new snapshot, commit it in the metadata file and start an empty journal."""
+        generation = self.metadata["generation"] + 1 if self.metadata else 1
+        snapshot_name = f"{self.name}.{generation}.npy"
+        _write_atomically(os.path.join(self.directory, snapshot_name), lambda f: np.save(f, rows, allow_pickle=False))
+
+        metadata.update(format_version=FORMAT_VERSION, generation=generation, snapshot=snapshot_name,
+                        dtype=_describe_dtype(rows.dtype))
+        self._write_metadata(metadata)  # Commit point
+        _write_atomically(self.journal_path, lambda f: f.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, generation)))
+
+        # The previous snapshot is no longer referenced
+        if self.metadata and self.metadata["snapshot"] != snapshot_name:
+            try:
+                os.remove(os.path.join(self.directory, self.metadata["snapshot"]))
+            except FileNotFoundError:
+                pass
+        self.metadata = metadata
+        self.snapshot_rows = len(rows)
+        self.journal_rows = 0
+
+    def _append_journal(self, rows, metadata):
+        """Append changed rows to the journal and refresh the metadata of the current snapshot."""
+        if len(rows):
+            with open(self.journal_path, "r+b") as f:
+                # Drop the partial record a crash may have left, so the new rows stay aligned
+                f.truncate(JOURNAL_HEADER.size + self.journal_rows * rows.dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(rows.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self.journal_rows += len(rows)
+
+        # Keep the snapshot fields, only the table metadata (agent state...) changes
+        metadata.update({key: self.metadata[key] for key in ("format_version", "generation", "snapshot", "dtype")})
+        self._write_metadata(metadata)
+        self.metadata = metadata
+
+    def _write_metadata(self, metadata):
+        """Atomically replace the metadata file."""
+        _write_atomically(self.metadata_path, lambda f: f.write(json.dumps(metadata, indent=2).encode()))
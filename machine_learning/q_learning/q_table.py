@@ -0,0 +1,383 @@
+import pickle
+from operator import getitem
+import numpy as np
+from collections import defaultdict
+
+def td_update_batch(values, rows, actions, rewards, next_rows, dones, learning_rate, discount_factor):
+    """
+    Apply a minibatch of tabular Q-learning updates in place, vectorized.
+
+    Every TD error is computed from the Q-values before the batch. A (state, action)
+    pair that appears several times in the batch moves once, by the learning rate times
+    its mean TD error, so duplicates never overshoot.
+
+    Args:
+        values (np.ndarray): Q-values, one row per state.
+        rows (np.ndarray): Rows of the states.
+        actions (np.ndarray): Actions taken.
+        rewards (np.ndarray): Rewards received.
+        next_rows (np.ndarray): Rows of the next states.
+        dones (np.ndarray): Whether the next state is terminal (no bootstrapping).
+        learning_rate (float): Alpha.
+        discount_factor (float): Gamma.
+
+    Returns:
+        np.ndarray: The updated rows (unique).
+    """
+    action_size = values.shape[1]
+    td_targets = rewards + discount_factor * values[next_rows].max(axis=1) * ~dones
+    td_errors = td_targets - values[rows, actions]
+    pairs, inverse = np.unique(rows * action_size + actions, return_inverse=True)
+    mean_errors = np.bincount(inverse, weights=td_errors) / np.bincount(inverse)
+    values.reshape(-1)[pairs] += (learning_rate * mean_errors).astype(values.dtype)
+    return np.unique(pairs // action_size)
+
+class DictQTable:
+    VALUE_DTYPE = np.float64
+
+    def __init__(self, action_size):
+        """
+        Sparse Q-table: a dictionary from state tuples to Q-value vectors.
+
+        Args:
+            action_size (int): Number of possible actions.
+        """
+        self.action_size = action_size
+        self.table = defaultdict(self._default_q_values)  # Initialize Q-table with default values for unseen states
+        self.visits = defaultdict(int)  # Number of updates of each state
+        self.changed = set()  # States updated since the last save
+
+    def _default_q_values(self):
+        """Return a zero-initialized vector for the Q-table."""
+        return np.zeros(self.action_size)
+
+    def __getitem__(self, state):
+        """Return the Q-values of a state (created on first access)."""
+        return self.table[state]
+
+    def __len__(self):
+        """Return the number of states in the table."""
+        return len(self.table)
+
+    def states(self):
+        """Return the states stored in the table."""
+        return list(self.table.keys())
+
+    def visit(self, state):
+        """Count one update of the given state and return its Q-values."""
+        self.visits[state] += 1
+        self.changed.add(state)
+        return self.table[state]
+
+    def entry(self, state):
+        """Return the key of a state in self.changed and its Q-values (no visit is counted)."""
+        return state, self.table[state]
+
+    def update_batch(self, states, actions, rewards, next_states, dones, learning_rate, discount_factor):
+        """
+        Apply a minibatch of Q-learning updates (see td_update_batch).
+
+        Args:
+            states, next_states (np.ndarray): int arrays of shape (batch, state_size).
+            actions, rewards, dones (np.ndarray): Arrays of shape (batch,).
+            learning_rate (float): Alpha.
+            discount_factor (float): Gamma.
+        """
+        # Gather the Q-values of the states involved into a small matrix, update it and store it back
+        unique_states, inverse = np.unique(np.concatenate((states, next_states)), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        keys = [tuple(state) for state in unique_states.tolist()]
+        values = np.array([self.table[key] for key in keys], dtype=self.VALUE_DTYPE).reshape(len(keys), self.action_size)
+        rows, next_rows = inverse[:len(states)], inverse[len(states):]
+        td_update_batch(values, rows, actions, rewards, next_rows, dones, learning_rate, discount_factor)
+        for row, count in zip(*np.unique(rows, return_counts=True)):
+            key = keys[row]
+            self.table[key][:] = values[row]
+            self.visits[key] += int(count)
+            self.changed.add(key)
+
+    def take_changes(self):
+        """Return the states updated since the last call."""
+        changed, self.changed = list(self.changed), set()
+        return changed
+
+    def to_records(self, dtype, states=None):
+        """
+        Copy rows of the table into persistence records.
+
+        Args:
+            dtype (np.dtype): Record dtype, see persistence.record_dtype.
+            states (list): States to copy. Defaults to every state of the table.
+
+        Returns:
+            np.ndarray: The records.
+        """
+        if states is None:
+            states = list(self.table.keys())
+        records = np.zeros(len(states), dtype=dtype)
+        if states:
+            records["state"] = states
+            records["q_values"] = [self.table[state] for state in states]
+            records["visits"] = [self.visits.get(state, 0) for state in states]
+        return records
+
+    def load_records(self, records):
+        """Store persistence records in the table, later records overwrite earlier ones."""
+        for state, q_values, visits in zip(records["state"].tolist(), records["q_values"].tolist(), records["visits"].tolist()):
+            state = tuple(state)
+            self.table[state] = np.array(q_values)
+            if visits:
+                self.visits[state] = visits
+
+    def load_pickle(self, path):
+        """Load a Q-table pickled by earlier versions (a dictionary of state tuples to Q-values)."""
+        with open(path, "rb") as f:
+            self.table = defaultdict(self._default_q_values, pickle.load(f))
+        # Earlier versions did not count visits: every stored state counts as visited once
+        self.visits = defaultdict(int, {state: 1 for state in self.table})
+
+class DenseQTable:
+    VALUE_DTYPE = np.float32
+    ROW_CACHE_SIZE = 1 << 15  # State tuples whose row is remembered (about 10 MB), cleared when full
+
+    def __init__(self, state_bounds, action_size):
+        """
+        Dense Q-table: one contiguous float32 array with a row per possible state.
+
+        States are mapped to a flat row index with mixed-radix arithmetic. Signed state
+        variables (the sensors) share a single sign bit because all of them are positive
+        on the road and negative off the road, which halves the size of every signed
+        dimension. The arrays are zero-allocated, so the OS only commits the pages of
+        visited states.
+
+        The scalar path (index, visit) avoids NumPy scalar operations, which cost more than
+        the update itself: the rows (index and view) of recent states are cached, other rows are a sum of
+        precomputed per-variable lookups, and visit counts are buffered in a dict and added
+        to the visits array in bulk.
+
+        Args:
+            state_bounds (list): (low, high) inclusive bounds of every state variable.
+            action_size (int): Number of possible actions.
+        """
+        self.state_bounds = [(int(low), int(high)) for low, high in state_bounds]
+        self.action_size = action_size
+
+        # (offset, size, signed) of each state variable, from most to least significant
+        self._dimensions = []
+        for low, high in self.state_bounds:
+            if low < 0:
+                self._dimensions.append((0, max(-low, high) + 1, True))
+            else:
+                self._dimensions.append((low, high - low + 1, False))
+        sizes = [size for _, size, _ in self._dimensions]
+        self._strides = [int(np.prod(sizes[i + 1:], dtype=np.int64)) for i in range(len(sizes))]
+        self._sign_stride = int(np.prod(sizes, dtype=np.int64))  # The sign bit is the most significant digit
+        self._layout = [(offset, size, signed, stride) for (offset, size, signed), stride in zip(self._dimensions, self._strides)]
+        self._signed = any(signed for _, _, signed in self._dimensions)
+        self.num_states = 2 * self._sign_stride if self._signed else self._sign_stride
+        # Value -> contribution to the row index, for every state variable (see index)
+        self._digit_tables = [
+            {value: (abs(value) if signed else value - offset) * stride
+             for value in (range(1 - size, size) if signed else range(offset, offset + size))}
+            for offset, size, signed, stride in self._layout
+        ]
+
+        self._row_cache = {}  # State tuple -> (row index, writable view of the row), see _row
+
+        self.values = np.zeros((self.num_states, action_size), dtype=np.float32)
+        self._visits = np.zeros(self.num_states, dtype=np.uint32)
+        self._num_visited = 0
+        self._pending_visits = {}  # Row -> visits not yet added to self._visits
+        self.changed = set()  # Rows updated since the last save
+
+    def index(self, state):
+        """
+        Map a state tuple to its row in the table.
+
+        Raises:
+            ValueError: If the state lies outside the table bounds.
+        """
+        return self._row(state)[0]
+
+    def _row(self, state):
+        """Get the row index of a state and a writable view of its Q-values (see index)."""
+        row = self._row_cache.get(state)
+        if row is not None:
+            return row
+        try:
+            index = sum(map(getitem, self._digit_tables, state))
+        except KeyError:
+            raise ValueError(f"State {state} is outside the Q-table bounds {self.state_bounds}.") from None
+        # Unsigned variables are never negative here (their tables have no negative keys)
+        if self._signed and min(state) < 0:
+            index += self._sign_stride
+        if len(self._row_cache) >= self.ROW_CACHE_SIZE:
+            self._row_cache.clear()  # Training keeps revisiting a small set of states, which come back quickly
+        row = self._row_cache[state] = (index, self.values[index])
+        return row
+
+    def state(self, index):
+        """Map a row of the table back to its state tuple."""
+        negative = index >= self._sign_stride
+        index %= self._sign_stride
+        state = []
+        for offset, size, signed, stride in self._layout:
+            value = index // stride + offset
+            index %= stride
+            state.append(-value if signed and negative else value)
+        return tuple(state)
+
+    def state_many(self, indices):
+        """Vectorized state() for an array of rows, returns an int64 array of shape (n, state_size)."""
+        indices = np.asarray(indices, dtype=np.int64)
+        negative = indices >= self._sign_stride
+        indices = indices % self._sign_stride
+        states = np.empty((len(indices), len(self._layout)), dtype=np.int64)
+        for column, (offset, size, signed, stride) in enumerate(self._layout):
+            values = indices // stride + offset
+            indices = indices % stride
+            states[:, column] = np.where(signed & negative, -values, values)
+        return states
+
+    def index_many(self, states):
+        """
+        Vectorized index() for an int array of states with shape (n, state_size).
+
+        Raises:
+            ValueError: If a state lies outside the table bounds.
+        """
+        states = np.asarray(states, dtype=np.int64)
+        signed = np.array([signed for _, _, signed, _ in self._layout])
+        offsets = np.array([offset for offset, _, _, _ in self._layout])
+        sizes = np.array([size for _, size, _, _ in self._layout])
+        coordinates = np.where(signed, np.abs(states), states) - offsets
+        if states.size and ((coordinates < 0) | (coordinates >= sizes)).any():
+            raise ValueError(f"Some states are outside the Q-table bounds {self.state_bounds}.")
+        negative = (states[:, signed] < 0).any(axis=1)
+        return coordinates @ np.array(self._strides, dtype=np.int64) + np.where(negative, self._sign_stride, 0)
+
+    def __getitem__(self, state):
+        """Return the Q-values of a state as a writable view of its row."""
+        return self._row(state)[1]
+
+    @property
+    def visits(self):
+        """Number of updates of every row."""
+        self._flush_visits()
+        return self._visits
+
+    @property
+    def num_visited(self):
+        """Number of rows updated at least once."""
+        self._flush_visits()
+        return self._num_visited
+
+    def _flush_visits(self):
+        """Add the buffered visit counts to the visits array."""
+        if not self._pending_visits:
+            return
+        rows = np.fromiter(self._pending_visits.keys(), dtype=np.int64, count=len(self._pending_visits))
+        counts = np.fromiter(self._pending_visits.values(), dtype=np.int64, count=len(self._pending_visits))
+        self._pending_visits = {}
+        self._num_visited += int(np.count_nonzero(self._visits[rows] == 0))
+        self._visits[rows] += counts.astype(self._visits.dtype)
+
+    def __len__(self):
+        """Return the number of visited states."""
+        return self.num_visited
+
+    def states(self):
+        """Return the visited states."""
+        return [self.state(int(index)) for index in np.flatnonzero(self.visits)]
+
+    def visit(self, state):
+        """Count one update of the given state and return its Q-values."""
+        index, q_values = self._row(state)
+        pending = self._pending_visits
+        pending[index] = pending.get(index, 0) + 1
+        self.changed.add(index)
+        return q_values
+
+    def entry(self, state):
+        """Return the key of a state in self.changed and its Q-values as a writable view (no visit is counted)."""
+        return self._row(state)
+
+    def update_batch(self, states, actions, rewards, next_states, dones, learning_rate, discount_factor):
+        """
+        Apply a minibatch of Q-learning updates (see td_update_batch).
+
+        Args:
+            states, next_states (np.ndarray): int arrays of shape (batch, state_size).
+            actions, rewards, dones (np.ndarray): Arrays of shape (batch,).
+            learning_rate (float): Alpha.
+            discount_factor (float): Gamma.
+
+        Raises:
+            ValueError: If a state lies outside the table bounds.
+        """
+        rows = self.index_many(states)
+        td_update_batch(self.values, rows, actions, rewards, self.index_many(next_states), dones, learning_rate, discount_factor)
+        updated, counts = np.unique(rows, return_counts=True)
+        visits = self.visits  # Flushes the buffered counts first
+        self._num_visited += int(np.count_nonzero(visits[updated] == 0))
+        visits[updated] += counts.astype(visits.dtype)
+        self.changed.update(updated.tolist())
+
+    def take_changes(self):
+        """Return the rows updated since the last call."""
+        changed, self.changed = list(self.changed), set()
+        return changed
+
+    def to_records(self, dtype, rows=None):
+        """
+        Copy rows of the table into persistence records.
+
+        Args:
+            dtype (np.dtype): Record dtype, see persistence.record_dtype.
+            rows (list): Rows to copy. Defaults to every visited row.
+
+        Returns:
+            np.ndarray: The records.
+        """
+        rows = np.flatnonzero(self.visits) if rows is None else np.array(rows, dtype=np.int64)
+        records = np.zeros(len(rows), dtype=dtype)
+        records["state"] = self.state_many(rows)
+        records["q_values"] = self.values[rows]
+        records["visits"] = self.visits[rows]
+        return records
+
+    def load_records(self, records):
+        """
+        Store persistence records in the table, later records overwrite earlier ones.
+
+        Raises:
+            ValueError: If a record lies outside the table bounds.
+        """
+        rows = self.index_many(records["state"])
+        # Fancy assignment does not guarantee which duplicate wins, keep the last record of each row
+        _, last = np.unique(rows[::-1], return_index=True)
+        keep = len(rows) - 1 - last
+        visits = self.visits  # Flushes the buffered counts first
+        self.values[rows[keep]] = records["q_values"][keep]
+        visits[rows[keep]] = records["visits"][keep]
+        self._num_visited = int(np.count_nonzero(visits))
+
+def create_q_table(backend, action_size, state_bounds=None):
+    """
+    Create an empty Q-table with the given backend.
+
+    Args:
+        backend (str): "dict" or "dense".
+        action_size (int): Number of possible actions.
+        state_bounds (list): (low, high) bounds of every state variable, required by the dense backend.
+
+    Returns:
+        DictQTable | DenseQTable: The Q-table.
+    """
+    if backend == "dict":
+        return DictQTable(action_size)
+    if backend == "dense":
+        if state_bounds is None:
+            raise ValueError("The dense Q-table backend needs the state bounds.")
+        return DenseQTable(state_bounds, action_size)
+    raise ValueError(f"Unknown Q-table backend: {backend}")
@@ -0,0 +1,69 @@
+import numpy as np
+
+class ReplayBuffer:
+    def __init__(self, capacity, state_size, seed=None, state_dtype=np.int16):
+        """
+        Fixed-capacity ring buffer of transitions for experience replay.
+
+        The arrays are allocated once; when the buffer is full the oldest transitions
+        are overwritten.
+
+        Args:
+            capacity (int): Maximum number of transitions kept.
+            state_size (int): Number of variables in a state.
+            seed (int): Seed of the minibatch sampling (None = different every run).
+            state_dtype (np.dtype): Type of the stored states, int16 for the quantized
+                state tuples (their variables are small integers).
+        """
+        if capacity <= 0:
+            raise ValueError(f"The replay buffer capacity must be positive, got {capacity}.")
+        self.capacity = capacity
+        self.states = np.zeros((capacity, state_size), dtype=state_dtype)
+        self.actions = np.zeros(capacity, dtype=np.uint8)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.next_states = np.zeros((capacity, state_size), dtype=state_dtype)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.size = 0  # Number of stored transitions
+        self.position = 0  # Slot of the next transition
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        """Return the number of stored transitions."""
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        """Store one transition (done: the episode ended in a terminal state, nothing to bootstrap from)."""
+        position = self.position
+        self.states[position] = state
+        self.actions[position] = action
+        self.rewards[position] = reward
+        self.next_states[position] = next_state
+        self.dones[position] = done
+        self.position = (position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def add_many(self, states, actions, rewards, next_states, dones):
+        """Store a batch of transitions given as arrays (the oldest are overwritten when full)."""
+        count = len(actions)
+        if count > self.capacity:  # Only the last capacity transitions would survive
+            states, actions, rewards, next_states, dones = (
+                array[-self.capacity:] for array in (states, actions, rewards, next_states, dones))
+            count = self.capacity
+        slots = (self.position + np.arange(count)) % self.capacity
+        self.states[slots] = states
+        self.actions[slots] = actions
+        self.rewards[slots] = rewards
+        self.next_states[slots] = next_states
+        self.dones[slots] = dones
+        self.position = int((self.position + count) % self.capacity)
+        self.size = min(self.size + count, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        Sample a minibatch uniformly, with replacement.
+
+        Returns:
+            tuple: (states, actions, rewards, next_states, dones) arrays.
+        """
+        indices = self.rng.integers(0, self.size, size=batch_size)
+        return self.states[indices], self.actions[indices], self.rewards[indices], self.next_states[indices], self.dones[indices]
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+class EligibilityTraces:
+    def __init__(self, decay, threshold, max_traces):
+        """
+        Sparse eligibility traces of one stream of transitions (Watkins Q(lambda)).
+
+        Only the recently visited state-action pairs are kept, oldest first. Traces are
+        replacing (a revisited pair goes back to 1 and moves to the end), so they are
+        sorted by value and the pruning of small traces only looks at the front. With at
+        most max_traces pairs, an update costs the same however large the Q-table gets.
+
+        Args:
+            decay (float): Factor applied to every trace after each step (gamma * lambda).
+            threshold (float): Traces below this value are dropped.
+            max_traces (int): Maximum number of traced state-action pairs.
+        """
+        if max_traces <= 0:
+            raise ValueError(f"The maximum number of traces must be positive, got {max_traces}.")
+        self.decay = decay
+        self.threshold = threshold
+        self.max_traces = max_traces
+        self.traces = OrderedDict()  # (key, action) -> [Q-values, trace]
+
+    def __len__(self):
+        """Return the number of traced state-action pairs."""
+        return len(self.traces)
+
+    def clear(self):
+        """Drop every trace (end of episode, or an exploratory action in Watkins Q(lambda))."""
+        self.traces.clear()
+
+    def add(self, key, q_values, action):
+        """
+        Set the trace of a state-action pair to 1.
+
+        Args:
+            key: Key of the state in the Q-table (see entry() of the Q-tables).
+            q_values (np.ndarray): The Q-values of the state, updated in place.
+            action (int): The action taken.
+        """
+        pair = (key, action)
+        self.traces.pop(pair, None)
+        self.traces[pair] = [q_values, 1.0]
+        if len(self.traces) > self.max_traces:
+            self.traces.popitem(last=False)
+
+    def update(self, step, changed):
+        """
+        Move every traced Q-value by step times its trace, then decay and prune the traces.
+
+        Args:
+            step (float): Learning rate times the TD error.
+            changed (set): Changed keys of the Q-table, the traced keys are added to it.
+        """
+        for (key, action), entry in self.traces.items():
+            q_values, trace = entry
+            q_values[action] += step * trace
+            entry[1] = trace * self.decay
+            changed.add(key)
+        while self.traces and next(iter(self.traces.values()))[1] < self.threshold:
+            self.traces.popitem(last=False)
@@ -1,120 +1,265 @@
 import os
+import time
 import pygame
-from config import SESSION_CONFIG
+from config import SESSION_CONFIG, PARALLEL_CONFIG, QL_CONFIG, DQN_CONFIG, VEHICLE_CONFIG, SENSOR_CONFIG, PROFILING_CONFIG, TELEMETRY_CONFIG, TRACK_CONFIG
 from models.vehicle import Vehicle
 from models.environment import Environment
-from machine_learning.q_learning.agent import QLearningAgent
+from machine_learning.agent import create_agent
+from machine_learning.curriculum import TrackCurriculum
+from machine_learning.q_learning.parallel import ParallelTrainer
 from logs.logger import Logger
+from logs.trajectory import TrajectoryRecorder
+from logs.profiling import PhaseTimer, EpisodeProfiler
+from logs.telemetry import TelemetryServer
 
-def run_episode(environment, vehicle, agent, manual_control):
+def run_episode(environment, vehicle, agent, manual_control, render=True, recorder=None, timer=None):
     """
     Run a single episode of the simulation.
 
     Args:
         environment (Environment): The game environment.
         vehicle (Vehicle): The vehicle object.
-        agent (QLearningAgent): The Q-learning agent.
+        agent (Agent): The learning agent.
         manual_control (bool): Whether the vehicle is manually controlled.
+        render (bool): Whether to draw the episode. When False the simulation
+            runs as fast as possible without frame rate limit.
+        recorder (TrajectoryRecorder): Optional recorder of the agent's actions and rewards.
+        timer (PhaseTimer): Optional timer of the loop phases (None when phase timing is off).
 
     Returns:
         tuple: (score, window_closed) - The final score and whether the window was closed.
     """
-    start_ticks = pygame.time.get_ticks()
+    if render:
+        environment.init_display()
+        environment.invalidate_display()  # Repaint the whole window on the first frame
+    frame_clock = pygame.time.Clock()
+    clock = vehicle.clock  # Simulation clock, advanced by every vehicle update
+    max_steps = SESSION_CONFIG["EPISODE_STEPS"]
     run = True
     window_closed = False
+    if recorder:
+        recorder.start_episode(vehicle)
+    if timer:
+        timer.start()
+    state = vehicle.observe()  # Afterwards the next state of each step is the state of the following one
 
+    # Each `if timer:` lap closes the phase that just ran, phases inside the vehicle and
+    # the environment are closed by the methods instrumented in main()
     while run:
-        clock = pygame.time.Clock()
-        clock.tick(60)  # Limit the frame rate to 60 FPS
-        environment.clear_screen()
+        if render:
+            frame_clock.tick(SESSION_CONFIG["FPS"])  # Limit the frame rate while rendering
+            if timer:
+                timer.lap("frame_wait")
 
-        elapsed_time = (pygame.time.get_ticks() - start_ticks) / 1000
-        remaining_time = max(0, SESSION_CONFIG["EPISODE_DURATION"] - elapsed_time)
+        if environment.window is not None:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    run = False
+                    window_closed = True
+                    break
+            if timer:
+                timer.lap("events")
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
-                window_closed = True
-                break
-
-        if remaining_time == 0:
+        if clock.steps >= max_steps:
             run = False
             continue
 
-        environment.draw_circuit()
-
         if manual_control:
             vehicle.handle_manual_input()
             vehicle.calculate_reward()
+            if timer:
+                timer.lap("reward")
         else:
-            state = vehicle.get_state()
             # Use epsilon-greedy only in learning mode
             action = agent.get_action(state, use_epsilon=SESSION_CONFIG["TRAINING_MODE"])
-            vehicle.handle_agent_action(action)
-            reward = vehicle.calculate_reward()
-            next_state = vehicle.get_state()
+            if timer:
+                timer.lap("action")
+            next_state, reward, _ = vehicle.step(action)  # The episode ends below on collision or step budget
+            if timer:
+                timer.lap("reward")  # Reward and next state, after the collision check
+            if recorder:
+                recorder.record_step(action, reward, vehicle.score)
 
             if SESSION_CONFIG["TRAINING_MODE"]:
-                agent.update_q_value(state, action, round(reward, 1), next_state)
+                agent.observe(state, action, round(reward, 1), next_state, vehicle.collided)
                 agent.decay_exploration()
+            state = next_state
+            if timer:
+                timer.lap("learning")
 
         if vehicle.collided:
             run = False
 
-        vehicle.draw(environment.window)
-        environment.draw_hud(vehicle, remaining_time)
-        pygame.display.update()
+        if render:
+            remaining_time = (max_steps - clock.steps) / clock.fps
+            environment.render_frame(vehicle, remaining_time)  # Only the changed areas reach the display
+            if timer:
+                timer.lap("display_update")
+
+        if timer:
+            timer.end_step()
 
+    if SESSION_CONFIG["TRAINING_MODE"] and not manual_control:
+        agent.end_episode(vehicle.score)
+    if recorder:
+        recorder.end_episode()
     return vehicle.score, window_closed
 
+def should_render(episode):
+    """
+    Decide whether the given episode is drawn.
+
+    Args:
+        episode (int): Zero-based episode index.
+
+    Returns:
+        bool: True if the episode should be rendered.
+    """
+    if SESSION_CONFIG["HEADLESS"]:
+        return False
+    if SESSION_CONFIG["MANUAL_CONTROL"]:
+        return True  # The driver needs to see the circuit
+    render_every = SESSION_CONFIG["RENDER_EVERY"]
+    return render_every > 0 and episode % render_every == 0
+
 def main():
     """
     Main function to run the simulation.
     """
-    environment = Environment()
-    vehicle = Vehicle(environment)
     state_size, action_size = 6, 4
-    agent = QLearningAgent(state_size, action_size)
+    agent_kind = SESSION_CONFIG["AGENT"]
+    agent = create_agent(agent_kind, state_size, action_size, state_bounds=Vehicle.get_state_bounds())
 
-    # Load Q-table based on mode
+    # Load the model (Q-table or network) based on mode
     if SESSION_CONFIG["TRAINING_MODE"]:
-        if agent.load_q_table():
-            print(f"Training mode: Q-table loaded from {agent.q_table_path}")
+        if agent.load():
+            print(f"Training mode: Model loaded from {agent.path}")
         else:
-            print("Training mode: No previous Q-table found. Starting fresh.")
+            print("Training mode: No previous model found. Starting fresh.")
     else:
-        if agent.load_q_table():
-            print(f"Evaluation mode: Using saved Q-table from {agent.q_table_path}")
+        if agent.load():
+            print(f"Evaluation mode: Using saved model from {agent.path}")
         else:
-            print("Warning: No Q-table found for evaluation mode!")
+            print("Warning: No model found for evaluation mode!")
             return
 
-    # Setup logging
-    q_table_filename = os.path.basename(agent.q_table_path)
-    log_filename = q_table_filename.replace(".pkl", ".txt")
-    logger = Logger(os.path.join("q_learning", log_filename))
+    # Setup logging, one log directory per agent kind
+    model_name = os.path.splitext(os.path.basename(agent.path))[0]
+    log_filename = model_name + ".metrics"  # Scores of an older .txt log are imported
+    logger = Logger(os.path.join(agent_kind, log_filename))
+
+    # Live metrics for a Prometheus scraper
+    telemetry = None
+    if TELEMETRY_CONFIG["ENABLED"]:
+        telemetry = TelemetryServer(TELEMETRY_CONFIG["HOST"], TELEMETRY_CONFIG["PORT"],
+                                    labels={"agent": agent_kind, "model": model_name})
+        print(f"Serving training metrics on http://{telemetry.host}:{telemetry.port}/metrics")
 
     num_episodes = 1 if SESSION_CONFIG["MANUAL_CONTROL"] else SESSION_CONFIG["NUM_EPISODES"]
 
+    # Parallel training runs the simulation in worker processes, this process only learns
+    if PARALLEL_CONFIG["ENABLED"] and SESSION_CONFIG["TRAINING_MODE"] and not SESSION_CONFIG["MANUAL_CONTROL"]:
+        ParallelTrainer(agent, logger, telemetry).train(num_episodes)
+        logger.close()
+        if telemetry:
+            telemetry.close()
+        agent.close()
+        return
+
+    # Every circuit is preloaded, the curriculum picks the circuit of each episode
+    environment = Environment(headless=SESSION_CONFIG["HEADLESS"], circuits=TRACK_CONFIG["CIRCUITS"])
+    vehicle = Vehicle(environment, raw_state=agent.RAW_STATE)
+    seed = (DQN_CONFIG if agent_kind == "dqn" else QL_CONFIG)["SEED"]
+    curriculum = None
+    if len(environment.circuits) > 1 and not SESSION_CONFIG["MANUAL_CONTROL"]:
+        curriculum = TrackCurriculum.from_config(TRACK_CONFIG, environment.circuits, seed)
+
+    learning = not SESSION_CONFIG["MANUAL_CONTROL"] and SESSION_CONFIG["TRAINING_MODE"]
+
+    # Record the agent's episodes for replay (manual driving has no discrete actions to record)
+    recorder = None
+    if SESSION_CONFIG["RECORD_TRAJECTORIES"] and not SESSION_CONFIG["MANUAL_CONTROL"]:
+        trajectory_path = os.path.join("logs", "trajectories", f"{model_name}_{time.strftime('%Y%m%d-%H%M%S')}.npz")
+        recorder = TrajectoryRecorder(trajectory_path, {
+            "circuit": environment.circuit,
+            "model": model_name,
+            "agent": agent_kind,
+            "training_mode": SESSION_CONFIG["TRAINING_MODE"],
+            "fps": SESSION_CONFIG["FPS"],
+            "seed": seed,
+            "vehicle_config": VEHICLE_CONFIG,
+            "sensor_config": SENSOR_CONFIG
+        })
+
+    # Per-phase timing of the episode loop, the timed methods close their phase when they return
+    timer = None
+    if PROFILING_CONFIG["PHASE_TIMING"]:
+        timer = PhaseTimer()
+        timer.instrument(vehicle, "update_position", "physics")
+        timer.instrument(vehicle, "update_sensors", "sensors")
+        timer.instrument(vehicle, "check_collision", "physics")
+        timer.instrument(vehicle, "draw", "draw_vehicle")  # Includes restoring the background
+        timer.instrument(environment, "draw_hud", "draw_hud")
+
+    profiler = None
+    if PROFILING_CONFIG["PROFILE_EPISODES"]:
+        first_episode, last_episode = PROFILING_CONFIG["PROFILE_EPISODES"]
+        profile_path = os.path.join(PROFILING_CONFIG["PROFILE_DIRECTORY"],
+                                    f"{model_name}_episodes_{first_episode}-{last_episode}.pstats")
+        profiler = EpisodeProfiler(first_episode, last_episode, profile_path)
+
     for episode in range(num_episodes):
         print(f"Starting episode {episode + 1}/{num_episodes}")
+        if curriculum:
+            environment.reset(curriculum.next_circuit())  # Swaps preloaded track data, no loading
         vehicle.reset()
+        if profiler:
+            profiler.start_episode(episode + 1)
+        episode_start = time.perf_counter()
         score, window_closed = run_episode(
-            environment, vehicle, agent, SESSION_CONFIG["MANUAL_CONTROL"]
+            environment, vehicle, agent, SESSION_CONFIG["MANUAL_CONTROL"], render=should_render(episode), recorder=recorder, timer=timer
         )
+        episode_time = time.perf_counter() - episode_start
+        if telemetry:
+            telemetry.record_episode(score, vehicle.clock.steps, agent.exploration_rate, len(agent),
+                                     vehicle.clock.steps / max(episode_time, 1e-9), agent.last_save_duration or None)
+        if profiler:
+            profiler.end_episode(episode + 1)
+        if timer:
+            timer.end_episode(episode + 1)
 
         if window_closed:
             print("Window closed. Ending session.")
             break
 
         # Save Q-table and log score only in training mode
-        if not SESSION_CONFIG["MANUAL_CONTROL"] and SESSION_CONFIG["TRAINING_MODE"]:
-            agent.save_q_table()
-            logger.log_score(score)
+        if learning:
+            if (episode + 1) % agent.save_interval == 0:
+                agent.save()  # Written on a background thread
+            logger.log_episode(score, vehicle.clock.steps, agent.exploration_rate, len(agent),
+                               vehicle.clock.steps / max(episode_time, 1e-9))
 
         mode = "Training" if SESSION_CONFIG["TRAINING_MODE"] else "Evaluation"
-        print(f"{mode} episode {episode + 1} completed. Score: {score}")
+        if curriculum:
+            curriculum.record(environment.circuit, score)
+            print(f"{mode} episode {episode + 1} completed on {environment.circuit}. Score: {score}")
+        else:
+            print(f"{mode} episode {episode + 1} completed. Score: {score}")
+
+    if curriculum:
+        print(curriculum.format_summary())
 
+    if profiler:
+        profiler.close()  # The session ended before the last profiled episode
+    if recorder:
+        recorder.close()
+        print(f"Trajectories recorded to {recorder.path}")
+    logger.close()  # Writes the buffered episodes
+    if telemetry:
+        telemetry.close()
+    if learning:
+        agent.save()
+    agent.close()  # Waits for the pending saves
     pygame.quit()
 
 if __name__ == "__main__":
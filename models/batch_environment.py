@@ -0,0 +1,318 @@
+import math
+import numpy as np
+from models.vehicle import Vehicle
+from models.track import OFF_ROAD
+from models.checkpoint import CHECKPOINT_COOLDOWN, crossed_checkpoints
+from config import VEHICLE_CONFIG, SESSION_CONFIG
+
+# Road status codes, in the order of Vehicle.check_road_status
+ON_ROAD = 0
+PARTIALLY_OFF = 1
+COMPLETELY_OFF = 2
+
+# Indices of the lateral sensors used by the distance reward
+LATERAL_SENSORS = [0, 1, 3, 4]
+
+def round_like_python(values, digits=1):
+    """
+    Round an array exactly like the built-in round().
+
+    np.round scales by a power of ten first, which breaks ties such as 0.35 differently
+    than round() does, so the few values sitting on a tie are rounded one by one.
+
+    Args:
+        values (np.ndarray): float64 values.
+        digits (int): Number of decimals.
+
+    Returns:
+        np.ndarray: The rounded values.
+    """
+    rounded = np.round(values, digits)
+    scaled = values * 10 ** digits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(value, digits) for value in values[near_tie].tolist()]
+    return rounded
+
+class BatchEnvironment:
+    def __init__(self, environment, num_vehicles):
+        """
+        Simulate several independent vehicles on the same circuit with vectorized physics.
+
+        The state of every vehicle lives in NumPy arrays (one entry per vehicle) and
+        one call to step() advances all of them with the same physics, sensors and
+        rewards as Vehicle.
+
+        Args:
+            environment (Environment): The environment holding the circuit.
+            num_vehicles (int): Number of vehicles simulated together.
+        """
+        self.environment = environment
+        self.num_vehicles = num_vehicles
+
+        # A regular vehicle provides the start pose and the sensor layout
+        template = Vehicle(environment)
+        self.initial_position = template.initial_position
+        self.initial_angle = template.initial_angle
+        self.width = template.width
+        self.height = template.height
+        self.acceleration = template.acceleration
+        self.deceleration = template.deceleration
+        self.rotation_speed = template.rotation_speed
+        self.quantizer = template.quantizer
+        self.sensor_offsets = np.array([sensor.angle_offset for sensor in template.sensors], dtype=np.float64)
+        self.sensor_lengths = np.array([int(sensor.length) for sensor in template.sensors], dtype=np.int64)
+        self.max_speed_limits = np.array([
+            VEHICLE_CONFIG["MAX_SPEED"],
+            VEHICLE_CONFIG["MAX_SPEED_PARTIALLY_OFF"],
+            VEHICLE_CONFIG["MAX_SPEED_COMPLETELY_OFF"]
+        ], dtype=np.float64)
+        self.max_steps = SESSION_CONFIG["EPISODE_STEPS"]
+        self.checkpoint_order = np.array(environment.track.checkpoint_order, dtype=np.int64)
+
+        # Struct-of-arrays vehicle state
+        self.x = np.zeros(num_vehicles)
+        self.y = np.zeros(num_vehicles)
+        self.angle = np.zeros(num_vehicles)
+        self.speed = np.zeros(num_vehicles)
+        self.max_speed = np.full(num_vehicles, float(VEHICLE_CONFIG["MAX_SPEED"]))  # Kept across resets, like Vehicle
+        self.score = np.zeros(num_vehicles)
+        self.collided = np.zeros(num_vehicles, dtype=bool)
+        self.steps = np.zeros(num_vehicles, dtype=np.int64)
+        self.sensor_distances = np.zeros((num_vehicles, len(self.sensor_offsets)), dtype=np.int64)
+        self.next_checkpoint = np.zeros(num_vehicles, dtype=np.int64)  # Index in checkpoint_order of the next line
+        # Time each vehicle last crossed each checkpoint line (column = line ID), NaN if never
+        self.checkpoint_crossed = np.full((num_vehicles, len(self.checkpoint_order) + 1), np.nan)
+
+        # Corner offsets of the vehicle rectangle relative to its center, see Vehicle.get_rotated_vertices
+        half_width, half_height = self.width // 2, self.height // 2
+        self.corner_dx = np.array([-half_width, self.width - half_width, self.width - half_width, -half_width], dtype=np.float64)
+        self.corner_dy = np.array([-half_height, -half_height, self.height - half_height, self.height - half_height], dtype=np.float64)
+
+    def reset(self, mask=None):
+        """
+        Put vehicles back at the start position.
+
+        The sensors are read at the start pose, whereas a reset Vehicle keeps the readings
+        of its last pose until its next step; the states of every step after that match.
+
+        Args:
+            mask (np.ndarray): Optional boolean mask of the vehicles to reset. Defaults to all.
+
+        Returns:
+            np.ndarray: int64 states of shape (num_vehicles, 6), see get_states.
+        """
+        if mask is None:
+            mask = np.ones(self.num_vehicles, dtype=bool)
+        self.x[mask], self.y[mask] = self.initial_position
+        self.angle[mask] = self.initial_angle
+        self.speed[mask] = 0
+        self.score[mask] = 0
+        self.collided[mask] = False
+        self.steps[mask] = 0
+        self.next_checkpoint[mask] = 0
+        self.checkpoint_crossed[mask] = np.nan
+        self.sensor_distances[mask] = self._read_sensors(np.flatnonzero(mask))
+        return self.get_states()
+
+    def step(self, actions):
+        """
+        Apply one action per vehicle and advance the simulation by one step.
+
+        Vehicles that are already done are left untouched (and receive no reward) until reset.
+
+        Args:
+            actions (np.ndarray): int array of shape (num_vehicles,) with the agent actions 0-3.
+
+        Returns:
+            tuple: (states, rewards, dones) as arrays of shape (num_vehicles, 6), (num_vehicles,)
+                and (num_vehicles,).
+        """
+        active = np.flatnonzero(~self.get_dones())
+        actions = np.asarray(actions)[active]
+        speed = self.speed[active]
+        angle = self.angle[active]
+        max_speed = self.max_speed[active]
+
+        # Actions: 0 accelerate, 1 rotate left, 2 rotate right, 3 decelerate
+        speed = np.where(actions == 0, np.minimum(speed + self.acceleration, max_speed), speed)
+        rotation = np.where(actions == 1, self.rotation_speed, np.where(actions == 2, -self.rotation_speed, 0))
+        rotating = rotation != 0
+        angle = np.where(rotating, (angle + rotation * (speed / max_speed)) % 360, angle)
+        speed = np.where(actions == 3, speed * self.deceleration, speed)
+
+        # Move and adapt the speed limit to the road status at the new position
+        previous_x, previous_y = self.x[active], self.y[active]
+        rad_angle = np.radians(angle)
+        x = self.x[active] + speed * np.cos(rad_angle)
+        y = self.y[active] - speed * np.sin(rad_angle)
+        road_status = self._road_status(x, y, rad_angle)
+        max_speed = self.max_speed_limits[road_status]
+        speed = np.minimum(speed, max_speed)
+
+        self.x[active], self.y[active] = x, y
+        self.angle[active] = angle
+        self.speed[active] = speed
+        self.max_speed[active] = max_speed
+        self.sensor_distances[active] = self._read_sensors(active)
+
+        if VEHICLE_CONFIG["COLLISION_TYPE"] == "WINDOW":
+            self.collided[active] = ~((self.width / 2 < x) & (x < self.environment.SCREEN_WIDTH - self.width / 2) &
+                                      (self.height / 2 < y) & (y < self.environment.SCREEN_HEIGHT - self.height / 2))
+        elif VEHICLE_CONFIG["COLLISION_TYPE"] == "CIRCUIT":
+            self.collided[active] = road_status != ON_ROAD
+        self.steps[active] += 1
+
+        checkpoint_rewards = np.zeros(len(active))
+        if VEHICLE_CONFIG["CHECKPOINT_REWARD"] and len(self.checkpoint_order):
+            checkpoint_rewards = self._cross_checkpoints(active, previous_x, previous_y)
+
+        rewards = np.zeros(self.num_vehicles)
+        rewards[active] = self._calculate_rewards(active, checkpoint_rewards)
+        self.score[active] = round_like_python(self.score[active] + rewards[active])
+        return self.get_states(), rewards, self.get_dones()
+
+    def get_states(self):
+        """
+        Get the discretized state of every vehicle, matching Vehicle.get_state.
+
+        Returns:
+            np.ndarray: int64 array of shape (num_vehicles, 6): the speed bin followed by the sensor bins.
+        """
+        return self.quantizer.quantize_many(self.speed, self.sensor_distances)
+
+    def get_dones(self):
+        """Get which vehicles have crashed or used up their episode steps."""
+        return self.collided | (self.steps >= self.max_steps)
+
+    def _is_on_road(self, x, y):
+        """Vectorized Vehicle.is_on_road for arrays of positions."""
+        inside = (x >= 0) & (x < self.environment.SCREEN_WIDTH) & (y >= 0) & (y < self.environment.SCREEN_HEIGHT)
+        on_road = np.zeros(x.shape, dtype=bool)
+        on_road[inside] = self.environment.track_grid[x[inside].astype(np.intp), y[inside].astype(np.intp)] != OFF_ROAD
+        return on_road
+
+    def _road_status(self, x, y, rad_angle):
+        """
+        Vectorized Vehicle.check_road_status.
+
+        Args:
+            x, y (np.ndarray): Centers of the vehicles.
+            rad_angle (np.ndarray): Vehicle angles in radians.
+
+        Returns:
+            np.ndarray: Road status codes (ON_ROAD, PARTIALLY_OFF or COMPLETELY_OFF).
+        """
+        # pygame.Rect truncates its float position, the rectangle center is then an integer
+        cx = np.trunc(x - self.width / 2)[:, None] + self.width // 2
+        cy = np.trunc(y - self.height / 2)[:, None] + self.height // 2
+        cos_angle, sin_angle = np.cos(rad_angle)[:, None], np.sin(rad_angle)[:, None]
+        vertex_x = cx + self.corner_dx * cos_angle - self.corner_dy * sin_angle
+        vertex_y = cy + self.corner_dx * sin_angle + self.corner_dy * cos_angle
+
+        on_road_count = self._is_on_road(vertex_x, vertex_y).sum(axis=1)
+        return np.where(on_road_count == 4, ON_ROAD, np.where(on_road_count > 0, PARTIALLY_OFF, COMPLETELY_OFF))
+
+    def _read_sensors(self, indices):
+        """
+        Vectorized Sensor.update for the given vehicles.
+
+        Args:
+            indices (np.ndarray): Indices of the vehicles to read.
+
+        Returns:
+            np.ndarray: int64 sensor readings of shape (len(indices), num_sensors).
+        """
+        x = np.repeat(self.x[indices], len(self.sensor_offsets))
+        y = np.repeat(self.y[indices], len(self.sensor_offsets))
+        sensor_angle = np.radians((self.angle[indices][:, None] + self.sensor_offsets).ravel())
+        lengths = np.tile(self.sensor_lengths, len(indices))
+        on_road = np.repeat(self._is_on_road(self.x[indices], self.y[indices]), len(self.sensor_offsets))
+
+        distances = self._cast_rays(x, y, np.cos(sensor_angle), np.sin(sensor_angle), lengths, on_road)
+        return distances.reshape(len(indices), len(self.sensor_offsets))
+
+    def _cast_rays(self, x, y, cos_angle, sin_angle, lengths, on_road):
+        """
+        Vectorized Sensor._calculate_distance over a flat batch of rays.
+
+        Uses the environment's distance field when it is loaded, and a full scan otherwise.
+
+        Returns:
+            np.ndarray: int64 distances (positive if on road, negative if off road).
+        """
+        grid = self.environment.track_grid
+        width, height = self.environment.SCREEN_WIDTH, self.environment.SCREEN_HEIGHT
+        # Default result when nothing is detected: the max length on road, 0 off road
+        distances = np.where(on_road, lengths, 0)
+
+        if self.environment.distance_field is None:
+            steps = np.arange(self.sensor_lengths.max())
+            check_x = (x[:, None] + steps * cos_angle[:, None]).astype(np.intp)
+            check_y = (y[:, None] - steps * sin_angle[:, None]).astype(np.intp)
+            inside = (check_x >= 0) & (check_x < width) & (check_y >= 0) & (check_y < height) & (steps < lengths[:, None])
+            labels = grid[np.where(inside, check_x, 0), np.where(inside, check_y, 0)]
+            hits = inside & ((labels != OFF_ROAD) != on_road[:, None])
+            found = hits.any(axis=1)
+            first = hits.argmax(axis=1)
+            distances[found] = np.where(on_road[found], first[found], -first[found])
+            return distances
+
+        distance_field = self.environment.distance_field
+        d = np.zeros(len(x), dtype=np.int64)
+        pending = np.flatnonzero(d < lengths)
+        while len(pending):
+            check_x = (x[pending] + d[pending] * cos_angle[pending]).astype(np.intp)
+            check_y = (y[pending] - d[pending] * sin_angle[pending]).astype(np.intp)
+            inside = (check_x >= 0) & (check_x < width) & (check_y >= 0) & (check_y < height)
+            check_x, check_y = np.where(inside, check_x, 0), np.where(inside, check_y, 0)
+
+            # A road pixel stops an off-road ray and vice versa
+            hit = inside & ((grid[check_x, check_y] != OFF_ROAD) != on_road[pending])
+            hit_rays = pending[hit]
+            distances[hit_rays] = np.where(on_road[hit_rays], d[hit_rays], -d[hit_rays])
+
+            # Skip the samples the distance field guarantees to be clear
+            d[pending] += np.where(inside, distance_field[check_x, check_y].astype(np.int64) + 1, 1)
+            pending = pending[~hit & (d[pending] < lengths[pending])]
+        return distances
+
+    def _cross_checkpoints(self, indices, previous_x, previous_y):
+        """
+        Vectorized Vehicle.check_checkpoint for the given vehicles, which just moved from (previous_x, previous_y).
+
+        The cooldown is measured in simulation time, like the SimulationClock of a Vehicle (steps / FPS).
+
+        Returns:
+            np.ndarray: Checkpoint reward of each vehicle.
+        """
+        track = self.environment.track
+        rewards = np.zeros(len(indices))
+        x, y = self.x[indices], self.y[indices]
+
+        # Only test the vehicles that moved close enough to a checkpoint line
+        inside = (previous_x >= 0) & (previous_x < self.environment.SCREEN_WIDTH) & (previous_y >= 0) & (previous_y < self.environment.SCREEN_HEIGHT)
+        nearest = track.checkpoint_distance[np.where(inside, previous_x, 0).astype(np.intp), np.where(inside, previous_y, 0).astype(np.intp)]
+        candidates = np.flatnonzero(~inside | (nearest <= np.hypot(x - previous_x, y - previous_y) + 2))
+        if len(candidates) == 0:
+            return rewards
+
+        vehicles = indices[candidates]
+        crossed = crossed_checkpoints(track.checkpoint_ids, previous_x[candidates], previous_y[candidates], x[candidates], y[candidates])
+        current_time = self.steps[vehicles] / SESSION_CONFIG["FPS"]
+        last_crossed = self.checkpoint_crossed[vehicles, crossed]
+        hit = (crossed == self.checkpoint_order[self.next_checkpoint[vehicles]]) & (
+            np.isnan(last_crossed) | (current_time - last_crossed >= CHECKPOINT_COOLDOWN))
+
+        vehicles, crossed = vehicles[hit], crossed[hit]
+        self.checkpoint_crossed[vehicles, crossed] = current_time[hit]
+        self.next_checkpoint[vehicles] = (self.next_checkpoint[vehicles] + 1) % len(self.checkpoint_order)
+        rewards[candidates[hit]] = VEHICLE_CONFIG["CHECKPOINT_REWARD"]
+        return rewards
+
+    def _calculate_rewards(self, indices, checkpoint_rewards):
+        """Vectorized Vehicle.calculate_reward for the given vehicles (without updating the score)."""
+        reward_speed = round_like_python(self.speed[indices] / 6)
+        reward_distance = round_like_python(self.sensor_distances[indices][:, LATERAL_SENSORS].min(axis=1) / 100)
+        rewards = round_like_python(reward_speed * reward_distance) + checkpoint_rewards
+        return rewards - np.where(self.collided[indices], 25, 0)
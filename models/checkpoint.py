@@ -1,11 +1,85 @@
-# Cooldown duration for the checkpoint in seconds
+import math
+import numpy as np
+
+# Cooldown duration for the checkpoint in simulated seconds (see SimulationClock)
 CHECKPOINT_COOLDOWN = 5
 
 class Checkpoint:
-    def __init__(self, position):
-        self.position = position
-        self.last_crossed = 0  # Time when the checkpoint was last crossed
+    def __init__(self, checkpoint_id):
+        self.checkpoint_id = checkpoint_id  # ID of the checkpoint line in the track's checkpoint_ids grid
+        self.last_crossed = 0  # Simulation time when the checkpoint was last crossed
 
     def is_active(self, current_time):
-        """Check if the checkpoint is active based on the current time."""
+        """Check if the checkpoint is active based on the current simulation time."""
         return current_time - self.last_crossed >= CHECKPOINT_COOLDOWN
+
+def crossed_checkpoint(checkpoint_ids, x0, y0, x1, y1):
+    """
+    Scalar crossed_checkpoints for a single segment, cheaper than the array version for one vehicle.
+
+    Returns:
+        int: ID of the first checkpoint line crossed, 0 if none.
+    """
+    dx, dy = x1 - x0, y1 - y0
+    t = [0.0, 1.0]
+    for start, delta in ((x0, dx), (y0, dy)):
+        if delta:
+            low = math.floor(min(start, start + delta))
+            t.extend((border - start) / delta for border in range(low + 1, math.floor(max(start, start + delta)) + 1))
+    t.sort()
+
+    width, height = checkpoint_ids.shape
+    for t0, t1 in zip(t, t[1:]):
+        middle = (t0 + t1) / 2
+        px, py = math.floor(x0 + middle * dx), math.floor(y0 + middle * dy)
+        if 0 <= px < width and 0 <= py < height:
+            checkpoint_id = checkpoint_ids[px, py]
+            if checkpoint_id:
+                return int(checkpoint_id)
+    return 0
+
+def crossed_checkpoints(checkpoint_ids, x0, y0, x1, y1):
+    """
+    Find the first checkpoint line crossed by each movement segment.
+
+    Every pixel the segment from (x0, y0) to (x1, y1) passes through is tested, in
+    order, so a fast vehicle cannot jump over a one pixel wide line between two steps.
+    The pixels are found from the parameters t at which the segment crosses the
+    vertical and horizontal pixel borders: the midpoint between two consecutive
+    crossings lies inside one pixel of the path.
+
+    Args:
+        checkpoint_ids (np.ndarray): Checkpoint line ID grid of the track (0 = no checkpoint).
+        x0, y0, x1, y1 (np.ndarray): float arrays of shape (n,), segment start and end points.
+
+    Returns:
+        np.ndarray: int64 array of shape (n,) with the ID of the first line crossed, 0 if none.
+    """
+    x0, y0, x1, y1 = (np.asarray(value, dtype=np.float64).reshape(-1) for value in (x0, y0, x1, y1))
+    dx, dy = x1 - x0, y1 - y0
+    if len(x0) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    def border_crossings(start, delta):
+        # t of every integer border between start and start + delta, NaN padded to the longest segment
+        low = np.floor(np.minimum(start, start + delta))
+        count = (np.floor(np.maximum(start, start + delta)) - low).astype(np.int64)
+        borders = low[:, None] + 1 + np.arange(count.max())
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (borders - start[:, None]) / delta[:, None]
+        return np.where(np.arange(count.max()) < count[:, None], t, np.nan)
+
+    edges = np.zeros((len(x0), 2))
+    edges[:, 1] = 1
+    t = np.sort(np.concatenate((edges, border_crossings(x0, dx), border_crossings(y0, dy)), axis=1), axis=1)  # NaN sort last
+    middle = (t[:, :-1] + t[:, 1:]) / 2
+    valid = ~np.isnan(middle)
+    middle = np.where(valid, middle, 0)
+    px = np.floor(x0[:, None] + middle * dx[:, None]).astype(np.int64)
+    py = np.floor(y0[:, None] + middle * dy[:, None]).astype(np.int64)
+
+    width, height = checkpoint_ids.shape
+    valid &= (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    ids = np.where(valid, checkpoint_ids[np.where(valid, px, 0), np.where(valid, py, 0)], 0).astype(np.int64)
+    first = np.argmax(ids > 0, axis=1)  # First pixel of the path on a checkpoint (0 if none, which holds ID 0 then)
+    return ids[np.arange(len(x0)), first]
@@ -0,0 +1,30 @@
+from config import SESSION_CONFIG
+
+class SimulationClock:
+    def __init__(self, fps=None):
+        """
+        Simulation time, advanced by a fixed timestep on every simulation step.
+
+        Game logic (reward timers, checkpoint cooldowns) reads this clock instead of the
+        wall clock, so an episode plays out the same whether it is rendered at FPS or
+        simulated as fast as possible.
+
+        Args:
+            fps (int): Simulation steps per simulated second. Defaults to SESSION_CONFIG["FPS"].
+        """
+        self.fps = fps if fps is not None else SESSION_CONFIG["FPS"]
+        self.timestep = 1 / self.fps
+        self.steps = 0
+
+    @property
+    def time(self):
+        """Simulated seconds since the last reset (computed from the step count, so it never drifts)."""
+        return self.steps / self.fps
+
+    def tick(self):
+        """Advance the clock by one timestep."""
+        self.steps += 1
+
+    def reset(self):
+        """Restart the clock at time 0."""
+        self.steps = 0
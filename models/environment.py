@@ -1,10 +1,28 @@
 import os
 import pygame
-import math
-from config import WINDOW_CONFIG, COLOR_CONFIG, FONT_CONFIG
+import numpy as np
+from config import WINDOW_CONFIG, COLOR_CONFIG, FONT_CONFIG, TRACK_CONFIG
+from models.track import load_track_bundle, load_circuit_surface, load_distance_field
+
+# Rendered HUD text boxes kept for reuse, the cache is emptied when it holds more
+TEXT_CACHE_SIZE = 1024
 
 class Environment:
-    def __init__(self):
+    def __init__(self, headless=False, circuit=None, circuits=None):
+        """
+        Initialize the environment and load the circuits.
+
+        Every circuit is loaded once, so switching circuits between episodes (see reset)
+        only swaps references to data already in memory.
+
+        Args:
+            headless (bool): Use SDL's dummy drivers so no window (or audio device) is opened.
+            circuit (str): Circuit image in assets/images driven first. Defaults to the
+                first of `circuits`, or TRACK_CONFIG["CIRCUIT"].
+            circuits (list): Circuit images to preload. Defaults to `circuit` alone.
+        """
+        self.headless = headless
+
         # Attributes: Dimensions
         self.SCREEN_WIDTH = WINDOW_CONFIG["WIDTH"]
         self.SCREEN_HEIGHT = WINDOW_CONFIG["HEIGHT"]
@@ -19,7 +37,87 @@ class Environment:
         self.TEXT_COLOR = COLOR_CONFIG["WHITE"]
         self.TEXTBOX_COLOR = COLOR_CONFIG["BLACK"]
 
-        # Initialize PyGame
+        # The dummy drivers must be selected before PyGame initializes its display
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+        # Display, fonts and the circuit image are only needed to render, see init_display
+        self.window = None
+        self.FONT_BIG = None
+        self.FONT_SMALL = None
+        self.CIRCUIT_IMAGE = None
+        self._backgrounds = {}  # Circuit -> static layer of the window, see init_display
+
+        # Get the absolute path of the directory where the .py file is running
+        self.parent_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.cache_directory = os.path.join(self.parent_directory, TRACK_CONFIG["CACHE_DIRECTORY"])
+        self.circuits = list(circuits or [circuit or TRACK_CONFIG["CIRCUIT"]])
+        if circuit is not None and circuit not in self.circuits:
+            self.circuits.append(circuit)
+
+        # Load the compiled circuits (label grid, start pose, checkpoints), compiling those whose image changed.
+        # The arrays are memory-mapped read-only, so every process training on a circuit shares one copy.
+        self.tracks = {}
+        for name in self.circuits:
+            track = load_track_bundle(self.get_circuit_path(name), (self.SCREEN_WIDTH, self.SCREEN_HEIGHT),
+                                      (self.ROAD_COLOR, self.CHECKPOINT_COLOR, self.START_COLOR), self.cache_directory)
+            if track.start_position is None:
+                raise ValueError(f"Could not find a valid starting position on {name}.")
+            self.tracks[name] = track
+
+        # Sensor distance fields (circuit -> field), loaded on demand by the vehicle's sensors
+        self._distance_fields = {}
+        self.distance_field_range = 0
+
+        self.select_circuit(circuit or self.circuits[0])
+
+    def get_circuit_path(self, circuit):
+        """Get the path of a circuit image in assets/images."""
+        return os.path.join(self.parent_directory, "assets", "images", circuit)
+
+    def select_circuit(self, circuit):
+        """
+        Make a preloaded circuit the active one.
+
+        Only references are swapped (track data, distance field, window background), so
+        switching costs the same whatever the size of the circuits.
+
+        Args:
+            circuit (str): One of self.circuits.
+
+        Raises:
+            ValueError: If the circuit was not preloaded.
+        """
+        if circuit not in self.tracks:
+            raise ValueError(f"Circuit {circuit} was not preloaded, available circuits: {self.circuits}")
+        self.circuit = circuit
+        self.circuit_image_path = self.get_circuit_path(circuit)
+        self.track = self.tracks[circuit]
+        # Every road test is a plain array lookup (a plain ndarray view of the mapped file is cheaper to index)
+        self.track_grid = np.asarray(self.track.grid)
+        self.distance_field = self._distance_fields.get(circuit)
+        if self.window is not None:
+            self.CIRCUIT_IMAGE, self.background = self._backgrounds[circuit]
+            self._vehicle_rects = []
+            self._full_redraw = True
+
+    def reset(self, circuit=None):
+        """
+        Prepare the next episode, on another preloaded circuit if given.
+
+        Call before Vehicle.reset, which puts the vehicle at the start of the active circuit.
+
+        Args:
+            circuit (str): Circuit of the episode, None to keep the active one.
+        """
+        if circuit is not None and circuit != self.circuit:
+            self.select_circuit(circuit)
+
+    def init_display(self):
+        """Open the window and load the fonts and the circuit image. Does nothing if already done."""
+        if self.window is not None:
+            return
         pygame.init()
 
         # Font for score and timer text
@@ -31,111 +129,136 @@ class Environment:
         self.window = pygame.display.set_mode((self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
         pygame.display.set_caption("Self Driving AI")
 
-        # Get the absolute path of the directory where the .py file is running
-        parent_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        circuit_image_path = os.path.join(parent_directory, "assets/images/circuit_2.png")
+        # Load the circuit images, each with the static layer restored under everything that moves (see render_frame)
+        for name in self.circuits:
+            image = load_circuit_surface(self.get_circuit_path(name), (self.SCREEN_WIDTH, self.SCREEN_HEIGHT)).convert()
+            background = pygame.Surface((self.SCREEN_WIDTH, self.SCREEN_HEIGHT)).convert()
+            background.fill(self.BACKGROUND_COLOR)
+            background.blit(image, (0, 0))
+            self._backgrounds[name] = (image, background)
+        self.CIRCUIT_IMAGE, self.background = self._backgrounds[self.circuit]
+        self._text_boxes = {}  # (font, text) -> rendered text box
+        self._hud_fields = {}  # HUD field name -> (text, text box surface, rect) currently on screen
+        self._vehicle_rects = []  # Rectangles covered by the vehicle and its sensors in the last frame
+        self._full_redraw = True
+
+    def load_distance_field(self, max_distance):
+        """
+        Load the cached sensor distance field of every circuit, building it on the first run.
 
-        # Load the circuit image from the relative path
-        self.CIRCUIT_IMAGE = pygame.image.load(circuit_image_path).convert()
-        self.CIRCUIT_IMAGE = pygame.transform.scale(self.CIRCUIT_IMAGE, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
+        Args:
+            max_distance (int): Longest sensor ray that will use the field.
+        """
+        if self._distance_fields and self.distance_field_range >= max_distance:
+            self.distance_field = self._distance_fields[self.circuit]
+            return  # A field built for longer rays also serves shorter ones
+        for name, track in self.tracks.items():
+            self._distance_fields[name] = np.asarray(load_distance_field(np.asarray(track.grid), max_distance, self.cache_directory))
+        self.distance_field = self._distance_fields[self.circuit]
+        self.distance_field_range = max_distance
 
     def find_start_position(self):
-        """Find the first pixel with the start color and determine the initial direction."""
-        for y in range(self.CIRCUIT_IMAGE.get_height()):
-            for x in range(self.CIRCUIT_IMAGE.get_width()):
-                if self.CIRCUIT_IMAGE.get_at((x, y)) == self.START_COLOR:
-                    # Look for the road direction
-                    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # left, right, up, down
-                    for dx, dy in directions:
-                        nx, ny = x + dx, y + dy
-                        if 0 <= nx < self.CIRCUIT_IMAGE.get_width() and 0 <= ny < self.CIRCUIT_IMAGE.get_height():
-                            if self.CIRCUIT_IMAGE.get_at((nx, ny)) == self.ROAD_COLOR:
-                                # Calculate the initial angle
-                                angle = math.degrees(math.atan2(-dy, dx))
-                                return x, y, angle
-        return None
-
-    def draw_circuit(self):
-        """Draw the circuit image onto the window."""
-        self.window.blit(self.CIRCUIT_IMAGE, (0, 0))
-
-    def clear_screen(self):
-        """Clear the screen with the background color."""
-        self.window.fill(self.BACKGROUND_COLOR)
-
-    def draw_hud(self, vehicle, remaining_time):
-        """Draw the entire HUD (Head-Up Display)."""
-        self.draw_score(vehicle.score)
-        self.draw_timer(remaining_time)
-        self.draw_speed(vehicle.speed)
-        self.draw_sensor_values(vehicle.sensors)
-        is_on_track = vehicle.check_road_status(vehicle.x, vehicle.y) != "completely_off"
-        self.draw_vehicle_status(is_on_track, vehicle.angle)
-
-    def draw_score(self, vehicle_score):
-        """Draw the score in the top-left corner."""
-        score_text = self.FONT_BIG.render(f"Score: {vehicle_score}", True, self.TEXT_COLOR)
-        score_rect = score_text.get_rect()
-        score_rect.topleft = (10, 10)
-        pygame.draw.rect(self.window, self.TEXTBOX_COLOR, (score_rect.left - 5, score_rect.top - 5, 
-                                         score_rect.width + 10, score_rect.height + 10))
-        self.window.blit(score_text, score_rect)
-
-    def draw_timer(self, remaining_time):
-        """Draw the timer in the top-right corner."""
-        timer_text = self.FONT_BIG.render(f"Time: {remaining_time:.1f}", True, self.TEXT_COLOR)
-        timer_rect = timer_text.get_rect()
-        timer_rect.topright = (self.SCREEN_WIDTH - 10, 10)
-        pygame.draw.rect(self.window, self.TEXTBOX_COLOR, (timer_rect.left - 5, timer_rect.top - 5, 
-                                         timer_rect.width + 10, timer_rect.height + 10))
-        self.window.blit(timer_text, timer_rect)
-
-    def draw_speed(self, vehicle_speed):
-        """Draw the current speed of the vehicle in the bottom-right corner."""
-        speed_text = self.FONT_BIG.render(f"Speed: {vehicle_speed:.1f}", True, self.TEXT_COLOR)
-        speed_rect = speed_text.get_rect()
-        speed_rect.bottomright = (self.SCREEN_WIDTH - 10, self.SCREEN_HEIGHT - 10)
-        pygame.draw.rect(self.window, self.TEXTBOX_COLOR, (speed_rect.left - 5, speed_rect.top - 5, 
-                                            speed_rect.width + 10, speed_rect.height + 10))
-        self.window.blit(speed_text, speed_rect)
-
-    def draw_sensor_values(self, vehicle_sensors):
-        """Draw the sensor values in the bottom-right corner, just above the speed indicator."""
-        sensor_texts = [f"Sensor {i+1}: {sensor.distance:.1f}" for i, sensor in enumerate(vehicle_sensors)]
-        sensor_texts.reverse()  # Reverse the order of the sensor values
-
-        base_x = self.SCREEN_WIDTH - 10
-        base_y = self.SCREEN_HEIGHT - 50  # Located just above the speed indicator
-
-        for i, sensor_text in enumerate(sensor_texts):
-            text_surface = self.FONT_SMALL.render(sensor_text, True, self.TEXT_COLOR)
-            text_rect = text_surface.get_rect()
-            text_rect.bottomright = (base_x, base_y - i * 20)  # Place the text in order
-            pygame.draw.rect(self.window, self.TEXTBOX_COLOR, (text_rect.left - 5, text_rect.top - 5,
-                                                            text_rect.width + 10, text_rect.height + 10))
-            self.window.blit(text_surface, text_rect)
-
-    def draw_vehicle_status(self, is_on_track, vehicle_angle):
-        """Draw the vehicle's on-track status and current angle in the bottom-right corner."""
-        status_text = "On Track: " + ("Yes" if is_on_track else "No")
-        angle_text = f"Angle: {vehicle_angle:.1f}°"
-
-        base_x = self.SCREEN_WIDTH - 10  # Position from the right
-        base_y = self.SCREEN_HEIGHT - 178  # Positioned above the sensor info
-
-        # Draw the on-track status
-        status_surface = self.FONT_SMALL.render(status_text, True, self.TEXT_COLOR)
-        status_rect = status_surface.get_rect()
-        status_rect.bottomright = (base_x, base_y)
-        pygame.draw.rect(self.window, self.TEXTBOX_COLOR, (status_rect.left - 5, status_rect.top - 5,
-                                                            status_rect.width + 10, status_rect.height + 10))
-        self.window.blit(status_surface, status_rect)
-
-        # Draw the vehicle angle
-        angle_surface = self.FONT_SMALL.render(angle_text, True, self.TEXT_COLOR)
-        angle_rect = angle_surface.get_rect()
-        angle_rect.bottomright = (base_x, base_y + 20)  # Position below the status text
-        pygame.draw.rect(self.window, self.TEXTBOX_COLOR, (angle_rect.left - 5, angle_rect.top - 5,
-                                                            angle_rect.width + 10, angle_rect.height + 10))
-        self.window.blit(angle_surface, angle_rect)
+        """Get the start pose (x, y, angle) of the circuit, or None if it has no start line."""
+        return self.track.start_position
+
+    def invalidate_display(self):
+        """Make the next render_frame redraw and update the whole window."""
+        self._full_redraw = True
+
+    def render_frame(self, vehicle, remaining_time):
+        """
+        Draw one frame, sending only the changed parts of the window to the display.
+
+        The circuit is drawn once into a static background layer. Each frame restores
+        the background under the previous vehicle and sensors, draws them at their new
+        position and blits the cached HUD fields; only these dirty rectangles (and HUD
+        fields whose text changed) are updated on the display.
+
+        Args:
+            vehicle (Vehicle): The vehicle to draw.
+            remaining_time (float): Seconds left in the episode.
+        """
+        full_redraw = self._full_redraw
+        if full_redraw:
+            self.window.blit(self.background, (0, 0))
+            self._vehicle_rects = []
+            self._hud_fields = {}
+        hud_fields = self._hud_values(vehicle, remaining_time)
+
+        # Erase the previous vehicle and the HUD fields about to change
+        dirty_rects = list(self._vehicle_rects)
+        for name, (font, text, anchor, position) in hud_fields.items():
+            field = self._hud_fields.get(name)
+            if field is not None and field[0] != text:
+                dirty_rects.append(field[2])
+        for rect in dirty_rects:
+            self.window.blit(self.background, rect, rect)
+
+        self._vehicle_rects = vehicle.draw(self.window)
+        dirty_rects.extend(self._vehicle_rects)
+        dirty_rects.extend(self.draw_hud(hud_fields))
+
+        if full_redraw:
+            pygame.display.update()
+            self._full_redraw = False
+        else:
+            pygame.display.update(dirty_rects)
+
+    def _hud_values(self, vehicle, remaining_time):
+        """Get the HUD fields of a frame: name -> (font, text, anchor, position)."""
+        right, bottom = self.SCREEN_WIDTH - 10, self.SCREEN_HEIGHT - 10
+        is_on_track = vehicle.road_status != "completely_off"
+        fields = {
+            "score": (self.FONT_BIG, f"Score: {vehicle.score}", "topleft", (10, 10)),
+            "timer": (self.FONT_BIG, f"Time: {remaining_time:.1f}", "topright", (right, 10)),
+            "speed": (self.FONT_BIG, f"Speed: {vehicle.speed:.1f}", "bottomright", (right, bottom)),
+            # Vehicle status above the sensor values, themselves above the speed
+            "status": (self.FONT_SMALL, "On Track: " + ("Yes" if is_on_track else "No"), "bottomright", (right, self.SCREEN_HEIGHT - 178)),
+            "angle": (self.FONT_SMALL, f"Angle: {vehicle.angle:.1f}°", "bottomright", (right, self.SCREEN_HEIGHT - 158))
+        }
+        num_sensors = len(vehicle.sensors)
+        for i, sensor in enumerate(vehicle.sensors):
+            row = num_sensors - 1 - i  # The first sensor is listed at the bottom
+            fields[f"sensor_{i}"] = (self.FONT_SMALL, f"Sensor {i + 1}: {sensor.distance:.1f}", "bottomright",
+                                     (right, self.SCREEN_HEIGHT - 50 - row * 20))
+        return fields
+
+    def draw_hud(self, hud_fields):
+        """
+        Draw the HUD (Head-Up Display) fields.
+
+        A field is only rendered again when its text changes, texts already seen come from a cache.
+
+        Args:
+            hud_fields (dict): Fields from _hud_values.
+
+        Returns:
+            list: Rectangles of the fields whose text changed.
+        """
+        changed_rects = []
+        for name, (font, text, anchor, position) in hud_fields.items():
+            field = self._hud_fields.get(name)
+            if field is None or field[0] != text:
+                surface = self._render_text_box(font, text)
+                # Place the text at the anchor, the box extends 5 pixels around it
+                text_rect = pygame.Rect(0, 0, surface.get_width() - 10, surface.get_height() - 10)
+                setattr(text_rect, anchor, position)
+                rect = text_rect.inflate(10, 10)
+                field = self._hud_fields[name] = (text, surface, rect)
+                changed_rects.append(rect)
+            self.window.blit(field[1], field[2])
+        return changed_rects
 
+    def _render_text_box(self, font, text):
+        """Render text on a text box with a 5 pixel margin, cached per font and text."""
+        surface = self._text_boxes.get((font, text))
+        if surface is None:
+            if len(self._text_boxes) >= TEXT_CACHE_SIZE:
+                self._text_boxes.clear()
+            # The whole string is rendered at once, so the font's kerning is kept
+            text_surface = font.render(text, True, self.TEXT_COLOR)
+            surface = pygame.Surface((text_surface.get_width() + 10, text_surface.get_height() + 10))
+            surface.fill(self.TEXTBOX_COLOR)
+            surface.blit(text_surface, (5, 5))
+            self._text_boxes[(font, text)] = surface
+        return surface
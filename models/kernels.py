@@ -0,0 +1,102 @@
+import math
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # Optional dependency, the reference Python/NumPy code is used without it
+    numba = None
+
+from models.track import OFF_ROAD
+
+def _corners_on_road(track_grid, x, y, angle, corner_offsets, width, height):
+    """
+    Count the corners of the rotated vehicle rectangle that are on the road.
+
+    Same arithmetic as Vehicle.check_road_status: the rectangle position is truncated
+    like a pygame.Rect, so its center is an integer.
+    """
+    screen_width, screen_height = track_grid.shape
+    cx = int(x - width / 2) + width // 2
+    cy = int(y - height / 2) + height // 2
+    rad_angle = math.radians(angle)
+    cos_angle, sin_angle = math.cos(rad_angle), math.sin(rad_angle)
+    on_road_count = 0
+    for i in range(corner_offsets.shape[0]):
+        dx, dy = corner_offsets[i, 0], corner_offsets[i, 1]
+        vertex_x = cx + dx * cos_angle - dy * sin_angle
+        vertex_y = cy + dx * sin_angle + dy * cos_angle
+        if 0 <= vertex_x < screen_width and 0 <= vertex_y < screen_height and track_grid[int(vertex_x), int(vertex_y)] != OFF_ROAD:
+            on_road_count += 1
+    return on_road_count
+
+def _scan_ray(track_grid, x, y, cos_angle, sin_angle, length, is_on_road):
+    """
+    Distance along a sensor ray to the first obstacle, testing every pixel.
+
+    Same result as Sensor._calculate_distance without a distance field.
+    """
+    screen_width, screen_height = track_grid.shape
+    for d in range(int(length)):
+        check_x = int(x + d * cos_angle)
+        check_y = int(y - d * sin_angle)
+        if 0 <= check_x < screen_width and 0 <= check_y < screen_height:
+            # A road pixel stops an off-road ray and vice versa
+            if (track_grid[check_x, check_y] != OFF_ROAD) != is_on_road:
+                return d if is_on_road else -d
+    return length if is_on_road else 0
+
+def _march_ray(track_grid, distance_field, x, y, cos_angle, sin_angle, length, is_on_road):
+    """
+    Distance along a sensor ray to the first obstacle, skipping ahead with the distance field.
+
+    Same result as Sensor._march_distance.
+    """
+    screen_width, screen_height = track_grid.shape
+    d = 0
+    while d < int(length):
+        check_x = int(x + d * cos_angle)
+        check_y = int(y - d * sin_angle)
+        if 0 <= check_x < screen_width and 0 <= check_y < screen_height:
+            if (track_grid[check_x, check_y] != OFF_ROAD) != is_on_road:
+                return d if is_on_road else -d
+            d += int(distance_field[check_x, check_y]) + 1
+        else:
+            d += 1
+    return length if is_on_road else 0
+
+# Kernels shared by every vehicle of the process, see load_kernels()
+_kernels = None
+
+class Kernels:
+    def __init__(self):
+        """
+        Numba-compiled versions of the scalar hot loops of Vehicle and Sensor.
+
+        The functions take the track label grid as a plain array, are compiled on first
+        use and cached on disk next to this module.
+        """
+        jit = numba.njit(cache=True, nogil=True)
+        self.corners_on_road = jit(_corners_on_road)
+        self.scan_ray = jit(_scan_ray)
+        self.march_ray = jit(_march_ray)
+
+def load_kernels(backend):
+    """
+    Get the compiled kernels of the given backend.
+
+    Args:
+        backend (str): "auto" (Numba when it is installed), "numba" or "python".
+
+    Returns:
+        Kernels | None: The compiled kernels, None for the reference Python/NumPy code.
+    """
+    global _kernels
+    if backend not in ("auto", "numba", "python"):
+        raise ValueError(f"Unknown kernel backend: {backend}")
+    if backend == "numba" and numba is None:
+        raise ValueError("The numba kernel backend needs the numba package (pip install numba).")
+    if backend == "python" or numba is None:
+        return None
+    if _kernels is None:
+        _kernels = Kernels()
+    return _kernels
@@ -0,0 +1,142 @@
+import json
+import hashlib
+from bisect import bisect_right
+import numpy as np
+from config import STATE_CONFIG, SENSOR_CONFIG, VEHICLE_CONFIG
+
+class StateQuantizer:
+    VERSION = 1  # Format of describe(), to bump if the meaning of the bin edges changes
+
+    def __init__(self, speed_edges, sensor_edges, sensor_lengths, uniform_width=None):
+        """
+        Map the speed and the sensor readings of a vehicle to a tuple of small integers.
+
+        A value falls in the bin given by the number of edges it reaches, so n edges give
+        the bins 0 to n. Sensor readings are negative off the road: their magnitude is
+        binned and the sign is kept. Readings past the last edge share the last bin
+        (clipping).
+
+        Args:
+            speed_edges (list): Ascending edges of the speed buckets, None for int(speed).
+            sensor_edges (list): Ascending edges (px) of the bins of every sensor.
+            sensor_lengths (list): Length (px) of every sensor.
+            uniform_width (int): Set when the sensor bins are exactly int(reading / width),
+                which is computed without a bin search.
+        """
+        self.speed_edges = None if speed_edges is None else [float(edge) for edge in speed_edges]
+        self.sensor_edges = [[float(edge) for edge in edges] for edges in sensor_edges]
+        self.sensor_lengths = list(sensor_lengths)
+        self.uniform_width = uniform_width
+        self._speed_edge_array = None if speed_edges is None else np.array(self.speed_edges)
+        self._sensor_edge_arrays = [np.array(edges) for edges in self.sensor_edges]
+
+    @classmethod
+    def from_config(cls, state_config=None):
+        """
+        Build the quantizer configured in STATE_CONFIG.
+
+        Args:
+            state_config (dict): Quantization settings, STATE_CONFIG by default.
+
+        Raises:
+            ValueError: If the configuration is invalid.
+        """
+        state_config = STATE_CONFIG if state_config is None else state_config
+        lengths = [length for _, length in SENSOR_CONFIG["SENSORS"]]
+        clip = state_config["SENSOR_CLIP"]
+        scheme = state_config["SENSOR_BINS"]
+        uniform_width = None
+        if scheme == "uniform":
+            width = state_config["UNIFORM_BIN_WIDTH"]
+            sensor_edges = [np.arange(width, min(length, clip or length) + 1, width) for length in lengths]
+            uniform_width = width if clip is None else None
+        elif scheme == "log":
+            sensor_edges = [np.round(np.geomspace(state_config["LOG_MIN_DISTANCE"], min(length, clip or length), state_config["LOG_BINS"]), 2)
+                            for length in lengths]
+        elif isinstance(scheme, (list, tuple)):
+            if len(scheme) != len(lengths):
+                raise ValueError(f"SENSOR_BINS has {len(scheme)} lists of edges, but there are {len(lengths)} sensors.")
+            sensor_edges = [[edge for edge in edges if clip is None or edge <= clip] for edges in scheme]
+        else:
+            raise ValueError(f"Unknown sensor binning scheme: {scheme}")
+        for edges in list(sensor_edges) + [state_config["SPEED_BINS"] or []]:
+            if len(edges) and (np.diff(edges) <= 0).any():
+                raise ValueError(f"Bin edges must be strictly ascending, got {list(edges)}.")
+        return cls(state_config["SPEED_BINS"], sensor_edges, lengths, uniform_width)
+
+    @classmethod
+    def from_description(cls, description):
+        """Rebuild a quantizer from its describe() output (e.g. from the metadata of a Q-table)."""
+        return cls(description["speed_edges"], description["sensor_edges"], description["sensor_lengths"])
+
+    def quantize(self, speed, distances):
+        """
+        Get the state tuple of a vehicle.
+
+        Args:
+            speed (float): Speed of the vehicle.
+            distances (list): Reading of every sensor.
+
+        Returns:
+            tuple: The speed bin followed by the bin of every sensor.
+        """
+        speed_bin = int(speed) if self.speed_edges is None else bisect_right(self.speed_edges, speed)
+        if self.uniform_width:
+            width = self.uniform_width
+            return (speed_bin,) + tuple(int(distance / width) for distance in distances)
+        return (speed_bin,) + tuple(-bisect_right(edges, -distance) if distance < 0 else bisect_right(edges, distance)
+                                    for edges, distance in zip(self.sensor_edges, distances))
+
+    def quantize_many(self, speeds, distances):
+        """
+        Vectorized quantize() for arrays of speeds (n,) and sensor readings (n, num_sensors).
+
+        Returns:
+            np.ndarray: int64 array of shape (n, 1 + num_sensors).
+        """
+        states = np.empty((len(speeds), 1 + distances.shape[1]), dtype=np.int64)
+        if self.speed_edges is None:
+            states[:, 0] = speeds.astype(np.int64)
+        else:
+            states[:, 0] = np.searchsorted(self._speed_edge_array, speeds, side="right")
+        if self.uniform_width:
+            states[:, 1:] = (distances / self.uniform_width).astype(np.int64)  # Truncates toward zero like int()
+        else:
+            for column, edges in enumerate(self._sensor_edge_arrays, 1):
+                readings = distances[:, column - 1]
+                bins = np.searchsorted(edges, np.abs(readings), side="right")
+                states[:, column] = np.where(readings < 0, -bins, bins)
+        return states
+
+    def state_bounds(self):
+        """
+        Get the inclusive (low, high) bounds of every state variable.
+
+        Sensor readings are positive on the road (up to the sensor length) and
+        negative off the road (the first sample at the full length is never reached).
+        """
+        if self.speed_edges is None:
+            bounds = [(0, int(VEHICLE_CONFIG["MAX_SPEED"]))]
+        else:
+            bounds = [(0, bisect_right(self.speed_edges, VEHICLE_CONFIG["MAX_SPEED"]))]
+        for edges, length in zip(self.sensor_edges, self.sensor_lengths):
+            bounds.append((-bisect_right(edges, length - 1), bisect_right(edges, length)))
+        return bounds
+
+    def describe(self):
+        """Get the JSON description saved with a Q-table, equal for quantizers producing the same states."""
+        return {
+            "version": self.VERSION,
+            # int(speed) is the same as edges at every unit
+            "speed_edges": self.speed_edges if self.speed_edges is not None else [float(edge) for edge in range(1, int(VEHICLE_CONFIG["MAX_SPEED"]) + 1)],
+            "sensor_edges": self.sensor_edges,
+            "sensor_lengths": self.sensor_lengths  # The readings depend on them too
+        }
+
+def quantizer_id(description):
+    """Get a short identifier of a quantizer description, for messages and reports."""
+    return hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()[:12]
+
+def legacy_quantizer():
+    """Get the quantizer of Q-tables saved before quantizers were configurable (int(speed), int(reading / 10))."""
+    return StateQuantizer.from_config({"SPEED_BINS": None, "SENSOR_BINS": "uniform", "UNIFORM_BIN_WIDTH": 10, "SENSOR_CLIP": None})
@@ -1,6 +1,8 @@
 import pygame
 import math
+import numpy as np
 from config import COLOR_CONFIG
+from models.track import OFF_ROAD
 
 class Sensor:
     def __init__(self, vehicle, angle_offset, length):
@@ -17,11 +19,13 @@ class Sensor:
         self.end_y = 0  # The Y-coordinate of the sensor's endpoint
         self.distance = 0  # The calculated distance to the first obstacle
         self.is_on_road = False  # Whether the vehicle is on the road
+        self._steps = np.arange(int(length))  # Distances sampled along the ray
 
-    def update(self, environment):
+    def update(self, environment, is_on_road=None):
         """
         Update the sensor's position and calculate the distance to the first obstacle.
         :param environment: The environment in which the vehicle and sensor operate
+        :param is_on_road: Whether the vehicle is on the road, computed if not given
         """
         # Calculate the sensor angle based on the vehicle's orientation and offset
         sensor_angle = math.radians(self.vehicle.angle + self.angle_offset)
@@ -31,7 +35,7 @@ class Sensor:
         self.end_y = self.vehicle.y - self.length * math.sin(sensor_angle)
 
         # Check if the vehicle is currently on the road
-        self.is_on_road = self.vehicle.is_on_road(self.vehicle.x, self.vehicle.y)
+        self.is_on_road = self.vehicle.is_on_road(self.vehicle.x, self.vehicle.y) if is_on_road is None else is_on_road
         
         # Calculate the distance from the sensor to the first detected obstacle
         self.distance = self._calculate_distance(environment)
@@ -45,24 +49,62 @@ class Sensor:
         :return: The distance to the obstacle (positive if on road, negative if off road)
         """
         sensor_angle = math.radians(self.vehicle.angle + self.angle_offset)
-        
-        # Loop through the range of the sensor's length to check for obstacles
-        for d in range(int(self.length)):
-            check_x = int(self.vehicle.x + d * math.cos(sensor_angle))
-            check_y = int(self.vehicle.y - d * math.sin(sensor_angle))
 
-            # Ensure the check is within the environment's boundaries
-            if 0 <= check_x < environment.SCREEN_WIDTH and 0 <= check_y < environment.SCREEN_HEIGHT:
-                color_at_position = environment.CIRCUIT_IMAGE.get_at((check_x, check_y))
+        kernels = self.vehicle.kernels
+        if kernels is not None:
+            # Compiled versions of the loops below, same results
+            if environment.distance_field is not None:
+                return kernels.march_ray(environment.track_grid, environment.distance_field, self.vehicle.x, self.vehicle.y,
+                                         math.cos(sensor_angle), math.sin(sensor_angle), self.length, self.is_on_road)
+            return kernels.scan_ray(environment.track_grid, self.vehicle.x, self.vehicle.y,
+                                    math.cos(sensor_angle), math.sin(sensor_angle), self.length, self.is_on_road)
+
+        if environment.distance_field is not None:
+            return self._march_distance(environment, sensor_angle)
+
+        # Sample every pixel along the ray at once (astype truncates toward zero like int())
+        check_x = (self.vehicle.x + self._steps * math.cos(sensor_angle)).astype(np.intp)
+        check_y = (self.vehicle.y - self._steps * math.sin(sensor_angle)).astype(np.intp)
 
-                # If the vehicle is on the road, detect the first non-road object
-                if self.is_on_road:
-                    if color_at_position not in [environment.ROAD_COLOR, environment.CHECKPOINT_COLOR, environment.START_COLOR]:
-                        return d
-                # If the vehicle is off-road, detect the distance to the road
-                else:
-                    if color_at_position in [environment.ROAD_COLOR, environment.CHECKPOINT_COLOR, environment.START_COLOR]:
-                        return -d
+        # Ignore the samples outside the environment's boundaries
+        inside = (check_x >= 0) & (check_x < environment.SCREEN_WIDTH) & (check_y >= 0) & (check_y < environment.SCREEN_HEIGHT)
+        labels = environment.track_grid[check_x[inside], check_y[inside]]
+
+        # If the vehicle is on the road, detect the first non-road object,
+        # if it is off-road, detect the distance to the road
+        hits = labels == OFF_ROAD if self.is_on_road else labels != OFF_ROAD
+        if hits.any():
+            d = int(self._steps[inside][hits.argmax()])
+            return d if self.is_on_road else -d
+
+        # If the sensor detects no obstacles, return the max length or 0 if off-road
+        return self.length if self.is_on_road else 0
+
+    def _march_distance(self, environment, sensor_angle):
+        """
+        Same result as the per-pixel scan, but jumps over the samples that the
+        environment's distance field guarantees cannot reach an obstacle.
+        :param environment: The environment to check for obstacles
+        :param sensor_angle: The absolute sensor angle in radians
+        :return: The distance to the obstacle (positive if on road, negative if off road)
+        """
+        grid = environment.track_grid
+        distance_field = environment.distance_field
+        cos_angle, sin_angle = math.cos(sensor_angle), math.sin(sensor_angle)
+        x, y = self.vehicle.x, self.vehicle.y
+        length = int(self.length)
+
+        d = 0
+        while d < length:
+            check_x = int(x + d * cos_angle)
+            check_y = int(y - d * sin_angle)
+            if 0 <= check_x < environment.SCREEN_WIDTH and 0 <= check_y < environment.SCREEN_HEIGHT:
+                # A road pixel stops an off-road ray and vice versa
+                if (grid[check_x, check_y] != OFF_ROAD) != self.is_on_road:
+                    return d if self.is_on_road else -d
+                d += int(distance_field[check_x, check_y]) + 1
+            else:
+                d += 1
 
         # If the sensor detects no obstacles, return the max length or 0 if off-road
         return self.length if self.is_on_road else 0
@@ -71,9 +113,10 @@ class Sensor:
         """
         Draw the sensor line and the detected obstacle (if any) on the window.
         :param window: The PyGame window to draw on
+        :return: The rectangle drawn over
         """
         # Draw the sensor line from the vehicle to the sensor's endpoint
-        pygame.draw.line(window, COLOR_CONFIG["GREEN"], (self.vehicle.x, self.vehicle.y), (self.end_x, self.end_y), 2)
+        rect = pygame.draw.line(window, COLOR_CONFIG["GREEN"], (self.vehicle.x, self.vehicle.y), (self.end_x, self.end_y), 2)
         
         # If an obstacle was detected, draw a circle at the obstacle's location
         if self.distance != 0:
@@ -82,4 +125,5 @@ class Sensor:
             
             # Draw the obstacle in blue if on-road, red if off-road
             color = COLOR_CONFIG["BLUE"] if self.is_on_road else COLOR_CONFIG["RED"]
-            pygame.draw.circle(window, color, (obstacle_x, obstacle_y), 5)
+            rect = rect.union(pygame.draw.circle(window, color, (obstacle_x, obstacle_y), 5))
+        return rect
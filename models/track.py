@@ -0,0 +1,401 @@
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import hashlib
+import numpy as np
+import pygame
+
+# Labels stored in the track grid
+OFF_ROAD = 0
+ROAD = 1
+CHECKPOINT = 2
+START = 3
+
+# Bump when the distance field layout changes to invalidate cached files
+DISTANCE_FIELD_VERSION = 1
+
+# Bump when the track bundle content changes to invalidate cached bundles
+TRACK_BUNDLE_VERSION = 2
+
+# Distances to the nearest checkpoint are only stored up to this value (pixels)
+CHECKPOINT_DISTANCE_LIMIT = 32
+
+def build_track_grid(surface, road_color, checkpoint_color, start_color):
+    """
+    Classify every pixel of the circuit surface once.
+
+    Args:
+        surface (pygame.Surface): The (scaled) circuit image.
+        road_color (tuple): RGB color of the road.
+        checkpoint_color (tuple): RGB color of the checkpoint lines.
+        start_color (tuple): RGB color of the start line.
+
+    Returns:
+        np.ndarray: uint8 grid of shape (width, height) indexed as grid[x, y].
+    """
+    pixels = pygame.surfarray.pixels3d(surface)  # Zero-copy (width, height, 3) view of the surface
+    try:
+        grid = np.full(pixels.shape[:2], OFF_ROAD, dtype=np.uint8)
+        for label, color in ((ROAD, road_color), (CHECKPOINT, checkpoint_color), (START, start_color)):
+            grid[np.all(pixels == color, axis=2)] = label
+    finally:
+        del pixels  # Release the surface lock so the image can be blitted again
+    return grid
+
+def find_start_position(grid):
+    """
+    Find the first pixel with the start label and determine the initial direction.
+
+    Args:
+        grid (np.ndarray): Track grid from build_track_grid.
+
+    Returns:
+        tuple: (x, y, angle) of the start pose, or None if the circuit has no start line.
+    """
+    width, height = grid.shape
+    # Transposing gives the row-major (y, x) order of a top-to-bottom, left-to-right scan
+    for y, x in np.argwhere(grid.T == START):
+        # Look for the road direction
+        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # left, right, up, down
+        for dx, dy in directions:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height:
+                if grid[nx, ny] == ROAD:
+                    # Calculate the initial angle
+                    angle = math.degrees(math.atan2(-dy, dx))
+                    return int(x), int(y), angle
+    return None
+
+def label_checkpoints(grid):
+    """
+    Label every checkpoint line (8-connected group of checkpoint pixels) with its own ID.
+
+    Args:
+        grid (np.ndarray): Track grid from build_track_grid.
+
+    Returns:
+        tuple: (checkpoint_ids, count): uint16 grid of shape (width, height) holding the
+            ID (1 to count, in scan order) of the line each pixel belongs to, 0 elsewhere.
+    """
+    width, height = grid.shape
+    checkpoint_ids = np.zeros(grid.shape, dtype=np.uint16)
+    count = 0
+    for x, y in np.argwhere(grid == CHECKPOINT).tolist():
+        if checkpoint_ids[x, y]:
+            continue
+        count += 1
+        checkpoint_ids[x, y] = count
+        pending = [(x, y)]
+        while pending:
+            px, py = pending.pop()
+            for nx in range(max(px - 1, 0), min(px + 2, width)):
+                for ny in range(max(py - 1, 0), min(py + 2, height)):
+                    if grid[nx, ny] == CHECKPOINT and not checkpoint_ids[nx, ny]:
+                        checkpoint_ids[nx, ny] = count
+                        pending.append((nx, ny))
+    return checkpoint_ids, count
+
+def _road_distance_ahead(grid, start_position):
+    """
+    Distance along the road from the start line, driving in the start direction.
+
+    The road is cut behind the start pixel (perpendicular to the start direction,
+    from edge to edge) so the search has to go around the circuit to reach what lies
+    just behind the start.
+
+    Args:
+        grid (np.ndarray): Track grid from build_track_grid.
+        start_position (tuple): (x, y, angle) start pose.
+
+    Returns:
+        np.ndarray: int32 grid of shape (width, height), -1 where the road is not reached.
+    """
+    width, height = grid.shape
+    passable = grid != OFF_ROAD
+    x, y, angle = start_position
+    dx, dy = math.cos(math.radians(angle)), -math.sin(math.radians(angle))
+
+    # Wall across the road, two pixels thick so the 4-connected search cannot slip through diagonally
+    for side in (-1, 1):
+        for thickness in (0.0, -1.0):
+            for step in range(2 * max(width, height)):
+                wall_x = int(round(x + 0.5 * step * side * -dy + thickness * dx))
+                wall_y = int(round(y + 0.5 * step * side * dx + thickness * dy))
+                if not (0 <= wall_x < width and 0 <= wall_y < height) or grid[wall_x, wall_y] == OFF_ROAD:
+                    break
+                passable[wall_x, wall_y] = False
+
+    distance = np.full(grid.shape, -1, dtype=np.int32)
+    seed_x, seed_y = int(round(x + dx)), int(round(y + dy))
+    if not (0 <= seed_x < width and 0 <= seed_y < height and passable[seed_x, seed_y]):
+        return distance
+    distance[seed_x, seed_y] = 0
+    frontier = np.array([seed_x * height + seed_y])  # Flat indices of the pixels reached last
+    current = 0
+    while len(frontier):
+        current += 1
+        fx, fy = np.divmod(frontier, height)
+        nx = np.concatenate((fx - 1, fx + 1, fx, fx))
+        ny = np.concatenate((fy, fy, fy - 1, fy + 1))
+        inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+        nx, ny = nx[inside], ny[inside]
+        new = passable[nx, ny] & (distance[nx, ny] < 0)
+        frontier = np.unique(nx[new] * height + ny[new])
+        distance.flat[frontier] = current
+    return distance
+
+def order_checkpoints(grid, checkpoint_ids, count, start_position):
+    """
+    Sort the checkpoint lines in driving order from the start line.
+
+    Args:
+        grid (np.ndarray): Track grid from build_track_grid.
+        checkpoint_ids (np.ndarray): ID grid from label_checkpoints.
+        count (int): Number of checkpoint lines.
+        start_position (tuple): (x, y, angle) start pose, or None.
+
+    Returns:
+        list: Checkpoint IDs in the order they are crossed. Lines that cannot be
+            reached from the start come last, in ID order.
+    """
+    if count == 0:
+        return []
+    if start_position is None:
+        return list(range(1, count + 1))
+    distance = _road_distance_ahead(grid, start_position)
+    reached = np.where(distance >= 0, distance, np.iinfo(np.int32).max)
+    closest = np.full(count + 1, np.iinfo(np.int32).max, dtype=np.int64)
+    mask = checkpoint_ids > 0
+    np.minimum.at(closest, checkpoint_ids[mask].astype(np.int64), reached[mask])
+    return sorted(range(1, count + 1), key=lambda checkpoint_id: (closest[checkpoint_id], checkpoint_id))
+
+def build_checkpoint_distance(checkpoint_ids):
+    """
+    Distance from every pixel to the nearest checkpoint pixel, capped at CHECKPOINT_DISTANCE_LIMIT.
+
+    Lets the crossing test skip the vehicles that are too far from any checkpoint line.
+
+    Returns:
+        np.ndarray: uint8 grid of shape (width, height).
+    """
+    squared = _squared_distance(checkpoint_ids > 0, CHECKPOINT_DISTANCE_LIMIT)
+    return np.floor(np.sqrt(squared)).astype(np.uint8)
+
+class TrackBundle:
+    def __init__(self, directory, grid, start_position, checkpoint_pixels, checkpoint_ids, checkpoint_order, checkpoint_distance):
+        """
+        Precomputed data of one circuit, loaded from its compiled bundle.
+
+        Args:
+            directory (str): Directory of the bundle.
+            grid (np.ndarray): Read-only track grid of shape (width, height).
+            start_position (tuple): (x, y, angle) start pose, or None.
+            checkpoint_pixels (np.ndarray): int16 (x, y) coordinates of every checkpoint pixel.
+            checkpoint_ids (np.ndarray): uint16 grid of checkpoint line IDs, see label_checkpoints.
+            checkpoint_order (list): Checkpoint IDs in driving order, see order_checkpoints.
+            checkpoint_distance (np.ndarray): uint8 distance to the nearest checkpoint, see build_checkpoint_distance.
+        """
+        self.directory = directory
+        self.grid = grid
+        self.start_position = start_position
+        self.checkpoint_pixels = checkpoint_pixels
+        self.checkpoint_ids = checkpoint_ids
+        self.checkpoint_order = checkpoint_order
+        self.checkpoint_distance = checkpoint_distance
+
+def load_circuit_surface(image_path, size):
+    """Load a circuit image scaled to the window size (no display needed)."""
+    return pygame.transform.scale(pygame.image.load(image_path), size)
+
+def _track_bundle_directory(image_path, size, colors, cache_directory):
+    """Get the bundle directory of a circuit, keyed by a hash of the image and of everything the bundle depends on."""
+    digest = hashlib.sha1()
+    digest.update(f"track_bundle:v{TRACK_BUNDLE_VERSION}:{tuple(size)}:{[tuple(color) for color in colors]}".encode())
+    with open(image_path, "rb") as f:
+        digest.update(f.read())
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(cache_directory, f"{name}.{digest.hexdigest()[:16]}")
+
+def compile_track_bundle(image_path, size, colors, cache_directory):
+    """
+    Compile a circuit image into a cached bundle, unless an up-to-date bundle exists.
+
+    Args:
+        image_path (str): Path of the circuit PNG.
+        size (tuple): (width, height) the circuit is scaled to.
+        colors (tuple): RGB colors of the road, the checkpoints and the start line.
+        cache_directory (str): Directory holding the bundles.
+
+    Returns:
+        str: Directory of the bundle.
+    """
+    directory = _track_bundle_directory(image_path, size, colors, cache_directory)
+    if os.path.exists(os.path.join(directory, "track.json")):
+        return directory
+
+    grid = build_track_grid(load_circuit_surface(image_path, size), *colors)
+    start_position = find_start_position(grid)
+    checkpoint_pixels = np.argwhere(grid == CHECKPOINT).astype(np.int16)
+    checkpoint_ids, checkpoint_count = label_checkpoints(grid)
+    checkpoint_order = order_checkpoints(grid, checkpoint_ids, checkpoint_count, start_position)
+    checkpoint_distance = build_checkpoint_distance(checkpoint_ids)
+
+    # Build the bundle in a private directory and rename it into place, so it appears complete or not at all
+    temp_directory = f"{directory}.{os.getpid()}.tmp"
+    os.makedirs(temp_directory, exist_ok=True)
+    np.save(os.path.join(temp_directory, "grid.npy"), grid, allow_pickle=False)
+    np.save(os.path.join(temp_directory, "checkpoint_pixels.npy"), checkpoint_pixels, allow_pickle=False)
+    np.save(os.path.join(temp_directory, "checkpoint_ids.npy"), checkpoint_ids, allow_pickle=False)
+    np.save(os.path.join(temp_directory, "checkpoint_distance.npy"), checkpoint_distance, allow_pickle=False)
+    with open(os.path.join(temp_directory, "track.json"), "w") as f:
+        json.dump({"version": TRACK_BUNDLE_VERSION, "source": os.path.basename(image_path), "start_position": start_position,
+                   "checkpoint_order": checkpoint_order}, f, indent=2)
+    try:
+        os.rename(temp_directory, directory)
+    except OSError:
+        shutil.rmtree(temp_directory, ignore_errors=True)  # Another process compiled the same bundle first
+    return directory
+
+def load_track_bundle(image_path, size, colors, cache_directory):
+    """
+    Load the compiled bundle of a circuit, compiling it first if the image changed.
+
+    The arrays are memory-mapped read-only, so processes using the same circuit share them.
+
+    Args:
+        image_path (str): Path of the circuit PNG.
+        size (tuple): (width, height) the circuit is scaled to.
+        colors (tuple): RGB colors of the road, the checkpoints and the start line.
+        cache_directory (str): Directory holding the bundles.
+
+    Returns:
+        TrackBundle: The circuit data.
+    """
+    directory = compile_track_bundle(image_path, size, colors, cache_directory)
+    with open(os.path.join(directory, "track.json"), "r") as f:
+        metadata = json.load(f)
+    start_position = tuple(metadata["start_position"]) if metadata["start_position"] else None
+
+    def load_array(filename):
+        return np.load(os.path.join(directory, filename), mmap_mode="r").view(np.ndarray)
+
+    return TrackBundle(
+        directory,
+        load_array("grid.npy"),
+        start_position,
+        load_array("checkpoint_pixels.npy"),
+        load_array("checkpoint_ids.npy"),
+        metadata["checkpoint_order"],
+        load_array("checkpoint_distance.npy")
+    )
+
+def _column_distance(features, limit):
+    """
+    Distance from every pixel to the nearest feature pixel in the same column.
+
+    Args:
+        features (np.ndarray): bool grid of shape (width, height).
+        limit (int): Distances are capped at this value.
+
+    Returns:
+        np.ndarray: float64 grid of shape (width, height).
+    """
+    height = features.shape[1]
+    rows = np.arange(height)
+    # Index of the last feature at or above each pixel, and of the first one at or below it
+    above = np.maximum.accumulate(np.where(features, rows, -limit - height), axis=1)
+    below = np.minimum.accumulate(np.where(features, rows, limit + 2 * height)[:, ::-1], axis=1)[:, ::-1]
+    return np.minimum(np.minimum(rows - above, below - rows), limit).astype(np.float64)
+
+def _squared_distance(features, limit):
+    """
+    Squared Euclidean distance from every pixel to the nearest feature pixel, capped at limit².
+
+    Separable brute-force transform: exact for distances up to the limit.
+    """
+    column = _column_distance(features, limit) ** 2
+    result = column.copy()
+    width = features.shape[0]
+    for dx in range(1, min(limit, width - 1) + 1):
+        np.minimum(result[dx:], column[:-dx] + dx * dx, out=result[dx:])
+        np.minimum(result[:-dx], column[dx:] + dx * dx, out=result[:-dx])
+    return np.minimum(result, limit * limit)
+
+def build_distance_field(grid, max_distance):
+    """
+    Build the sensor skip field of a track grid.
+
+    Each pixel stores how many further ray samples can be skipped after sampling it,
+    because none of them can reach a pixel of the other class (road vs. off-road).
+    A ray moving k pixels from a sample lands, after truncation to integer
+    coordinates, less than k + sqrt(2) pixels away, so k = floor(distance - sqrt(2))
+    samples are always safe.
+
+    Args:
+        grid (np.ndarray): Track grid from build_track_grid.
+        max_distance (int): Longest sensor ray, distances beyond it are not needed.
+
+    Returns:
+        np.ndarray: uint8 grid of shape (width, height).
+    """
+    limit = min(int(max_distance) + 2, 255)
+    on_road = grid != OFF_ROAD
+    squared = np.where(on_road, _squared_distance(~on_road, limit), _squared_distance(on_road, limit))
+    skips = np.floor(np.sqrt(squared) - 1.415)  # Slightly above sqrt(2) to stay clear of rounding
+    return np.clip(skips, 0, 255).astype(np.uint8)
+
+def load_distance_field(grid, max_distance, cache_directory):
+    """
+    Load the sensor skip field of a track grid from the cache, building it on a miss.
+
+    The field is stored as a .npy file keyed by a hash of the grid and the sensor
+    range, and is memory-mapped read-only so every process shares the same pages.
+
+    Args:
+        grid (np.ndarray): Track grid from build_track_grid.
+        max_distance (int): Longest sensor ray.
+        cache_directory (str): Directory holding the cached fields.
+
+    Returns:
+        np.ndarray: Read-only uint8 grid of shape (width, height).
+    """
+    digest = hashlib.sha1()
+    digest.update(f"distance_field:v{DISTANCE_FIELD_VERSION}:{grid.shape}:{int(max_distance)}".encode())
+    digest.update(np.ascontiguousarray(grid).tobytes())
+    path = os.path.join(cache_directory, f"distance_field_{digest.hexdigest()[:16]}.npy")
+
+    if not os.path.exists(path):
+        os.makedirs(cache_directory, exist_ok=True)
+        field = build_distance_field(grid, max_distance)
+        # Write to a temporary file first so concurrent readers never see a partial field
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.save(f, field, allow_pickle=False)
+        os.replace(temp_path, path)
+
+    # Plain ndarray view of the mapping: scalar indexing on np.memmap is noticeably slower
+    return np.load(path, mmap_mode="r").view(np.ndarray)
+
+def main():
+    """Compile the bundles of every circuit in assets/images."""
+    # Run as a script from the project root: python -m models.track
+    from config import WINDOW_CONFIG, COLOR_CONFIG, TRACK_CONFIG
+
+    parent_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    images_directory = os.path.join(parent_directory, "assets", "images")
+    cache_directory = os.path.join(parent_directory, TRACK_CONFIG["CACHE_DIRECTORY"])
+    size = (WINDOW_CONFIG["WIDTH"], WINDOW_CONFIG["HEIGHT"])
+    colors = (COLOR_CONFIG["BLACK"], COLOR_CONFIG["GRAY"], COLOR_CONFIG["YELLOW"])  # Road, checkpoint and start, as in Environment
+
+    for filename in sorted(os.listdir(images_directory)):
+        if filename.startswith("circuit_") and filename.endswith(".png"):
+            start_time = time.perf_counter()
+            directory = compile_track_bundle(os.path.join(images_directory, filename), size, colors, cache_directory)
+            print(f"{filename}: {directory} ({time.perf_counter() - start_time:.2f}s)")
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
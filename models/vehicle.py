@@ -1,20 +1,23 @@
 import math
-import time
 import pygame
+import numpy as np
 from models.sensor import Sensor
-from models.checkpoint import Checkpoint
-from config import VEHICLE_CONFIG
+from models.checkpoint import Checkpoint, crossed_checkpoint
+from models.track import OFF_ROAD
+from models.clock import SimulationClock
+from models.kernels import load_kernels
+from models.quantizer import StateQuantizer
+from config import VEHICLE_CONFIG, SENSOR_CONFIG, SESSION_CONFIG
 
 class Vehicle:
-    def __init__(self, environment):
+    def __init__(self, environment, clock=None, kernel_backend=None, raw_state=False):
         self.environment = environment
-        start_info = self.environment.find_start_position()
-        if start_info is None:
-            raise ValueError("Could not find a valid starting position on the circuit.")
-        
-        self.initial_position = (start_info[0], start_info[1])
-        self.initial_angle = self.normalize_angle(start_info[2])
-        
+        self.raw_state = raw_state  # step() returns get_observation() instead of get_state()
+        # Compiled road and sensor kernels, None for the reference Python/NumPy code
+        self.kernels = load_kernels(kernel_backend or VEHICLE_CONFIG["KERNEL_BACKEND"])
+        self.clock = clock if clock is not None else SimulationClock()  # Advanced once per update, restarted on reset
+        self._set_start_pose()
+
         self.width = VEHICLE_CONFIG["WIDTH"]
         self.height = VEHICLE_CONFIG["HEIGHT"]
         self.max_speed = VEHICLE_CONFIG["MAX_SPEED"]
@@ -23,22 +26,46 @@ class Vehicle:
         self.acceleration = VEHICLE_CONFIG["ACCELERATION"]
         self.deceleration = VEHICLE_CONFIG["DESACCELERATION"]
         self.rotation_speed = VEHICLE_CONFIG["ROTATION_SPEED"]
-        
+        self.max_steps = SESSION_CONFIG["EPISODE_STEPS"]
+
+        # Corners relative to the center of the (integer) vehicle rectangle, in the order of get_rotated_vertices
+        half_width, half_height = self.width // 2, self.height // 2
+        self._corner_offsets = ((-half_width, -half_height), (self.width - half_width, -half_height),
+                                (self.width - half_width, self.height - half_height), (-half_width, self.height - half_height))
+        self._corner_array = np.array(self._corner_offsets, dtype=np.int64)  # For the compiled kernel
+
+        self.quantizer = StateQuantizer.from_config()  # Maps the speed and sensor readings to the state tuple
         self.image = self._create_image()
         self.sensors = self._create_sensors()
+        self._lateral_sensors = [self.sensors[i] for i in [0, 1, 3, 4]]
         
         self.reset()
 
+    def _set_start_pose(self):
+        """Take the start pose of the active circuit of the environment."""
+        start_info = self.environment.find_start_position()
+        if start_info is None:
+            raise ValueError("Could not find a valid starting position on the circuit.")
+        self.initial_position = (start_info[0], start_info[1])
+        self.initial_angle = self.normalize_angle(start_info[2])
+
     def reset(self):
-        """Reset the vehicle to its initial state."""
+        """Reset the vehicle to its initial state, at the start of the active circuit (see Environment.reset)."""
+        self.clock.reset()
+        self._set_start_pose()
         self.x, self.y = self.initial_position
         self.angle = self.initial_angle
         self.speed = 0
         self.score = 0
         self.collided = False
+        self.previous_position = self.initial_position  # Position before the last move, for the checkpoint test
+        self.checkpoints = {}  # Checkpoint line ID -> Checkpoint crossed in this episode
+        self.next_checkpoint = 0  # Index in the track's checkpoint order of the next line to cross
         self.last_checkpoint = None
-        self.last_road_check_time = time.time()
-        self.last_speed_check_time = time.time()
+        self._road_status_position = None  # Forget the memoized status (the track may have changed)
+        self.road_status = self.check_road_status(self.x, self.y)
+        self.last_road_check_time = self.clock.time
+        self.last_speed_check_time = self.clock.time
 
     def _create_image(self):
         """Create the vehicle's image."""
@@ -48,27 +75,43 @@ class Vehicle:
 
     def _create_sensors(self):
         """Create the vehicle's sensors."""
-        return [
-            Sensor(self, -90, 100),
-            Sensor(self, -45, 150),
-            Sensor(self, 0, 200),
-            Sensor(self, 45, 150),
-            Sensor(self, 90, 100)
-        ]
+        sensors = [Sensor(self, angle_offset, length) for angle_offset, length in SENSOR_CONFIG["SENSORS"]]
+        if SENSOR_CONFIG["USE_DISTANCE_FIELD"]:
+            self.environment.load_distance_field(max(sensor.length for sensor in sensors))
+        return sensors
 
     def draw(self, window):
-        """Draw the vehicle and its sensors on the window."""
+        """Draw the vehicle and its sensors on the window. Returns the rectangles drawn over."""
         rotated_image = pygame.transform.rotate(self.image, self.angle)
         new_rect = rotated_image.get_rect(center=(self.x, self.y))
-        window.blit(rotated_image, new_rect.topleft)
+        rects = [window.blit(rotated_image, new_rect.topleft)]
         for sensor in self.sensors:
-            sensor.draw(window)
+            rects.append(sensor.draw(window))
+        return rects
 
     def get_state(self):
-        """Get the current state of the vehicle."""
-        return (
-            int(self.speed),
-        ) + tuple(int(sensor.distance / 10) for sensor in self.sensors)
+        """Get the current state of the vehicle, quantized as configured in STATE_CONFIG."""
+        return self.quantizer.quantize(self.speed, [sensor.distance for sensor in self.sensors])
+
+    def get_observation(self):
+        """
+        Get the raw (not quantized) state of the vehicle: the speed and the sensor readings,
+        each scaled to [-1, 1] (sensor readings are negative off the road).
+        """
+        observation = np.empty(1 + len(self.sensors), dtype=np.float32)
+        observation[0] = self.speed / VEHICLE_CONFIG["MAX_SPEED"]
+        for i, sensor in enumerate(self.sensors, 1):
+            observation[i] = sensor.distance / sensor.length
+        return observation
+
+    def observe(self):
+        """Get the input of the agent: get_observation() with raw_state, get_state() otherwise."""
+        return self.get_observation() if self.raw_state else self.get_state()
+
+    @staticmethod
+    def get_state_bounds():
+        """Get the inclusive (low, high) bounds of every variable returned by get_state (see StateQuantizer.state_bounds)."""
+        return StateQuantizer.from_config().state_bounds()
 
     @staticmethod
     def normalize_angle(angle):
@@ -99,6 +142,23 @@ class Vehicle:
         
         self.update()
 
+    def step(self, action):
+        """
+        Run one agent step: apply the action, advance the simulation and compute the reward.
+
+        Same result as handle_agent_action followed by calculate_reward and observe.
+
+        Args:
+            action (int): Action of the agent.
+
+        Returns:
+            tuple: (next_state, reward, done), done when the vehicle collided or the episode
+                reached SESSION_CONFIG["EPISODE_STEPS"].
+        """
+        self.handle_agent_action(action)
+        reward = self.calculate_reward()
+        return self.observe(), reward, self.collided or self.clock.steps >= self.max_steps
+
     def handle_agent_action(self, action):
         """Handle agent's action for the vehicle."""
         if action == 0:
@@ -113,7 +173,8 @@ class Vehicle:
         self.update()
 
     def update(self):
-        """Update the vehicle's state."""
+        """Update the vehicle's state and advance the simulation clock by one step."""
+        self.clock.tick()
         self.update_position()
         self.update_sensors()
         self.check_collision(VEHICLE_CONFIG["COLLISION_TYPE"])
@@ -132,6 +193,7 @@ class Vehicle:
 
     def update_position(self):
         """Update the vehicle's position based on its speed and angle."""
+        self.previous_position = (self.x, self.y)
         rad_angle = math.radians(self.angle)
         new_x = self.x + self.speed * math.cos(rad_angle)
         new_y = self.y - self.speed * math.sin(rad_angle)
@@ -150,6 +212,7 @@ class Vehicle:
         
         self.speed = min(self.speed, self.max_speed)
         self.x, self.y = new_x, new_y
+        self.road_status = road_status  # Status at the current position, shown in the HUD
 
     def check_collision(self, check_type="WINDOW"):
         """Check if the vehicle has collided with the boundaries."""
@@ -157,18 +220,46 @@ class Vehicle:
             self.collided = not (self.width / 2 < self.x < self.environment.SCREEN_WIDTH - self.width / 2 and
                                  self.height / 2 < self.y < self.environment.SCREEN_HEIGHT - self.height / 2)
         elif check_type == "CIRCUIT":
-            self.collided = self.check_road_status(self.x, self.y) != "on_road"
+            self.collided = self.check_road_status(self.x, self.y) != "on_road"  # Memoized by update_position
 
     def check_road_status(self, x, y):
-        """Check the road status at the given position."""
-        rotated_rect = self.get_rotated_vertices(pygame.Rect(x - self.width / 2, y - self.height / 2, self.width, self.height))
-        on_road_count = sum(1 for vertex in rotated_rect if self.is_on_road(*vertex))
-        
-        if on_road_count == len(rotated_rect):
-            return "on_road"
+        """
+        Check the road status at the given position.
+
+        The last result is memoized: within a step update_position, check_collision and
+        reward_road all ask for the status of the same position and angle.
+        """
+        if self._road_status_position is not None and self._road_status_position == (x, y, self.angle):
+            return self._road_status
+
+        if self.kernels is not None:
+            on_road_count = self.kernels.corners_on_road(self.environment.track_grid, x, y, self.angle,
+                                                         self._corner_array, self.width, self.height)
+        else:
+            # Same vertices as get_rotated_vertices(pygame.Rect(...)), without the Rect and lists:
+            # the Rect truncates its float position, its center is then an integer
+            cx = int(x - self.width / 2) + self.width // 2
+            cy = int(y - self.height / 2) + self.height // 2
+            rad_angle = math.radians(self.angle)
+            cos_angle, sin_angle = math.cos(rad_angle), math.sin(rad_angle)
+            screen_width, screen_height = self.environment.SCREEN_WIDTH, self.environment.SCREEN_HEIGHT
+            track_grid = self.environment.track_grid
+            on_road_count = 0
+            for dx, dy in self._corner_offsets:
+                vertex_x = cx + dx * cos_angle - dy * sin_angle
+                vertex_y = cy + dx * sin_angle + dy * cos_angle
+                if 0 <= vertex_x < screen_width and 0 <= vertex_y < screen_height and track_grid[int(vertex_x), int(vertex_y)] != OFF_ROAD:
+                    on_road_count += 1
+
+        if on_road_count == len(self._corner_offsets):
+            road_status = "on_road"
         elif on_road_count > 0:
-            return "partially_off"
-        return "completely_off"
+            road_status = "partially_off"
+        else:
+            road_status = "completely_off"
+        self._road_status_position = (x, y, self.angle)
+        self._road_status = road_status
+        return road_status
 
     def get_rotated_vertices(self, rect):
         """Get the rotated vertices of the vehicle's rectangle."""
@@ -182,45 +273,53 @@ class Vehicle:
     def is_on_road(self, x, y):
         """Check if the given position is on the road."""
         if 0 <= x < self.environment.SCREEN_WIDTH and 0 <= y < self.environment.SCREEN_HEIGHT:
-            color_at_position = self.environment.CIRCUIT_IMAGE.get_at((int(x), int(y)))
-            return color_at_position in [self.environment.ROAD_COLOR, self.environment.CHECKPOINT_COLOR, self.environment.START_COLOR]
+            return self.environment.track_grid[int(x), int(y)] != OFF_ROAD
         return False
 
     def update_sensors(self):
         """Update the vehicle's sensors."""
+        is_on_road = self.is_on_road(self.x, self.y)  # Shared by all the sensors
         for sensor in self.sensors:
-            sensor.update(self.environment)
+            sensor.update(self.environment, is_on_road)
 
     def update_score(self, delta):
         """Update the vehicle's score."""
         self.score = round(self.score + delta, 1)
 
     def check_checkpoint(self, current_time, checkpoints):
-        """Check if the vehicle has reached a checkpoint."""
-        radius = 2
-        for dx in range(-radius, radius + 1):
-            for dy in range(-radius, radius + 1):
-                if dx * dx + dy * dy <= radius * radius:
-                    check_x, check_y = int(self.x + dx), int(self.y + dy)
-                    if self.is_valid_position(check_x, check_y):
-                        color_at_position = self.environment.CIRCUIT_IMAGE.get_at((check_x, check_y))
-                        if color_at_position == self.environment.CHECKPOINT_COLOR:
-                            position = (check_x, check_y)
-                            if position == self.last_checkpoint:
-                                return 0
-                            
-                            if position in checkpoints:
-                                checkpoint = checkpoints[position]
-                                if checkpoint.is_active(current_time):
-                                    checkpoint.last_crossed = current_time
-                                    self.last_checkpoint = position
-                                    return 10
-                            else:
-                                checkpoints[position] = Checkpoint(position)
-                                checkpoints[position].last_crossed = current_time
-                                self.last_checkpoint = position
-                                return 10
-        return 0
+        """
+        Check if the vehicle crossed the next checkpoint line during its last move.
+
+        Lines must be crossed in driving order, so driving back and forth over a line
+        (or skipping one) is not rewarded.
+
+        Args:
+            current_time (float): Current simulation time, for the checkpoint cooldown.
+            checkpoints (dict): Checkpoint line ID -> Checkpoint already crossed.
+
+        Returns:
+            int: The checkpoint reward, 0 if no new line was crossed.
+        """
+        track = self.environment.track
+        if not track.checkpoint_order:
+            return 0
+        x0, y0 = self.previous_position
+        # Skip the crossing test when every checkpoint is farther away than the move
+        if self.is_valid_position(x0, y0) and track.checkpoint_distance[int(x0), int(y0)] > math.hypot(self.x - x0, self.y - y0) + 2:
+            return 0
+
+        checkpoint_id = crossed_checkpoint(track.checkpoint_ids, x0, y0, self.x, self.y)
+        if checkpoint_id != track.checkpoint_order[self.next_checkpoint]:
+            return 0
+        checkpoint = checkpoints.get(checkpoint_id)
+        if checkpoint is None:
+            checkpoint = checkpoints[checkpoint_id] = Checkpoint(checkpoint_id)
+        elif not checkpoint.is_active(current_time):
+            return 0
+        checkpoint.last_crossed = current_time
+        self.last_checkpoint = checkpoint_id
+        self.next_checkpoint = (self.next_checkpoint + 1) % len(track.checkpoint_order)
+        return VEHICLE_CONFIG["CHECKPOINT_REWARD"]
 
     def is_valid_position(self, x, y):
         """Check if the given position is within the screen boundaries."""
@@ -228,7 +327,7 @@ class Vehicle:
 
     def reward_road(self):
         """Calculate the reward based on the vehicle's position on the road."""
-        current_time = time.time()
+        current_time = self.clock.time
         if current_time - self.last_road_check_time >= 0.25:
             road_status = self.check_road_status(self.x, self.y)
             self.last_road_check_time = current_time
@@ -247,8 +346,7 @@ class Vehicle:
         Reward the agent for maintaining distance from the track edges.
         Focuses on lateral sensors (indices 0, 1, 3, 4).
         """
-        lateral_sensors = [self.sensors[i] for i in [0, 1, 3, 4]]
-        min_distance = min(sensor.distance for sensor in lateral_sensors)
+        min_distance = min(sensor.distance for sensor in self._lateral_sensors)
         
         # Normalize the minimum distance (assuming 50 is the maximum distance for lateral sensors)
         reward = min_distance / 100
@@ -261,6 +359,9 @@ class Vehicle:
         total_reward = 0
         total_reward += round(self.reward_speed() * self.reward_distance(), 1)
         
+        if VEHICLE_CONFIG["CHECKPOINT_REWARD"]:
+            total_reward += self.check_checkpoint(self.clock.time, self.checkpoints)
+
         if self.collided:
             total_reward -= 25
 
@@ -0,0 +1,26 @@
+import os
+import sys
+import pytest
+
+# No window or audio device during the tests
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+# Add the parent directory to the path (for config.py and the project packages)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Circuit images in assets/images, every circuit-level test runs on each of them
+IMAGE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "images")
+CIRCUITS = sorted(name for name in os.listdir(IMAGE_DIRECTORY) if name.startswith("circuit_") and name.endswith(".png"))
+
+@pytest.fixture(scope="session")
+def get_environment():
+    """Get a headless environment of a circuit, loaded once per test session."""
+    from models.environment import Environment
+    environments = {}
+
+    def get(circuit):
+        if circuit not in environments:
+            environments[circuit] = Environment(headless=True, circuit=circuit)
+        return environments[circuit]
+    return get
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from config import QL_CONFIG, DQN_CONFIG
+from machine_learning.agent import Agent, create_agent
+from models.vehicle import Vehicle
+from conftest import CIRCUITS
+
+STATE_SIZE, ACTION_SIZE = 6, 4
+
+def test_agent_is_abstract():
+    with pytest.raises(TypeError):
+        Agent()
+
+def test_unknown_agent():
+    with pytest.raises(ValueError):
+        create_agent("sarsa", STATE_SIZE, ACTION_SIZE)
+
+@pytest.mark.parametrize("kind, backend", [("q_learning", "dict"), ("q_learning", "dense"), ("dqn", None)])
+def test_agent_learns_saves_and_loads(kind, backend, get_environment, monkeypatch, tmp_path):
+    # Models are saved relative to the working directory, in the directories of the repository
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "machine_learning" / "q_learning" / "q_tables").mkdir(parents=True)
+    monkeypatch.setitem(QL_CONFIG, "SEED", 0)
+    monkeypatch.setitem(DQN_CONFIG, "SEED", 0)
+    if backend is not None:
+        monkeypatch.setitem(QL_CONFIG, "Q_TABLE_BACKEND", backend)
+    # Train from the first minibatch, so the smoke run updates the network
+    monkeypatch.setitem(DQN_CONFIG, "LEARNING_STARTS", 32)
+    monkeypatch.setitem(DQN_CONFIG, "BATCH_SIZE", 32)
+    agent = create_agent(kind, STATE_SIZE, ACTION_SIZE, state_bounds=Vehicle.get_state_bounds())
+    assert isinstance(agent, Agent)
+    assert not agent.load()
+
+    vehicle = Vehicle(get_environment(CIRCUITS[0]), raw_state=agent.RAW_STATE)
+    state = vehicle.observe()
+    states = []
+    for _ in range(200):
+        action = agent.get_action(state)
+        assert 0 <= action < ACTION_SIZE
+        next_state, reward, done = vehicle.step(action)
+        agent.observe(state, action, reward, next_state, done, stream=0)
+        agent.decay_exploration()
+        states.append(state)
+        state = next_state
+        if done:
+            agent.end_episode(vehicle.score)
+            vehicle.reset()
+            state = vehicle.observe()
+    assert agent.exploration_rate < 1.0
+    assert len(agent) > 0
+    agent.save(full=True)
+    agent.close()
+
+    loaded = create_agent(kind, STATE_SIZE, ACTION_SIZE, state_bounds=Vehicle.get_state_bounds())
+    assert loaded.load()
+    assert loaded.exploration_rate == agent.exploration_rate
+    assert len(loaded) == len(agent)
+    assert [loaded.get_action(state, use_epsilon=False) for state in states] == \
+           [agent.get_action(state, use_epsilon=False) for state in states]
+    loaded.close()
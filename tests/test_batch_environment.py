@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from config import SESSION_CONFIG, SENSOR_CONFIG
+from models.batch_environment import BatchEnvironment, round_like_python
+from models.vehicle import Vehicle
+from conftest import CIRCUITS
+
+NUM_VEHICLES = 6
+
+def test_round_like_python():
+    rng = np.random.default_rng(0)
+    # Ties such as 0.35 and 2.25 included, where np.round disagrees with round()
+    values = np.concatenate((rng.uniform(-100, 100, 5000), np.arange(-200, 200) * 0.05,
+                             np.round(rng.uniform(-10, 10, 1000), 2)))
+    assert round_like_python(values).tolist() == [round(value, 1) for value in values.tolist()]
+    assert round_like_python(values, 2).tolist() == [round(value, 2) for value in values.tolist()]
+
+def driving_actions(sensor_distances, rng):
+    """
+    Seeded actions: half of the vehicles act at random, the others follow the road
+    with their sensors (with some noise) so they reach the checkpoint lines.
+    """
+    actions = rng.choice(4, size=len(sensor_distances), p=[0.55, 0.2, 0.2, 0.05])
+    right, front, left = sensor_distances[:, 0], sensor_distances[:, 2], sensor_distances[:, 4]
+    following = np.where(front > 60, 0, np.where(left > right, 1, 2))
+    steered = (np.arange(len(actions)) % 2 == 0) & (rng.random(len(actions)) < 0.9)
+    return np.where(steered, following, actions)
+
+def reset_states(vehicles):
+    """States of the vehicles with their sensors read at the current pose (Vehicle.reset keeps the last readings)."""
+    for vehicle in vehicles:
+        vehicle.update_sensors()
+    return [list(vehicle.get_state()) for vehicle in vehicles]
+
+@pytest.mark.parametrize("use_distance_field", [False, True])
+@pytest.mark.parametrize("circuit", CIRCUITS)
+def test_batch_matches_independent_vehicles(circuit, use_distance_field, get_environment, monkeypatch):
+    monkeypatch.setitem(SESSION_CONFIG, "EPISODE_STEPS", 100)  # Some episodes end on the step limit, others crash
+    environment = get_environment(circuit)
+    saved_field = environment.distance_field
+    if use_distance_field:
+        environment.load_distance_field(max(length for _, length in SENSOR_CONFIG["SENSORS"]))
+    else:
+        environment.distance_field = None
+    try:
+        batch = BatchEnvironment(environment, NUM_VEHICLES)
+        vehicles = [Vehicle(environment, kernel_backend="python") for _ in range(NUM_VEHICLES)]
+        states = batch.reset()
+        assert states.tolist() == reset_states(vehicles)
+
+        rng = np.random.default_rng(0)
+        crashes = timeouts = resets = checkpoints = 0
+        for step in range(900):
+            actions = driving_actions(batch.sensor_distances, rng)
+            was_done = batch.get_dones()
+            states, rewards, dones = batch.step(actions)
+            for i, vehicle in enumerate(vehicles):
+                if was_done[i]:
+                    # Finished vehicles wait for their reset without moving or scoring
+                    assert rewards[i] == 0 and dones[i]
+                    continue
+                state, reward, done = vehicle.step(int(actions[i]))
+                assert (tuple(states[i]), rewards[i], dones[i]) == (state, reward, done)
+                crashes += vehicle.collided
+                timeouts += done and not vehicle.collided
+            assert batch.x.tolist() == [vehicle.x for vehicle in vehicles]
+            assert batch.y.tolist() == [vehicle.y for vehicle in vehicles]
+            assert batch.angle.tolist() == [vehicle.angle for vehicle in vehicles]
+            assert batch.speed.tolist() == [vehicle.speed for vehicle in vehicles]
+            assert batch.score.tolist() == [vehicle.score for vehicle in vehicles]
+            assert batch.next_checkpoint.tolist() == [vehicle.next_checkpoint for vehicle in vehicles]
+            checkpoints += int((batch.next_checkpoint > 0).sum())
+
+            if step % 40 == 39:
+                # Reset the finished vehicles and a few running ones
+                mask = batch.get_dones() | (rng.random(NUM_VEHICLES) < 0.2)
+                states = batch.reset(mask)
+                for i in np.flatnonzero(mask):
+                    vehicles[i].reset()
+                    resets += 1
+                assert states.tolist() == reset_states(vehicles)
+        assert crashes > 0 and timeouts > 0 and resets > NUM_VEHICLES
+        assert checkpoints > 0 or not environment.track.checkpoint_order  # Only circuit_1 has checkpoint lines
+    finally:
+        environment.distance_field = saved_field
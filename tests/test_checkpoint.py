@@ -0,0 +1,119 @@
+import math
+import numpy as np
+import pygame
+
+from config import VEHICLE_CONFIG
+from models.checkpoint import CHECKPOINT_COOLDOWN, crossed_checkpoint, crossed_checkpoints
+from models.track import ROAD, CHECKPOINT, build_track_grid, find_start_position, label_checkpoints, order_checkpoints
+from models.vehicle import Vehicle
+
+ROAD_COLOR, CHECKPOINT_COLOR, START_COLOR = (0, 0, 0), (128, 128, 128), (255, 255, 0)
+COLORS = (ROAD_COLOR, CHECKPOINT_COLOR, START_COLOR)
+
+def ring_surface():
+    """
+    A rectangular ring road 8 pixels wide, started at x = 15 on the top side heading left.
+
+    Checkpoint lines across the road: one on the left side, two on the top side behind the start.
+    """
+    surface = pygame.Surface((60, 40))
+    surface.fill(ROAD_COLOR)
+    surface.fill((255, 255, 255), pygame.Rect(8, 8, 44, 24))
+    surface.fill(START_COLOR, pygame.Rect(15, 0, 1, 8))
+    surface.fill(CHECKPOINT_COLOR, pygame.Rect(0, 20, 8, 1))
+    surface.fill(CHECKPOINT_COLOR, pygame.Rect(40, 0, 1, 8))
+    surface.fill(CHECKPOINT_COLOR, pygame.Rect(50, 0, 1, 8))
+    return surface
+
+def test_parallel_lines_are_separate_lines():
+    grid = np.full((30, 10), ROAD, dtype=np.uint8)
+    grid[20, :] = CHECKPOINT
+    grid[10, :] = CHECKPOINT
+    grid[[3, 4, 5], [2, 3, 4]] = CHECKPOINT  # Diagonal pixels are 8-connected: one line
+    checkpoint_ids, count = label_checkpoints(grid)
+    assert count == 3 and checkpoint_ids.dtype == np.uint16
+    # IDs in scan order (by x, then y), every pixel of a line labeled
+    assert checkpoint_ids[[3, 4, 5], [2, 3, 4]].tolist() == [1, 1, 1]
+    assert set(checkpoint_ids[10].tolist()) == {2} and set(checkpoint_ids[20].tolist()) == {3}
+    assert (checkpoint_ids > 0).sum() == (grid == CHECKPOINT).sum()
+
+def test_lines_are_ordered_along_the_road_from_the_start():
+    grid = build_track_grid(ring_surface(), *COLORS)
+    start_position = find_start_position(grid)
+    assert start_position == (15, 0, 180.0)
+    checkpoint_ids, count = label_checkpoints(grid)
+    assert count == 3
+    left, near, far = checkpoint_ids[0, 20], checkpoint_ids[40, 0], checkpoint_ids[50, 0]
+    assert (left, near, far) == (1, 2, 3)
+    # Around the ring: left side, bottom, right side, then the top side towards the start
+    assert order_checkpoints(grid, checkpoint_ids, count, start_position) == [left, far, near]
+    assert order_checkpoints(grid, checkpoint_ids, count, None) == [1, 2, 3]
+
+def reference_crossing(checkpoint_ids, x0, y0, x1, y1, samples=20000):
+    """First line ID met by densely sampling the segment, 0 if none."""
+    t = np.linspace(0, 1, samples)
+    px, py = np.floor(x0 + t * (x1 - x0)).astype(int), np.floor(y0 + t * (y1 - y0)).astype(int)
+    width, height = checkpoint_ids.shape
+    inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    ids = checkpoint_ids[px[inside], py[inside]]
+    return int(ids[ids > 0][0]) if (ids > 0).any() else 0
+
+def test_fast_diagonal_move_detects_one_pixel_line():
+    checkpoint_ids = np.zeros((40, 30), dtype=np.uint16)
+    checkpoint_ids[25, :] = 1
+    np.fill_diagonal(checkpoint_ids[5:, 5:], 2)  # A 1-pixel diagonal line, its pixels only touch at the corners
+    max_speed = VEHICLE_CONFIG["MAX_SPEED"]
+    for angle in (30, 45, 60, 135, 225, 315):
+        dx, dy = max_speed * math.cos(math.radians(angle)), -max_speed * math.sin(math.radians(angle))
+        # Over the vertical line from either side, neither end on it
+        x0 = 25.5 - dx / 2
+        assert math.floor(x0) != 25 and math.floor(x0 + dx) != 25
+        assert crossed_checkpoint(checkpoint_ids, x0, 15.3, x0 + dx, 15.3 + dy) == 1
+    # Perpendicular to the diagonal line, between two of its pixels' centers
+    assert crossed_checkpoint(checkpoint_ids, 8.5, 12.8, 12.7, 8.6) == 2
+    assert crossed_checkpoints(checkpoint_ids, [8.5], [12.8], [12.7], [8.6]).tolist() == [2]
+
+    # Random short moves against a densely sampled reference
+    rng = np.random.default_rng(0)
+    x0, y0 = rng.uniform(-5, 45, 3000), rng.uniform(-5, 35, 3000)
+    angle, length = rng.uniform(0, 2 * math.pi, 3000), rng.uniform(0, max_speed, 3000)
+    x1, y1 = x0 + length * np.cos(angle), y0 - length * np.sin(angle)
+    expected = [reference_crossing(checkpoint_ids, *segment) for segment in zip(x0, y0, x1, y1)]
+    assert crossed_checkpoints(checkpoint_ids, x0, y0, x1, y1).tolist() == expected
+    assert [crossed_checkpoint(checkpoint_ids, *segment) for segment in zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist())] == expected
+    assert any(expected)
+
+def move_across(vehicle, checkpoint_id):
+    """Put the vehicle through one pixel of a checkpoint line, as if it just moved there."""
+    px, py = np.argwhere(vehicle.environment.track.checkpoint_ids == checkpoint_id)[0].tolist()
+    vehicle.previous_position = (px + 0.5, py - 2.5)
+    vehicle.x, vehicle.y = px + 0.5, py + 3.5
+
+def test_lines_reward_once_and_in_order(get_environment):
+    environment = get_environment("circuit_1.png")
+    order = environment.track.checkpoint_order
+    vehicle = Vehicle(environment, kernel_backend="python")
+    reward = VEHICLE_CONFIG["CHECKPOINT_REWARD"]
+    checkpoints = {}
+
+    move_across(vehicle, order[0])
+    assert vehicle.check_checkpoint(1.0, checkpoints) == reward and vehicle.next_checkpoint == 1
+    # Driving back and forth over the same line
+    for time in (1.1, 1.2, 1.0 + CHECKPOINT_COOLDOWN + 1):
+        move_across(vehicle, order[0])
+        assert vehicle.check_checkpoint(time, checkpoints) == 0
+    # Skipping a line, or crossing the lines backwards
+    for checkpoint_id in (order[2], order[-1]):
+        move_across(vehicle, checkpoint_id)
+        assert vehicle.check_checkpoint(2.0, checkpoints) == 0
+    assert vehicle.next_checkpoint == 1
+
+    move_across(vehicle, order[1])
+    assert vehicle.check_checkpoint(2.0, checkpoints) == reward and vehicle.next_checkpoint == 2
+    assert set(checkpoints) == set(order[:2])
+
+    # After a whole lap, the first line only rewards again once its cooldown is over
+    vehicle.next_checkpoint = 0
+    move_across(vehicle, order[0])
+    assert vehicle.check_checkpoint(1.0 + CHECKPOINT_COOLDOWN - 0.5, checkpoints) == 0
+    assert vehicle.check_checkpoint(1.0 + CHECKPOINT_COOLDOWN, checkpoints) == reward
@@ -0,0 +1,79 @@
+import math
+import numpy as np
+import pytest
+
+from config import TRACK_CONFIG
+from machine_learning.curriculum import TrackCurriculum
+
+CIRCUITS = ["a.png", "b.png", "c.png"]
+
+def test_round_robin():
+    curriculum = TrackCurriculum(CIRCUITS)
+    assert [curriculum.next_circuit() for _ in range(7)] == CIRCUITS * 2 + CIRCUITS[:1]
+
+def test_performance_warms_up_in_turn_until_every_circuit_has_scores():
+    curriculum = TrackCurriculum(CIRCUITS, "performance", window=2, seed=0)
+    assert curriculum.performance_probabilities() is None
+    # Two circuits with full windows, the third without any score yet
+    for circuit, score in [("a.png", 10), ("a.png", 20), ("b.png", 30), ("b.png", 40)]:
+        curriculum.record(circuit, score)
+    assert curriculum.mean_scores() == {"a.png": 15, "b.png": 35, "c.png": None}
+    assert curriculum.performance_probabilities() is None
+    assert [curriculum.next_circuit() for _ in range(4)] == CIRCUITS + CIRCUITS[:1]
+    curriculum.record("c.png", 0)  # One score is not a full window
+    assert curriculum.performance_probabilities() is None
+    curriculum.record("c.png", 0)
+    assert curriculum.performance_probabilities() is not None
+
+def test_performance_favors_the_weakest_circuit():
+    curriculum = TrackCurriculum(CIRCUITS, "performance", window=2, temperature=0.5, seed=0)
+    for circuit, score in [("a.png", 100), ("b.png", 50), ("c.png", 0)] * 2:
+        curriculum.record(circuit, score)
+    probabilities = curriculum.performance_probabilities()
+    assert probabilities.sum() == pytest.approx(1)
+    assert probabilities[2] > probabilities[1] > probabilities[0]
+    # The best circuit keeps exp(-1 / temperature) of the weight of the worst one
+    assert probabilities[0] / probabilities[2] == pytest.approx(math.exp(-2))
+    draws = [curriculum.next_circuit() for _ in range(3000)]
+    frequencies = np.array([draws.count(circuit) for circuit in CIRCUITS]) / len(draws)
+    np.testing.assert_allclose(frequencies, probabilities, atol=0.03)
+
+def test_performance_is_uniform_when_means_are_equal():
+    curriculum = TrackCurriculum(CIRCUITS, "performance", window=1)
+    for circuit in CIRCUITS:
+        curriculum.record(circuit, 42)
+    assert curriculum.performance_probabilities().tolist() == [1 / 3] * 3
+
+def test_only_recent_scores_count():
+    curriculum = TrackCurriculum(CIRCUITS, "performance", window=2)
+    for score in (0, 0, 90, 100):
+        curriculum.record("a.png", score)
+    assert curriculum.mean_scores()["a.png"] == 95
+    assert curriculum.episode_counts["a.png"] == 4
+
+def test_weighted_draws():
+    curriculum = TrackCurriculum(CIRCUITS, "weighted", weights=[2, 1, 1], seed=0)
+    assert curriculum.probabilities.tolist() == [0.5, 0.25, 0.25]
+    draws = [curriculum.next_circuit() for _ in range(4000)]
+    np.testing.assert_allclose([draws.count(circuit) / len(draws) for circuit in CIRCUITS], [0.5, 0.25, 0.25], atol=0.03)
+    # Seeded draws repeat
+    again = TrackCurriculum(CIRCUITS, "weighted", weights=[2, 1, 1], seed=0)
+    assert [again.next_circuit() for _ in range(4000)] == draws
+
+@pytest.mark.parametrize("weights", [None, [1, 1], [1, -1, 1], [0, 0, 0]])
+def test_invalid_weights(weights):
+    with pytest.raises(ValueError):
+        TrackCurriculum(CIRCUITS, "weighted", weights=weights)
+
+def test_invalid_curriculum():
+    with pytest.raises(ValueError):
+        TrackCurriculum(CIRCUITS, "hardest_first")
+    with pytest.raises(ValueError):
+        TrackCurriculum([])
+
+def test_summary():
+    curriculum = TrackCurriculum.from_config({**TRACK_CONFIG, "CURRICULUM": "round_robin"}, CIRCUITS[:2])
+    curriculum.record("a.png", 12.34)
+    lines = curriculum.format_summary().splitlines()
+    assert lines[0] == f"a.png: 1 episodes, mean score 12.3 (last {TRACK_CONFIG['CURRICULUM_WINDOW']})"
+    assert lines[1].startswith("b.png: 0 episodes, mean score -")
@@ -0,0 +1,18 @@
+import pygame
+
+from models.environment import Environment
+from conftest import CIRCUITS
+
+def test_text_boxes_match_font_render():
+    environment = Environment(headless=True, circuit=CIRCUITS[0])
+    environment.init_display()
+    for font in (environment.FONT_BIG, environment.FONT_SMALL):
+        for text in ("Score: 147.5", "Time: 9.8", "AVAWAY To 7.1"):  # Pairs kerned by most fonts
+            box = environment._render_text_box(font, text)
+            assert environment._render_text_box(font, text) is box
+            expected = font.render(text, True, environment.TEXT_COLOR)
+            assert box.get_size() == (expected.get_width() + 10, expected.get_height() + 10)
+            reference = pygame.Surface(box.get_size())
+            reference.fill(environment.TEXTBOX_COLOR)
+            reference.blit(expected, (5, 5))
+            assert pygame.image.tobytes(box, "RGB") == pygame.image.tobytes(reference, "RGB")
@@ -0,0 +1,106 @@
+import json
+import pytest
+
+from config import QL_CONFIG, DQN_CONFIG
+from machine_learning.exploration import ExplorationScheduler
+
+def test_exponential_decays_to_the_minimum():
+    scheduler = ExplorationScheduler("exponential", "step", initial_rate=1.0, min_rate=0.1, decay=0.5)
+    assert scheduler.units_to_min() == 4
+    assert scheduler.preview(5) == [0.5, 0.25, 0.125, 0.1, 0.1]
+    assert scheduler.rate == 1.0  # preview() does not move the schedule
+    rates = []
+    for _ in range(5):
+        scheduler.step()
+        rates.append(scheduler.rate)
+    assert rates == [0.5, 0.25, 0.125, 0.1, 0.1]
+    assert scheduler.units_to_min() == 0
+
+@pytest.mark.parametrize("schedule", ["linear", "cosine"])
+def test_horizon_schedules_endpoints(schedule):
+    scheduler = ExplorationScheduler(schedule, "episode", initial_rate=1.0, min_rate=0.2, horizon=10)
+    assert scheduler.rate_at(0) == 1.0
+    assert scheduler.rate_at(5) == pytest.approx(0.6)  # Both are halfway at half the horizon
+    assert scheduler.rate_at(10) == pytest.approx(0.2)
+    assert scheduler.rate_at(25) == pytest.approx(0.2)
+    rates = []
+    for _ in range(12):
+        scheduler.end_episode(0)
+        rates.append(scheduler.rate)
+    assert rates == ExplorationScheduler(schedule, "episode", 1.0, 0.2, horizon=10).preview(12)
+    assert all(earlier >= later for earlier, later in zip(rates, rates[1:]))
+    assert scheduler.units_to_min() == 0
+
+def test_cosine_stays_high_longer_than_linear():
+    linear = ExplorationScheduler("linear", initial_rate=1.0, min_rate=0.0, horizon=100)
+    cosine = ExplorationScheduler("cosine", initial_rate=1.0, min_rate=0.0, horizon=100)
+    assert cosine.rate_at(10) > linear.rate_at(10)
+    assert cosine.rate_at(90) < linear.rate_at(90)
+
+def test_unit_selects_what_advances_the_schedule():
+    per_episode = ExplorationScheduler("exponential", "episode", decay=0.5)
+    per_episode.step()
+    assert (per_episode.rate, per_episode.steps) == (1.0, 1)
+    per_episode.end_episode(0)
+    assert (per_episode.rate, per_episode.episodes) == (0.5, 1)
+    per_step = ExplorationScheduler("exponential", "step", decay=0.5)
+    per_step.end_episode(0)
+    assert per_step.rate == 1.0
+
+def test_adaptive_lowers_on_improvement_and_raises_on_stall():
+    scheduler = ExplorationScheduler("adaptive", initial_rate=0.8, min_rate=0.1, adaptive_window=2, adaptive_factor=0.5)
+    rates = []
+    for score in [10, 20, 30, 40, 0, 0, 50, 50, 60, 60, 70, 70]:
+        scheduler.end_episode(score)
+        rates.append(scheduler.rate)
+    # Windows: 15 (best, lower), 35 (best, lower), 0 (stall, raise), 50, 60, 70 (best, lower down to the minimum)
+    assert rates == [0.8, 0.4, 0.4, 0.2, 0.2, 0.4, 0.4, 0.2, 0.2, 0.1, 0.1, 0.1]
+    assert scheduler.best_mean_score == 70
+    for score in [0] * 8:  # Stalls raise epsilon up to the initial rate
+        scheduler.end_episode(score)
+    assert scheduler.rate == 0.8
+    # Learning steps and previews do not move it
+    scheduler.step()
+    assert scheduler.rate == 0.8 and scheduler.preview(3) == [0.8] * 3 and scheduler.units_to_min() == 0
+
+@pytest.mark.parametrize("schedule, unit", [("exponential", "step"), ("linear", "episode"), ("cosine", "step"), ("adaptive", "episode")])
+def test_state_round_trip(schedule, unit):
+    def run(scheduler, episodes):
+        for episode in range(episodes):
+            for _ in range(7):
+                scheduler.step()
+            scheduler.end_episode(episode % 5)
+    kwargs = dict(initial_rate=1.0, min_rate=0.05, decay=0.99, horizon=200, adaptive_window=3, adaptive_factor=0.7)
+    scheduler = ExplorationScheduler(schedule, unit, **kwargs)
+    run(scheduler, 10)
+    restored = ExplorationScheduler(schedule, unit, **kwargs)
+    restored.load_state(json.loads(json.dumps(scheduler.state_dict())))  # Saved as JSON with the model
+    assert restored.state_dict() == scheduler.state_dict()
+    run(scheduler, 10)
+    run(restored, 10)
+    assert restored.state_dict() == scheduler.state_dict()
+
+def test_changed_schedule_recomputes_epsilon_at_the_saved_position():
+    saved = ExplorationScheduler("exponential", "episode", decay=0.9)
+    for _ in range(5):
+        saved.step()
+        saved.end_episode(0)
+    linear = ExplorationScheduler("linear", "episode", min_rate=0.0, horizon=10)
+    linear.load_state(saved.state_dict())
+    assert (linear.steps, linear.episodes) == (5, 5)
+    assert linear.rate == pytest.approx(0.5)
+    per_step = ExplorationScheduler("exponential", "step", decay=0.9)
+    per_step.load_state(saved.state_dict())
+    assert per_step.rate == pytest.approx(0.9 ** 5)
+
+@pytest.mark.parametrize("config", [QL_CONFIG, DQN_CONFIG])
+def test_configured_schedules(config):
+    scheduler = ExplorationScheduler.from_config(config)
+    assert scheduler.rate == config["EXPLORATION_RATE"]
+    assert scheduler.units_to_min() > 0
+
+def test_invalid_schedule():
+    with pytest.raises(ValueError):
+        ExplorationScheduler("step_decay")
+    with pytest.raises(ValueError):
+        ExplorationScheduler("linear", unit="minute")
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from visualization.grapher import MinMaxDecimator, MovingAverage
+
+def chunks(values, sizes):
+    """Split values into consecutive chunks of the given sizes, the rest in a last chunk."""
+    bounds = np.cumsum([0] + list(sizes) + [len(values)])
+    return [values[start:end] for start, end in zip(bounds[:-1], np.minimum(bounds[1:], len(values)))]
+
+def test_fewer_points_than_buckets_are_all_kept():
+    decimator = MinMaxDecimator(max_buckets=50)
+    x = np.arange(30, dtype=np.float64)
+    y = np.random.default_rng(0).normal(size=30)
+    for x_chunk, y_chunk in zip(chunks(x, [7, 1, 10]), chunks(y, [7, 1, 10])):
+        decimator.extend(x_chunk, y_chunk)
+    points_x, points_y = decimator.points()
+    assert decimator.bucket_size == 1
+    assert points_x.tolist() == x.tolist() and points_y.tolist() == y.tolist()
+
+@pytest.mark.parametrize("max_buckets", [1, 7, 64])
+def test_extremes_of_every_bucket_are_kept(max_buckets):
+    rng = np.random.default_rng(max_buckets)
+    y = np.cumsum(rng.normal(size=10_000))
+    y[[1234, 8765]] = [1e6, -1e6]  # Spikes
+    x = np.arange(len(y), dtype=np.float64)
+    decimator = MinMaxDecimator(max_buckets)
+    sizes = rng.integers(1, 700, size=40)
+    for x_chunk, y_chunk in zip(chunks(x, sizes), chunks(y, sizes)):
+        decimator.extend(x_chunk, y_chunk)
+    points_x, points_y = decimator.points()
+
+    # The kept points are bounded, in x order, and taken from the series
+    size = decimator.bucket_size
+    assert len(y) // size <= max_buckets
+    assert len(points_x) <= 2 * max_buckets + 2
+    assert (np.diff(points_x) > 0).all()
+    np.testing.assert_array_equal(points_y, y[points_x.astype(int)])
+
+    # The minimum and maximum of every complete bucket, and of the unfinished one
+    kept = set(points_x.astype(int).tolist())
+    full = len(y) // size * size
+    buckets = y[:full].reshape(-1, size)
+    offsets = np.arange(0, full, size)
+    assert set((offsets + buckets.argmin(axis=1)).tolist()) <= kept
+    assert set((offsets + buckets.argmax(axis=1)).tolist()) <= kept
+    if full < len(y):
+        assert {full + int(np.argmin(y[full:])), full + int(np.argmax(y[full:]))} <= kept
+    assert {1234, 8765} <= kept
+
+    # Appending chunk by chunk gives the same points as one call
+    one_shot = MinMaxDecimator(max_buckets)
+    one_shot.extend(x, y)
+    assert one_shot.bucket_size == size
+    for incremental, expected in zip((points_x, points_y), one_shot.points()):
+        np.testing.assert_array_equal(incremental, expected)
+
+def reference_moving_average(values, window_size):
+    return np.convolve(values, np.ones(window_size) / window_size, mode="valid")
+
+@pytest.mark.parametrize("window_size", [1, 5, 100])
+def test_incremental_moving_average_matches_one_shot(window_size):
+    rng = np.random.default_rng(window_size)
+    values = rng.normal(size=2000) * 50
+    moving_average = MovingAverage(window_size)
+    sizes = [1, 2, 3, 250, 1, 0, 400]
+    averages = np.concatenate([moving_average.extend(chunk) for chunk in chunks(values, sizes)])
+    np.testing.assert_allclose(averages, reference_moving_average(values, window_size), rtol=1e-9, atol=1e-9)
+
+def test_window_larger_than_the_series():
+    moving_average = MovingAverage(10)
+    values = np.arange(1, 16, dtype=np.float64)
+    assert len(moving_average.extend(values[:4])) == 0
+    assert len(moving_average.extend(values[4:9])) == 0  # 9 values, one short of a window
+    averages = moving_average.extend(values[9:])
+    np.testing.assert_allclose(averages, reference_moving_average(values, 10))
+    assert averages[0] == 5.5
@@ -0,0 +1,67 @@
+import math
+import numpy as np
+import pytest
+
+from config import SENSOR_CONFIG
+from models.kernels import load_kernels
+from models.vehicle import Vehicle
+from conftest import CIRCUITS
+
+def random_poses(environment, count, seed):
+    """Seeded (x, y, angle) poses, some of them outside the window."""
+    rng = np.random.default_rng(seed)
+    return zip(rng.uniform(-20, environment.SCREEN_WIDTH + 20, count).tolist(),
+               rng.uniform(-20, environment.SCREEN_HEIGHT + 20, count).tolist(),
+               rng.uniform(0, 360, count).tolist())
+
+def reference_readings(vehicle, environment, distance_field):
+    """Sensor readings of the reference Python/NumPy code, with or without the distance field."""
+    environment.distance_field = distance_field
+    try:
+        vehicle.update_sensors()
+    finally:
+        environment.distance_field = environment._distance_fields.get(environment.circuit)
+    return [sensor.distance for sensor in vehicle.sensors]
+
+@pytest.mark.parametrize("circuit", CIRCUITS)
+def test_compiled_kernels_match_reference(circuit, get_environment):
+    pytest.importorskip("numba")
+    environment = get_environment(circuit)
+    kernels = load_kernels("numba")
+    reference = Vehicle(environment, kernel_backend="python")
+    environment.load_distance_field(max(length for _, length in SENSOR_CONFIG["SENSORS"]))
+    distance_field = environment.distance_field
+    grid = environment.track_grid
+    for x, y, angle in random_poses(environment, 3000, seed=0):
+        reference.x, reference.y, reference.angle = x, y, angle
+        reference._road_status_position = None  # Never reuse a status
+
+        # Road test of the vehicle rectangle
+        on_road_count = kernels.corners_on_road(grid, x, y, angle, reference._corner_array, reference.width, reference.height)
+        expected_status = reference.check_road_status(x, y)
+        assert {4: "on_road", 0: "completely_off"}.get(on_road_count, "partially_off") == expected_status
+
+        # Sensor rays, scanning every pixel and marching with the distance field
+        is_on_road = reference.is_on_road(x, y)
+        scanned = reference_readings(reference, environment, None)
+        marched = reference_readings(reference, environment, distance_field)
+        assert scanned == marched
+        for sensor, expected in zip(reference.sensors, scanned):
+            sensor_angle = math.radians(angle + sensor.angle_offset)
+            cos_angle, sin_angle = math.cos(sensor_angle), math.sin(sensor_angle)
+            assert kernels.scan_ray(grid, x, y, cos_angle, sin_angle, sensor.length, is_on_road) == expected
+            assert kernels.march_ray(grid, distance_field, x, y, cos_angle, sin_angle, sensor.length, is_on_road) == expected
+
+@pytest.mark.parametrize("circuit", CIRCUITS)
+def test_kernel_backends_give_identical_traces(circuit, get_environment):
+    environment = get_environment(circuit)
+    vehicles = [Vehicle(environment, kernel_backend="python"), Vehicle(environment, kernel_backend="auto")]
+    actions = np.random.default_rng(3).choice(4, size=3000, p=[0.55, 0.2, 0.2, 0.05]).tolist()
+    for action in actions:
+        results = [vehicle.step(action) for vehicle in vehicles]
+        assert results[0] == results[1]
+        poses = [(vehicle.x, vehicle.y, vehicle.angle, vehicle.speed) for vehicle in vehicles]
+        assert poses[0] == poses[1]
+        if results[0][2]:
+            for vehicle in vehicles:
+                vehicle.reset()
@@ -0,0 +1,36 @@
+import numpy as np
+
+from logs.logger import Logger, read_metrics
+
+def test_metrics_tail_and_start(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    logger = Logger("test.metrics", flush_interval=0)
+    for i in range(50):
+        logger.log_episode(float(i), steps=i, epsilon=0.5)
+    logger.close()
+    path = tmp_path / "logs" / "test.metrics"
+    assert read_metrics(str(path))["score"].tolist() == [float(i) for i in range(50)]
+    assert read_metrics(str(path), last=3)["episode"].tolist() == [48, 49, 50]
+    assert read_metrics(str(path), start=47)["score"].tolist() == [47.0, 48.0, 49.0]
+    assert read_metrics(str(path), last=10, start=45)["episode"].tolist() == [46, 47, 48, 49, 50]
+    assert logger.get_last_score() == 49.0
+
+def test_text_log_tail_is_numbered(tmp_path):
+    path = tmp_path / "old.txt"
+    path.write_text("".join(f"{i}.5\n" for i in range(1000)) + "1000.5")  # No final newline
+    records = read_metrics(str(path), last=3)
+    assert records["episode"].tolist() == [999, 1000, 1001]
+    assert records["score"].tolist() == [998.5, 999.5, 1000.5]
+    assert np.isnan(records["epsilon"]).all()
+    full = read_metrics(str(path))
+    assert full["episode"][-3:].tolist() == records["episode"].tolist()
+    assert full["score"][-3:].tolist() == records["score"].tolist()
+
+def test_text_log_is_imported(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "v1.txt").write_text("1.0\n2.0\n")
+    logger = Logger("v1.metrics", flush_interval=0)
+    logger.log_episode(3.0)
+    logger.close()
+    assert read_metrics(str(tmp_path / "logs" / "v1.metrics"))["score"].tolist() == [1.0, 2.0, 3.0]
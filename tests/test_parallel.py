@@ -0,0 +1,103 @@
+import queue
+import threading
+import numpy as np
+import pytest
+
+from config import PARALLEL_CONFIG, QL_CONFIG, SESSION_CONFIG, TRACK_CONFIG
+from logs.logger import Logger, read_metrics
+from machine_learning.q_learning.agent import QLearningAgent
+from machine_learning.q_learning.parallel import ParallelTrainer, _rollout_worker
+from models.batch_environment import BatchEnvironment
+from models.environment import Environment
+from models.vehicle import Vehicle
+
+class StoppingQueue:
+    """Transition queue that keeps the batches and stops the worker after `count` of them."""
+
+    def __init__(self, count, stop_event):
+        self.batches = []
+        self.count = count
+        self.stop_event = stop_event
+
+    def put(self, batch):
+        self.batches.append(batch)
+        if len(self.batches) >= self.count:
+            self.stop_event.set()
+
+@pytest.fixture
+def small_parallel_config(monkeypatch):
+    """Short episodes and small batches."""
+    monkeypatch.setitem(SESSION_CONFIG, "EPISODE_STEPS", 30)
+    monkeypatch.setitem(PARALLEL_CONFIG, "VEHICLES_PER_WORKER", 4)
+    monkeypatch.setitem(PARALLEL_CONFIG, "BATCH_SIZE", 50)  # Not a multiple of the vehicles
+    monkeypatch.setitem(TRACK_CONFIG, "CIRCUITS", None)
+    monkeypatch.setitem(QL_CONFIG, "SEED", 0)
+
+def test_worker_batches_are_step_major_and_rewards_survive(small_parallel_config):
+    stop_event = threading.Event()
+    transition_queue = StoppingQueue(6, stop_event)
+    policy_queue = queue.Queue()
+    policy_queue.put({"greedy_actions": {}, "exploration_rate": 1.0})
+    _rollout_worker(1, transition_queue, policy_queue, stop_event)
+
+    # Replay the same random actions on a batch of the same circuit
+    num_vehicles = PARALLEL_CONFIG["VEHICLES_PER_WORKER"]
+    batch = BatchEnvironment(Environment(headless=True, circuit=TRACK_CONFIG["CIRCUIT"]), num_vehicles)
+    rng = np.random.default_rng((0, 1))
+    states = batch.reset()
+    for sent in transition_queue.batches:
+        # Whole steps only, so the transition i of a batch belongs to vehicle i % num_vehicles
+        assert len(sent["actions"]) % num_vehicles == 0 and len(sent["actions"]) >= PARALLEL_CONFIG["BATCH_SIZE"]
+        scores, episode_steps = [], []
+        for step in range(len(sent["actions"]) // num_vehicles):
+            rows = slice(step * num_vehicles, (step + 1) * num_vehicles)
+            rng.random(num_vehicles)  # Exploration draws, every action explores
+            actions = rng.integers(0, 4, size=num_vehicles)
+            next_states, rewards, dones = batch.step(actions)
+            assert sent["states"][rows].tolist() == states.tolist()
+            assert sent["actions"][rows].tolist() == actions.tolist()
+            # Rewards are sent as int16 tenths and come back exactly
+            assert (sent["rewards"][rows] / 10).tolist() == rewards.tolist()
+            assert sent["next_states"][rows].tolist() == next_states.tolist()
+            assert sent["dones"][rows].tolist() == batch.collided.tolist()
+            assert sent["ends"][rows].tolist() == dones.tolist()
+            if dones.any():
+                scores.extend(batch.score[dones].tolist())
+                episode_steps.extend(batch.steps[dones].tolist())
+                next_states = batch.reset(dones)
+            states = next_states
+        assert (sent["scores"], sent["episode_steps"]) == (scores, episode_steps)
+    assert sum(len(sent["scores"]) for sent in transition_queue.batches) > 0
+
+def test_parallel_training_counts_and_saves_episodes(small_parallel_config, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # Logs and Q-tables are written relative to the working directory
+    (tmp_path / "machine_learning" / "q_learning" / "q_tables").mkdir(parents=True)
+    monkeypatch.setitem(PARALLEL_CONFIG, "NUM_WORKERS", 2)
+    monkeypatch.setitem(PARALLEL_CONFIG, "SYNC_INTERVAL", 200)
+    monkeypatch.setitem(QL_CONFIG, "TRACE_LAMBDA", 0.8)  # One trace stream per worker vehicle
+    monkeypatch.setitem(QL_CONFIG, "Q_TABLE_BACKEND", "dict")
+    monkeypatch.setitem(QL_CONFIG, "SAVE_INTERVAL", 5)
+    agent = QLearningAgent(6, 4, Vehicle.get_state_bounds())
+    logger = Logger("parallel.metrics")
+    ParallelTrainer(agent, logger).train(20)
+    logger.close()
+    agent.close()
+
+    records = read_metrics(str(tmp_path / "logs" / "parallel.metrics"))
+    assert records["episode"].tolist() == list(range(1, 21))
+    assert (records["steps"] <= 30).all() and (records["steps"] > 0).all()
+    assert agent.exploration.episodes == 20
+    assert agent.exploration.steps % PARALLEL_CONFIG["VEHICLES_PER_WORKER"] == 0
+    assert {stream[0] for stream in agent.traces} <= {0, 1}
+    assert {stream[1] for stream in agent.traces} <= set(range(PARALLEL_CONFIG["VEHICLES_PER_WORKER"]))
+
+    # The final save holds every updated row. Rows only read (created with their default
+    # values) after the last snapshot are not saved, and read back the same.
+    loaded = QLearningAgent(6, 4, Vehicle.get_state_bounds())
+    assert loaded.load()
+    updated = {state for state in agent.q_table.states() if agent.q_table.visits[state]}
+    assert updated and updated <= set(loaded.q_table.states()) <= set(agent.q_table.states())
+    assert loaded.exploration.state_dict() == agent.exploration.state_dict()
+    for state in agent.q_table.states():
+        np.testing.assert_array_equal(loaded.q_table[state], agent.q_table[state])
+    loaded.close()
@@ -0,0 +1,249 @@
+import os
+import json
+import sys
+import pickle
+import hashlib
+import threading
+import numpy as np
+import pytest
+
+from config import QL_CONFIG
+from machine_learning.q_learning.agent import QLearningAgent
+from machine_learning.q_learning import coverage
+from machine_learning.q_learning.persistence import JOURNAL_HEADER, JOURNAL_MAGIC, QTableStore, read_q_table, record_dtype
+from models.vehicle import Vehicle
+
+DTYPE = record_dtype(3, 2, np.float64)
+
+def make_rows(states, value, dtype=DTYPE):
+    """Records of the given state numbers, every Q-value set to `value`."""
+    rows = np.zeros(len(states), dtype=dtype)
+    rows["state"] = [(state, state + 1, state + 2) for state in states]
+    rows["q_values"] = value
+    rows["visits"] = 1
+    return rows
+
+def saved(store, rows, full):
+    """Save the rows and wait until they are written."""
+    store.save(rows, {"backend": "dict"}, full)
+    store.flush()
+
+def as_table(loaded):
+    """Replay the snapshot then the journal of a load (last write wins) into {state: q_values}."""
+    snapshot, journal, _ = loaded
+    table = {}
+    for rows in (snapshot, journal):
+        for state, q_values in zip(rows["state"].tolist(), rows["q_values"].tolist()):
+            table[tuple(state)] = q_values
+    return table
+
+def journal_generation(store):
+    with open(store.journal_path, "rb") as f:
+        magic, generation = JOURNAL_HEADER.unpack(f.read(JOURNAL_HEADER.size))
+    assert magic == JOURNAL_MAGIC
+    return generation
+
+@pytest.fixture
+def store(tmp_path):
+    store = QTableStore(str(tmp_path), "v1")
+    yield store
+    store.close()
+
+def test_snapshot_and_journal_round_trip(store, tmp_path):
+    assert store.load() is None and not store.exists()
+    saved(store, make_rows(range(4), 1.0), full=True)
+    saved(store, make_rows([1, 5], 2.0), full=False)
+    saved(store, make_rows([5], 3.0), full=False)
+
+    reader = QTableStore(str(tmp_path), "v1")
+    snapshot, journal, metadata = loaded = reader.load()
+    reader.close()
+    assert (len(snapshot), len(journal)) == (4, 3)
+    assert not snapshot.flags.writeable
+    assert metadata["generation"] == 1 and metadata["backend"] == "dict"
+    assert as_table(loaded) == {(0, 1, 2): [1.0, 1.0], (1, 2, 3): [2.0, 2.0], (2, 3, 4): [1.0, 1.0],
+                                (3, 4, 5): [1.0, 1.0], (5, 6, 7): [3.0, 3.0]}
+
+    # A new snapshot replaces the old one and starts an empty journal
+    saved(store, make_rows(range(2), 4.0), full=True)
+    assert sorted(os.listdir(tmp_path)) == ["v1.2.npy", "v1.journal", "v1.json"]
+    assert journal_generation(store) == 2
+    snapshot, journal, metadata = store.load()
+    assert (len(snapshot), len(journal), metadata["generation"]) == (2, 0, 2)
+
+def test_journal_of_an_older_snapshot_is_not_replayed(store, tmp_path):
+    saved(store, make_rows(range(3), 1.0), full=True)
+    saved(store, make_rows([0], 2.0), full=False)
+    with open(store.journal_path, "rb") as f:
+        stale_journal = f.read()
+    saved(store, make_rows(range(3), 5.0), full=True)
+
+    # Crash after the new snapshot was committed but before its journal was restarted
+    with open(store.journal_path, "wb") as f:
+        f.write(stale_journal)
+    reader = QTableStore(str(tmp_path), "v1")
+    loaded = reader.load()
+    reader.close()
+    assert len(loaded[1]) == 0
+    assert set(map(tuple, as_table(loaded).values())) == {(5.0, 5.0)}
+    # The journal was restarted for the current snapshot
+    assert journal_generation(store) == 2 and os.path.getsize(store.journal_path) == JOURNAL_HEADER.size
+
+def test_torn_journal_row_is_ignored_and_overwritten(store, tmp_path):
+    saved(store, make_rows(range(3), 1.0), full=True)
+    saved(store, make_rows([0], 2.0), full=False)
+    # Crash in the middle of an append: half a row at the end of the journal
+    with open(store.journal_path, "ab") as f:
+        f.write(make_rows([1], 9.0).tobytes()[:DTYPE.itemsize // 2])
+
+    reader = QTableStore(str(tmp_path), "v1")
+    loaded = reader.load()
+    assert len(loaded[1]) == 1
+    assert as_table(loaded)[(1, 2, 3)] == [1.0, 1.0]
+
+    # The next append drops the partial row, so the rows stay aligned
+    del loaded
+    saved(reader, make_rows([2], 3.0), full=False)
+    reader.close()
+    assert os.path.getsize(store.journal_path) == JOURNAL_HEADER.size + 2 * DTYPE.itemsize
+    table = as_table(store.load())
+    assert (table[(0, 1, 2)], table[(1, 2, 3)], table[(2, 3, 4)]) == ([2.0, 2.0], [1.0, 1.0], [3.0, 3.0])
+
+def test_missing_metadata_file(store, tmp_path):
+    # Crash before the first metadata file was committed: the snapshot alone is not a table
+    np.save(str(tmp_path / "v1.1.npy"), make_rows(range(3), 1.0))
+    assert store.load() is None and not store.exists()
+
+    # Crash after a new snapshot was written but before the metadata file named it
+    saved(store, make_rows(range(3), 1.0), full=True)
+    np.save(str(tmp_path / "v1.2.npy"), make_rows(range(5), 7.0))
+    reader = QTableStore(str(tmp_path), "v1")
+    snapshot, journal, metadata = reader.load()
+    reader.close()
+    assert (metadata["generation"], metadata["snapshot"], len(snapshot)) == (1, "v1.1.npy", 3)
+
+class FakeQuantizer:
+    """Quantizer of the 3-variable test states."""
+
+    @staticmethod
+    def from_description(description):
+        return FakeQuantizer()
+
+    def state_bounds(self):
+        return [(0, 10)] * 3
+
+def file_digests(directory):
+    return {name: hashlib.sha1((directory / name).read_bytes()).hexdigest() for name in os.listdir(directory)}
+
+def test_reading_never_changes_the_files(store, tmp_path, monkeypatch, capsys):
+    assert read_q_table(str(tmp_path), "v1") is None
+    saved(store, make_rows(range(3), 1.0), full=True)
+    saved(store, make_rows([0, 7], 2.0), full=False)
+    with open(store.journal_path, "rb") as f:
+        valid_journal = f.read()
+    snapshot, journal, metadata = read_q_table(str(tmp_path), "v1")
+    assert (len(snapshot), len(journal), metadata["generation"]) == (3, 2, 1)
+    assert as_table((snapshot, journal, metadata)) == as_table(store.load())
+    del snapshot, journal
+
+    # A torn row, a journal of an older snapshot and a torn header are skipped, not repaired
+    saved(store, make_rows(range(3), 5.0), full=True)
+    with open(store.journal_path, "rb") as f:
+        current_journal = f.read()
+    for journal_bytes in (current_journal + b"\1\2\3", valid_journal, valid_journal[:JOURNAL_HEADER.size - 3]):
+        with open(store.journal_path, "wb") as f:
+            f.write(journal_bytes)
+        digests = file_digests(tmp_path)
+        loaded = read_q_table(str(tmp_path), "v1")
+        assert len(loaded[1]) == 0 and set(map(tuple, as_table(loaded).values())) == {(5.0, 5.0)}
+        del loaded
+
+        # Neither does the coverage report, which may run while the table is in training
+        monkeypatch.setattr(sys, "argv", ["coverage.py", "v1", "--directory", str(tmp_path)])
+        monkeypatch.setattr(coverage, "StateQuantizer", FakeQuantizer)
+        coverage.main()
+        assert "Stored states:  3" in capsys.readouterr().out
+        assert file_digests(tmp_path) == digests
+
+def test_needs_snapshot(store):
+    assert store.needs_snapshot(1, DTYPE)  # Nothing saved yet
+    saved(store, make_rows(range(2000), 1.0), full=True)
+    assert not store.needs_snapshot(10, DTYPE)
+    # Another row layout (here float32 Q-values, as in the dense backend) cannot be appended
+    assert store.needs_snapshot(10, record_dtype(3, 2, np.float32))
+    assert store.needs_snapshot(1, record_dtype(4, 2, np.float64))
+    # The journal may grow as large as the snapshot
+    saved(store, make_rows(range(1500), 2.0), full=False)
+    assert not store.needs_snapshot(500, DTYPE)
+    assert store.needs_snapshot(501, DTYPE)
+
+    # A reloaded store decides the same way
+    reader = QTableStore(store.directory, "v1")
+    reader.load()
+    assert not reader.needs_snapshot(500, DTYPE) and reader.needs_snapshot(501, DTYPE)
+    reader.close()
+
+def test_needs_snapshot_counts_queued_saves(store, monkeypatch):
+    saved(store, make_rows(range(10), 1.0), full=True)
+    release = threading.Event()
+    write_snapshot = store._write_snapshot
+    def slow_write_snapshot(rows, metadata):
+        release.wait(5)
+        write_snapshot(rows, metadata)
+    monkeypatch.setattr(store, "_write_snapshot", slow_write_snapshot)
+
+    # The background thread is still writing the first snapshot of float32 rows
+    float_dtype = record_dtype(3, 2, np.float32)
+    store.save(make_rows(range(2000), 1.0, float_dtype), {}, full=True)
+    assert not store.needs_snapshot(10, float_dtype)
+    store.save(make_rows(range(1000), 2.0, float_dtype), {}, full=False)
+    assert not store.needs_snapshot(1000, float_dtype)
+    assert store.needs_snapshot(1001, float_dtype)
+    assert store.metadata["dtype"] != store._queued_dtype  # The committed state lags behind
+    release.set()
+    store.flush()
+    assert (store.snapshot_rows, store.journal_rows) == (2000, 1000)
+
+def test_background_error_is_raised_once_on_the_caller(store):
+    saved(store, make_rows(range(3), 1.0), full=True)
+    os.remove(store.journal_path)  # The append fails on the writer thread
+    store.save(make_rows([0], 2.0), {}, full=False)
+    with pytest.raises(FileNotFoundError):
+        store.flush()
+    store.flush()  # Reported once
+
+    # Raised by the next save too, before it is queued
+    store.save(make_rows([0], 2.0), {}, full=False)
+    store._jobs.join()
+    with pytest.raises(FileNotFoundError):
+        store.save(make_rows([1], 2.0), {}, full=False)
+    # A full save restarts the journal
+    saved(store, make_rows(range(3), 3.0), full=True)
+    assert journal_generation(store) == 2
+
+def test_pickled_table_is_imported_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Q-tables are stored relative to the working directory
+    directory = tmp_path / "machine_learning" / "q_learning" / "q_tables"
+    directory.mkdir(parents=True)
+    monkeypatch.setitem(QL_CONFIG, "Q_TABLE_BACKEND", "dict")
+    name = QL_CONFIG["Q_TABLE_FILENAME"]
+    legacy_table = {(1, 2, 3, 4, 5, 6): np.array([0.5, -1.0, 2.0, 0.0]), (0, 0, 0, 0, 0, 1): np.array([1.0, 2.0, 3.0, 4.0])}
+    with open(directory / f"{name}.pkl", "wb") as f:
+        pickle.dump(legacy_table, f)
+
+    agent = QLearningAgent(6, 4, Vehicle.get_state_bounds())
+    assert agent.load()
+    agent.close()
+    assert (directory / f"{name}.json").exists()
+    with open(directory / f"{name}.json") as f:
+        assert json.load(f)["generation"] == 1
+
+    # The next load reads the new format, even without the pickle
+    os.remove(directory / f"{name}.pkl")
+    loaded = QLearningAgent(6, 4, Vehicle.get_state_bounds())
+    assert loaded.load()
+    loaded.close()
+    assert len(loaded) == len(legacy_table)
+    for state, q_values in legacy_table.items():
+        np.testing.assert_array_equal(loaded.q_table[state], q_values)
+        assert loaded.q_table.visits[state] == 1
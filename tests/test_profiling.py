@@ -0,0 +1,112 @@
+import time
+import numpy as np
+import pytest
+
+from logs.profiling import PhaseTimer
+
+class FakeClock:
+    """perf_counter_ns replacement that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1_000_000
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, nanoseconds):
+        self.now += nanoseconds
+
+class Vehicle:
+    def __init__(self, clock):
+        self.clock = clock
+
+    def update_position(self, nanoseconds):
+        """Pretend to work for the given time."""
+        self.clock.advance(nanoseconds)
+        return nanoseconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, "perf_counter_ns", clock)
+    return clock
+
+def test_instrumented_method_closes_its_phase(clock):
+    timer = PhaseTimer()
+    vehicle, other = Vehicle(clock), Vehicle(clock)
+    timer.instrument(vehicle, "update_position", "physics")
+    assert vehicle.update_position.__name__ == "update_position"
+
+    timer.start()
+    clock.advance(300)
+    timer.lap("action")
+    assert vehicle.update_position(2000) == 2000  # The result is passed through
+    other.update_position(5000)  # Not instrumented: counted in the next lap
+    timer.lap("reward")
+    timer.end_step()
+    statistics = timer.summary()
+    assert {phase: stats["total"] for phase, stats in statistics.items()} == {"action": 300e-9, "physics": 2000e-9, "reward": 5000e-9}
+
+def test_laps_add_up_to_the_step(clock):
+    timer = PhaseTimer()
+    rng = np.random.default_rng(0)
+    step_totals = []
+    timer.start()
+    clock.advance(10**9)  # Before start(): discarded
+    timer.start()
+    for step in range(200):
+        step_start = clock.now
+        phases = ["action", "physics", "learning"] + (["display_update"] if step % 3 == 0 else [])
+        for phase in phases:
+            clock.advance(int(rng.integers(1, 10_000)))
+            timer.lap(phase)
+        timer.end_step()
+        step_totals.append(clock.now - step_start)
+
+    statistics = timer.summary()
+    total = sum(stats["total"] for stats in statistics.values())
+    assert total == pytest.approx(sum(step_totals) / 1e9, rel=1e-12)
+    samples = np.sum([timer._samples[phase] for phase in statistics], axis=0)
+    assert samples.tolist() == step_totals
+    assert statistics["display_update"]["count"] == 67 and statistics["action"]["count"] == 200
+
+def test_summary_percentiles_and_counts(clock):
+    timer = PhaseTimer()
+    durations = np.random.default_rng(1).integers(1000, 100_000, size=500)
+    timer.start()
+    for step, duration in enumerate(durations.tolist()):
+        clock.advance(duration)
+        timer.lap("physics")
+        if step >= 100:  # A phase first seen late did not run in the earlier steps
+            clock.advance(duration * 2)
+            timer.lap("sensors")
+            clock.advance(0)
+            timer.lap("events")  # Ran, but took no measurable time
+        timer.end_step()
+
+    statistics = timer.summary()
+    physics, sensors, events = statistics["physics"], statistics["sensors"], statistics["events"]
+    assert physics["count"] == 500 and sensors["count"] == 400 and events["count"] == 0
+    assert physics["total"] == pytest.approx(durations.sum() / 1e9)
+    assert sensors["total"] == pytest.approx(2 * durations[100:].sum() / 1e9)
+    for stats, expected in ((physics, durations / 1e9), (sensors, 2 * durations[100:] / 1e9)):
+        np.testing.assert_allclose([stats["p50"], stats["p95"], stats["p99"]], np.percentile(expected, [50, 95, 99]))
+    assert (events["p50"], events["p95"], events["p99"]) == (0, 0, 0)
+    assert all(len(samples) == 500 for samples in timer._samples.values())
+
+def test_end_episode_prints_and_starts_over(clock, capsys):
+    timer = PhaseTimer()
+    timer.start()
+    for _ in range(4):
+        clock.advance(250_000)
+        timer.lap("physics")
+        clock.advance(750_000)
+        timer.lap("sensors")
+        timer.end_step()
+    timer.end_episode(7)
+    output = capsys.readouterr().out.splitlines()
+    assert output[0] == "Episode 7 phase timing: 4 steps, 4.0 ms"
+    # Sorted by total time
+    assert [line.split()[0] for line in output[2:]] == ["sensors", "physics"]
+    assert output[2].split()[1:4] == ["4", "3.0", "75.0%"]
+    assert timer.summary() == {}
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from machine_learning.q_learning.q_table import DictQTable, DenseQTable, td_update_batch
+from models.vehicle import Vehicle
+
+BOUNDS = [(0, 5), (-3, 7), (-2, 2)]
+
+def all_states(bounds):
+    """Every valid state of the bounds, with the sensors (signed variables) sharing one sign."""
+    grids = np.meshgrid(*[np.arange(low, high + 1) for low, high in bounds], indexing="ij")
+    states = np.stack([grid.ravel() for grid in grids], axis=1)
+    signed = states[:, 1:]
+    return states[((signed >= 0).all(axis=1)) | ((signed <= 0).all(axis=1))]
+
+def test_dense_index_round_trip():
+    table = DenseQTable(BOUNDS, 4)
+    states = all_states(BOUNDS)
+    rows = [table.index(tuple(state)) for state in states.tolist()]
+    assert len(set(rows)) == len(rows)
+    assert all(0 <= row < table.num_states for row in rows)
+    assert [table.state(row) for row in rows] == [tuple(state) for state in states.tolist()]
+    assert rows == table.index_many(states).tolist()
+    assert (table.state_many(rows) == states).all()
+
+def test_dense_index_uncached_matches_cached():
+    table = DenseQTable(BOUNDS, 4)
+    table.ROW_CACHE_SIZE = 3  # Cleared every few states
+    states = [tuple(state) for state in all_states(BOUNDS).tolist()]
+    first = [table.index(state) for state in states]
+    assert [table.index(state) for state in reversed(states)] == first[::-1]
+    assert len(table._row_cache) <= 3
+
+@pytest.mark.parametrize("state", [(6, 0, 0), (-1, 0, 0), (0, 8, 1), (0, -8, 0), (0, 0, 3)])
+def test_dense_index_out_of_bounds(state):
+    table = DenseQTable(BOUNDS, 4)
+    with pytest.raises(ValueError):
+        table.index(state)
+    with pytest.raises(ValueError):
+        table.index_many(np.array([state]))
+
+def test_dense_buffered_visits():
+    table = DenseQTable(BOUNDS, 4)
+    table.visit((1, 2, 2))
+    table.visit((1, 2, 2))
+    table.visit((0, -1, 0))
+    assert len(table) == 2
+    assert table.visits[table.index((1, 2, 2))] == 2
+    # Batch updates and records see the buffered counts
+    table.visit((1, 2, 2))
+    table.update_batch(np.array([[1, 2, 2]]), np.array([0]), np.array([1.0]), np.array([[0, 0, 0]]),
+                       np.array([False]), 0.5, 0.9)
+    assert table.visits[table.index((1, 2, 2))] == 4
+    records = table.to_records(np.dtype([("state", np.int16, 3), ("q_values", np.float32, 4), ("visits", np.uint32)]))
+    assert sorted(map(tuple, records["state"].tolist())) == [(0, -1, 0), (1, 2, 2)]
+    assert sorted(records["visits"].tolist()) == [1, 4]
+
+def test_dense_rows_are_writable_views():
+    table = DenseQTable(BOUNDS, 4)
+    q_values = table.visit((2, 1, 1))
+    q_values[3] = 1.5
+    assert table[(2, 1, 1)][3] == 1.5
+    assert table.values[table.index((2, 1, 1)), 3] == 1.5
+
+def test_scalar_updates_match_between_backends():
+    rng = np.random.default_rng(0)
+    states = [tuple(state) for state in all_states(Vehicle.get_state_bounds()[:3]).tolist()]
+    dict_table, dense_table = DictQTable(4), DenseQTable(Vehicle.get_state_bounds()[:3], 4)
+    for _ in range(2000):
+        state, next_state = states[rng.integers(len(states))], states[rng.integers(len(states))]
+        action, reward = int(rng.integers(4)), float(rng.normal())
+        for table in (dict_table, dense_table):
+            next_q_values = table[next_state]
+            q_values = table.visit(state)
+            q_values[action] += 0.1 * (reward + 0.9 * next_q_values.max() - q_values[action])
+    assert len(dict_table.visits) == len(dense_table)  # Reading a state creates it in the dict table only
+    for state in dict_table.states():
+        np.testing.assert_allclose(dense_table[state], dict_table[state], rtol=1e-4, atol=1e-5)
+
+def test_td_update_batch_averages_duplicate_pairs():
+    values = np.zeros((3, 2))
+    values[2] = [4.0, 2.0]
+    # Two updates of (row 0, action 1) with TD errors 1 and 3 + 0.5 * 4, and one of (row 1, action 0)
+    rows, actions = np.array([0, 0, 1]), np.array([1, 1, 0])
+    rewards, next_rows = np.array([1.0, 3.0, -1.0]), np.array([1, 2, 0])
+    dones = np.array([False, False, True])
+    updated = td_update_batch(values, rows, actions, rewards, next_rows, dones, 0.5, 0.5)
+    assert updated.tolist() == [0, 1]
+    # The pair moves once, by alpha times the mean TD error, not twice
+    assert values[0].tolist() == [0.0, 0.5 * (1.0 + 5.0) / 2]
+    # Terminal transitions do not bootstrap, and TD errors use the values from before the batch
+    assert values[1].tolist() == [-0.5, 0.0]
+    assert values[2].tolist() == [4.0, 2.0]
+
+def test_td_update_batch_matches_sequential_updates_without_duplicates():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(50, 4))
+    rows = rng.permutation(50)[:20]
+    actions, rewards = rng.integers(4, size=20), rng.normal(size=20)
+    next_rows, dones = rng.integers(50, size=20), rng.random(20) < 0.2
+    expected = values.copy()
+    before = values.copy()
+    for row, action, reward, next_row, done in zip(rows, actions, rewards, next_rows, dones):
+        target = reward + 0.9 * before[next_row].max() * (not done)
+        expected[row, action] += 0.1 * (target - before[row, action])
+    td_update_batch(values, rows, actions, rewards, next_rows, dones, 0.1, 0.9)
+    np.testing.assert_allclose(values, expected)
+
+def test_update_batch_matches_between_backends():
+    rng = np.random.default_rng(1)
+    bounds = Vehicle.get_state_bounds()[:3]
+    states = all_states(bounds)
+    dict_table, dense_table = DictQTable(4), DenseQTable(bounds, 4)
+    for _ in range(20):
+        # Few distinct states, so batches have duplicate pairs
+        batch = states[rng.integers(30, size=32)], rng.integers(4, size=32), rng.normal(size=32), \
+            states[rng.integers(30, size=32)], rng.random(32) < 0.1
+        for table in (dict_table, dense_table):
+            table.update_batch(*batch, 0.1, 0.9)
+    assert len(dict_table.visits) == len(dense_table)
+    for state in dict_table.states():
+        np.testing.assert_allclose(dense_table[state], dict_table[state], rtol=1e-4, atol=1e-5)
+        assert dense_table.visits[dense_table.index(state)] == dict_table.visits.get(state, 0)
+    assert sorted(dense_table.state(row) for row in dense_table.take_changes()) == sorted(dict_table.take_changes())
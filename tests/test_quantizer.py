@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from config import STATE_CONFIG, SENSOR_CONFIG, VEHICLE_CONFIG
+from models.quantizer import StateQuantizer, legacy_quantizer, quantizer_id
+
+LENGTHS = [length for _, length in SENSOR_CONFIG["SENSORS"]]
+
+def state_config(**overrides):
+    """STATE_CONFIG with some settings replaced."""
+    return {**STATE_CONFIG, **overrides}
+
+CONFIGS = {
+    "legacy": state_config(SPEED_BINS=None, SENSOR_BINS="uniform", UNIFORM_BIN_WIDTH=10, SENSOR_CLIP=None),
+    "uniform_clipped": state_config(SENSOR_BINS="uniform", UNIFORM_BIN_WIDTH=25, SENSOR_CLIP=120),
+    "log": state_config(SPEED_BINS=[0.5, 2, 4], SENSOR_BINS="log", LOG_BINS=6, LOG_MIN_DISTANCE=5),
+    "edges": state_config(SPEED_BINS=[1, 3], SENSOR_BINS=[[20, 50], [30, 80, 120], [15, 60, 150], [30, 80, 120], [20, 50]]),
+}
+
+def random_readings(count, seed):
+    """Seeded speeds and sensor readings, on and off the road, including every bin edge."""
+    rng = np.random.default_rng(seed)
+    speeds = rng.uniform(0, VEHICLE_CONFIG["MAX_SPEED"], count)
+    distances = np.stack([rng.integers(-length + 1, length + 1, count) for length in LENGTHS], axis=1).astype(np.float64)
+    distances[::3] += rng.uniform(-0.5, 0.5, distances[::3].shape)  # Fractional readings too
+    return speeds, np.clip(distances, -np.array(LENGTHS) + 1, LENGTHS)
+
+def test_bin_boundaries():
+    quantizer = StateQuantizer([1, 3, 5], [[10, 20]], [30])
+    # A value on an edge falls in the upper bin
+    assert [quantizer.quantize(speed, [0])[0] for speed in (0, 0.99, 1, 2.99, 3, 5, 9)] == [0, 0, 1, 1, 2, 3, 3]
+    # Readings past the last edge share the last bin
+    assert [quantizer.quantize(0, [distance])[1] for distance in (0, 9.99, 10, 19.99, 20, 29)] == [0, 0, 1, 1, 2, 2]
+
+def test_negative_readings_keep_their_sign():
+    quantizer = StateQuantizer([1], [[10, 20]], [30])
+    assert [quantizer.quantize(0, [distance])[1] for distance in (-1, -9.99, -10, -20, -29)] == [0, 0, -1, -2, -2]
+    uniform = StateQuantizer.from_config(CONFIGS["legacy"])
+    assert uniform.quantize(0, [-1, -9.99, -10, -25, -99]) == (0, 0, 0, -1, -2, -9)
+
+def test_uniform_shortcut_matches_edge_search():
+    uniform = StateQuantizer.from_config(CONFIGS["legacy"])
+    assert uniform.uniform_width == 10
+    searched = StateQuantizer(None, uniform.sensor_edges, uniform.sensor_lengths)
+    speeds, distances = random_readings(5000, seed=0)
+    for speed, readings in zip(speeds.tolist(), distances.tolist()):
+        assert uniform.quantize(speed, readings) == searched.quantize(speed, readings)
+
+@pytest.mark.parametrize("name", CONFIGS)
+def test_quantize_many_matches_quantize(name):
+    quantizer = StateQuantizer.from_config(CONFIGS[name])
+    speeds, distances = random_readings(5000, seed=1)
+    states = quantizer.quantize_many(speeds, distances)
+    assert states.tolist() == [list(quantizer.quantize(speed, readings))
+                               for speed, readings in zip(speeds.tolist(), distances.tolist())]
+    # Every state lies within the bounds of the dense Q-table
+    bounds = np.array(quantizer.state_bounds())
+    assert ((states >= bounds[:, 0]) & (states <= bounds[:, 1])).all()
+
+@pytest.mark.parametrize("name", CONFIGS)
+def test_description_round_trip(name):
+    quantizer = StateQuantizer.from_config(CONFIGS[name])
+    description = quantizer.describe()
+    restored = StateQuantizer.from_description(description)
+    assert restored.describe() == description
+    assert quantizer_id(restored.describe()) == quantizer_id(description)
+    speeds, distances = random_readings(2000, seed=2)
+    assert (restored.quantize_many(speeds, distances) == quantizer.quantize_many(speeds, distances)).all()
+
+def test_descriptions_tell_quantizers_apart():
+    ids = {name: quantizer_id(StateQuantizer.from_config(config).describe()) for name, config in CONFIGS.items()}
+    assert len(set(ids.values())) == len(ids)
+    # int(speed) is described as edges at every unit, the same states
+    by_unit = StateQuantizer.from_config(state_config(**{**CONFIGS["legacy"], "SPEED_BINS": list(range(1, int(VEHICLE_CONFIG["MAX_SPEED"]) + 1))}))
+    assert quantizer_id(by_unit.describe()) == ids["legacy"]
+    assert legacy_quantizer().describe() == StateQuantizer.from_config(CONFIGS["legacy"]).describe()
+
+@pytest.mark.parametrize("overrides", [
+    {"SENSOR_BINS": "quadratic"},
+    {"SENSOR_BINS": [[10, 20]]},
+    {"SENSOR_BINS": [[20, 10]] * len(LENGTHS)},
+    {"SPEED_BINS": [1, 1, 2]},
+])
+def test_invalid_configuration(overrides):
+    with pytest.raises(ValueError):
+        StateQuantizer.from_config(state_config(**overrides))
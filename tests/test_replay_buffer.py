@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from machine_learning.q_learning.replay_buffer import ReplayBuffer
+
+def transitions(start, count):
+    """Transitions numbered from `start`: the number is in the state, action and reward."""
+    numbers = np.arange(start, start + count)
+    return (np.stack([numbers, -numbers], axis=1), numbers % 4, numbers.astype(np.float64),
+            np.stack([numbers + 1, -numbers - 1], axis=1), numbers % 5 == 0)
+
+def stored_numbers(buffer):
+    """Numbers of the stored transitions, oldest first."""
+    order = (buffer.position + np.arange(buffer.size)) % buffer.capacity if buffer.size == buffer.capacity else np.arange(buffer.size)
+    return buffer.rewards[order].astype(int).tolist()
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        ReplayBuffer(0, 2)
+
+def test_add_overwrites_the_oldest():
+    buffer = ReplayBuffer(4, 2)
+    for transition in zip(*transitions(0, 6)):
+        buffer.add(*transition)
+    assert len(buffer) == 4
+    assert stored_numbers(buffer) == [2, 3, 4, 5]
+    assert buffer.states[buffer.rewards == 5].tolist() == [[5, -5]]
+    assert buffer.next_states[buffer.rewards == 5].tolist() == [[6, -6]]
+
+@pytest.mark.parametrize("counts", [[3], [3, 3], [2, 7], [9]])
+def test_add_many_matches_add(counts):
+    one_by_one, batched = ReplayBuffer(5, 2), ReplayBuffer(5, 2)
+    start = 0
+    for count in counts:
+        batch = transitions(start, count)
+        for transition in zip(*batch):
+            one_by_one.add(*transition)
+        batched.add_many(*batch)
+        start += count
+    # Same transitions from the oldest to the newest (the slots may be rotated)
+    assert len(batched) == len(one_by_one)
+    assert stored_numbers(batched) == stored_numbers(one_by_one)
+    for name in ("states", "actions", "next_states", "dones"):
+        for buffer in (batched, one_by_one):
+            stored = getattr(buffer, name)[:buffer.size]
+            expected = transitions(0, start)[("states", "actions", "rewards", "next_states", "dones").index(name)]
+            assert (stored == expected[buffer.rewards[:buffer.size].astype(int)]).all()
+    # The next transition overwrites the oldest one in both
+    for buffer in (batched, one_by_one):
+        buffer.add(*next(zip(*transitions(start, 1))))
+    assert stored_numbers(batched) == stored_numbers(one_by_one)
+
+def test_sample_is_seeded_and_only_returns_stored_transitions():
+    buffers = [ReplayBuffer(10, 2, seed=3) for _ in range(2)]
+    for buffer in buffers:
+        buffer.add_many(*transitions(0, 6))
+    samples = [buffer.sample(64) for buffer in buffers]
+    for first, second in zip(*samples):
+        assert (first == second).all()
+    states, actions, rewards, next_states, dones = samples[0]
+    assert set(rewards.astype(int).tolist()) <= set(range(6))
+    assert (states[:, 0] == rewards).all() and (next_states[:, 0] == rewards + 1).all()
+    assert (actions == rewards.astype(int) % 4).all() and (dones == (rewards.astype(int) % 5 == 0)).all()
@@ -0,0 +1,89 @@
+import re
+import math
+import urllib.error
+import urllib.request
+import pytest
+
+from logs.telemetry import METRICS, MEAN_SCORE_EPISODES, TelemetryServer
+
+SAMPLE = re.compile(r'^([a-z_]+)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"(?:,|$)')
+
+def unescape(value):
+    """Undo the label value escaping of the Prometheus text format."""
+    return re.sub(r'\\(.)', lambda match: "\n" if match.group(1) == "n" else match.group(1), value)
+
+def parse_metrics(text):
+    """
+    Parse the Prometheus text format.
+
+    Returns:
+        tuple: (help, types, samples): dicts of metric name -> help text, type and
+            (labels dict, value string).
+    """
+    help_texts, types, samples = {}, {}, {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            name, description = line[len("# HELP "):].split(" ", 1)
+            help_texts[name] = description
+        elif line.startswith("# TYPE "):
+            name, metric_type = line[len("# TYPE "):].split(" ")
+            types[name] = metric_type
+        else:
+            name, labels, value = SAMPLE.match(line).groups()
+            parsed_labels = {key: unescape(raw) for key, raw in LABEL.findall(labels or "")}
+            samples[name] = (parsed_labels, value)
+    return help_texts, types, samples
+
+@pytest.fixture
+def telemetry():
+    server = TelemetryServer(port=0, labels={"model": 'v1 "best"\\old\nrun', "worker": 3})
+    yield server
+    server.close()
+
+def scrape(server, path="/metrics"):
+    with urllib.request.urlopen(f"http://{server.host}:{server.port}{path}", timeout=5) as response:
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        return response.read().decode()
+
+def test_metrics_endpoint(telemetry):
+    assert telemetry.port != 0
+    help_texts, types, samples = parse_metrics(scrape(telemetry))
+    assert list(samples) == [name for name, _, _ in METRICS]
+    assert help_texts == {name: description for name, _, description in METRICS}
+    assert types == {name: metric_type for name, metric_type, _ in METRICS}
+    # Labels on every sample, escaped and read back exactly
+    for labels, _ in samples.values():
+        assert labels == {"model": 'v1 "best"\\old\nrun', "worker": "3"}
+    # No save yet
+    assert samples["racing_q_table_save_seconds"][1] == "NaN"
+    assert samples["racing_episodes_total"][1] == "0.0"
+
+    telemetry.record_episode(12.5, 300, 0.5, 40, 2500.0)
+    telemetry.record_episode(-3.5, 100, 0.25, 42, 3000.0, save_seconds=0.125)
+    telemetry.record_episode(7.0, 200, 0.125, 45, 2800.0, save_seconds=None)  # The last save is still published
+    values = {name: float(value) for name, (_, value) in parse_metrics(scrape(telemetry))[2].items()}
+    assert values == {"racing_episodes_total": 3, "racing_steps_total": 600, "racing_steps_per_second": 2800,
+                      "racing_exploration_rate": 0.125, "racing_q_table_states": 45, "racing_last_score": 7.0,
+                      "racing_mean_score": 16 / 3, "racing_q_table_save_seconds": 0.125}
+
+    telemetry.record_episode(1.0, 10, 0.1, 45, 100.0, save_seconds=math.inf)
+    assert parse_metrics(scrape(telemetry))[2]["racing_q_table_save_seconds"][1] == "+Inf"
+
+def test_mean_score_covers_recent_episodes(telemetry):
+    for episode in range(MEAN_SCORE_EPISODES + 50):
+        telemetry.record_episode(float(episode), 1, 0.0, 0, 1.0)
+    samples = parse_metrics(telemetry.render())[2]
+    assert float(samples["racing_mean_score"][1]) == sum(range(50, MEAN_SCORE_EPISODES + 50)) / MEAN_SCORE_EPISODES
+
+def test_other_paths_are_not_found_and_close_stops_the_server():
+    server = TelemetryServer(port=0)
+    try:
+        assert "{" not in scrape(server)  # No labels
+        with pytest.raises(urllib.error.HTTPError) as error:
+            scrape(server, "/")
+        assert error.value.code == 404
+    finally:
+        server.close()
+    with pytest.raises(urllib.error.URLError):
+        scrape(server)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from config import QL_CONFIG
+from machine_learning.q_learning.agent import QLearningAgent
+from machine_learning.q_learning.traces import EligibilityTraces
+
+def test_traces_decay_replace_and_prune():
+    traces = EligibilityTraces(decay=0.5, threshold=0.2, max_traces=10)
+    a, b = np.zeros(2), np.zeros(2)
+    changed = set()
+    traces.add("a", a, 0)
+    traces.update(1.0, changed)
+    traces.add("b", b, 1)
+    traces.update(1.0, changed)
+    assert a.tolist() == [1.5, 0.0] and b.tolist() == [0.0, 1.0]
+    assert changed == {"a", "b"}
+    # A revisited pair goes back to 1 and moves behind the others
+    traces.add("a", a, 0)
+    assert [pair for pair in traces.traces] == [("b", 1), ("a", 0)]
+    traces.update(1.0, changed)  # b moves by 0.5, a by 1
+    traces.update(1.0, changed)  # b moves by 0.25 and its trace 0.125 is dropped, a moves by 0.5
+    assert a.tolist() == [3.0, 0.0] and b.tolist() == [0.0, 1.75]
+    assert list(traces.traces) == [("a", 0)]
+
+def test_traces_keep_the_most_recent_pairs():
+    traces = EligibilityTraces(decay=1.0, threshold=0.0, max_traces=3)
+    for key in range(5):
+        traces.add(key, np.zeros(1), 0)
+    assert len(traces) == 3
+    assert [key for key, _ in traces.traces] == [2, 3, 4]
+    traces.clear()
+    assert len(traces) == 0
+
+def test_max_traces_must_be_positive():
+    with pytest.raises(ValueError):
+        EligibilityTraces(0.5, 0.01, 0)
+
+@pytest.fixture
+def trace_agent(monkeypatch, tmp_path):
+    """A Q(lambda) agent with a fresh dict Q-table, working in a temporary directory."""
+    monkeypatch.chdir(tmp_path)
+    for key, value in {"TRACE_LAMBDA": 0.9, "TRACE_THRESHOLD": 0.0, "MAX_TRACES": 16, "REPLAY_CAPACITY": 0,
+                       "Q_TABLE_BACKEND": "dict", "LEARNING_RATE": 0.1, "DISCOUNT_FACTOR": 0.95}.items():
+        monkeypatch.setitem(QL_CONFIG, key, value)
+    return QLearningAgent(3, 4)
+
+def test_greedy_actions_credit_the_whole_trajectory(trace_agent):
+    for state, reward, done in (((0, 0, 0), 0.0, False), ((1, 0, 0), 0.0, False), ((2, 0, 0), 1.0, True)):
+        trace_agent.observe(state, 0, reward, (state[0] + 1, 0, 0), done)
+    decay = 0.95 * 0.9
+    assert trace_agent.q_table[(2, 0, 0)][0] == pytest.approx(0.1)
+    assert trace_agent.q_table[(1, 0, 0)][0] == pytest.approx(0.1 * decay)
+    assert trace_agent.q_table[(0, 0, 0)][0] == pytest.approx(0.1 * decay ** 2)
+
+def test_exploratory_action_cuts_the_traces(trace_agent):
+    trace_agent.q_table.visit((1, 0, 0))[1] = 1.0  # Action 1 is greedy in state (1, 0, 0)
+    trace_agent.observe((0, 0, 0), 0, 0.0, (1, 0, 0), False)
+    before = trace_agent.q_table[(0, 0, 0)].copy()
+    trace_agent.observe((1, 0, 0), 0, 0.0, (2, 0, 0), False)  # Exploratory
+    trace_agent.observe((2, 0, 0), 0, 1.0, (3, 0, 0), True)
+    # The pair before the exploratory action gets none of the later TD errors
+    assert trace_agent.q_table[(0, 0, 0)].tolist() == before.tolist()
+    assert trace_agent.q_table[(1, 0, 0)][0] == pytest.approx(0.1 * 0.95 * 0.9)
+    assert trace_agent.q_table[(2, 0, 0)][0] == pytest.approx(0.1)
+
+def test_streams_and_episodes_are_traced_separately(trace_agent):
+    trace_agent.observe((0, 0, 0), 0, 0.0, (1, 0, 0), False, stream=0)
+    trace_agent.observe((5, 0, 0), 0, 0.0, (6, 0, 0), False, stream=1)
+    trace_agent.clear_traces(stream=1)
+    trace_agent.observe((6, 0, 0), 0, 1.0, (7, 0, 0), True, stream=1)
+    assert trace_agent.q_table[(5, 0, 0)][0] == 0.0  # Its episode ended
+    assert trace_agent.q_table[(0, 0, 0)][0] == 0.0  # Another stream
+    trace_agent.observe((1, 0, 0), 0, 1.0, (2, 0, 0), True, stream=0)
+    assert trace_agent.q_table[(0, 0, 0)][0] == pytest.approx(0.1 * 0.95 * 0.9)
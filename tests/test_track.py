@@ -0,0 +1,108 @@
+import math
+import os
+import numpy as np
+import pygame
+import pytest
+
+from config import SENSOR_CONFIG
+from models.track import (OFF_ROAD, ROAD, CHECKPOINT, START, build_track_grid, build_distance_field,
+                          load_distance_field, load_track_bundle, _squared_distance)
+from models.vehicle import Vehicle
+from conftest import CIRCUITS
+
+ROAD_COLOR, CHECKPOINT_COLOR, START_COLOR = (0, 0, 0), (128, 128, 128), (255, 255, 0)
+COLORS = (ROAD_COLOR, CHECKPOINT_COLOR, START_COLOR)
+
+def synthetic_surface(size=(40, 30), checkpoint_x=25):
+    """A horizontal road with a start line and a checkpoint line across it, on a white background."""
+    surface = pygame.Surface(size)
+    surface.fill((255, 255, 255))
+    surface.fill(ROAD_COLOR, pygame.Rect(0, 10, size[0], 10))
+    surface.fill(START_COLOR, pygame.Rect(5, 10, 1, 10))
+    surface.fill(CHECKPOINT_COLOR, pygame.Rect(checkpoint_x, 10, 1, 10))
+    return surface
+
+def test_grid_labels():
+    surface = pygame.Surface((3, 2))
+    for (x, y), color in {(0, 0): ROAD_COLOR, (1, 0): CHECKPOINT_COLOR, (2, 0): START_COLOR,
+                          (0, 1): (255, 255, 255), (1, 1): (1, 0, 0), (2, 1): ROAD_COLOR}.items():
+        surface.set_at((x, y), color)
+    grid = build_track_grid(surface, *COLORS)
+    # Indexed as grid[x, y], anything but the three exact colors is off the road
+    assert grid.dtype == np.uint8 and grid.shape == (3, 2)
+    assert grid.tolist() == [[ROAD, OFF_ROAD], [CHECKPOINT, OFF_ROAD], [START, ROAD]]
+    surface.blit(surface, (0, 0))  # The pixel view was released
+
+def test_squared_distance_matches_brute_force():
+    features = np.random.default_rng(0).random((23, 17)) < 0.05
+    points = np.argwhere(features)
+    x, y = np.meshgrid(np.arange(23), np.arange(17), indexing="ij")
+    brute = ((x[..., None] - points[:, 0]) ** 2 + (y[..., None] - points[:, 1]) ** 2).min(axis=2)
+    for limit in (3, 8, 40):
+        np.testing.assert_array_equal(_squared_distance(features, limit), np.minimum(brute, limit * limit))
+
+def test_distance_field_skips_never_cross_the_road_edge():
+    grid = np.where(np.random.default_rng(1).random((30, 20)) < 0.7, ROAD, OFF_ROAD).astype(np.uint8)
+    field = build_distance_field(grid, 50)
+    on_road = grid != OFF_ROAD
+    x, y = np.meshgrid(np.arange(30), np.arange(20), indexing="ij")
+    for px, py in np.ndindex(grid.shape):
+        other = on_road != on_road[px, py]
+        nearest = math.sqrt(((x[other] - px) ** 2 + (y[other] - py) ** 2).min()) if other.any() else math.inf
+        # A ray sample k pixels further lands less than k + sqrt(2) away after truncation
+        assert field[px, py] == min(max(math.floor(nearest - 1.415), 0), 255)
+
+@pytest.mark.parametrize("circuit", CIRCUITS)
+def test_distance_field_march_matches_scan(circuit, get_environment):
+    environment = get_environment(circuit)
+    vehicle = Vehicle(environment, kernel_backend="python")
+    environment.load_distance_field(max(length for _, length in SENSOR_CONFIG["SENSORS"]))
+    distance_field = environment.distance_field
+    rng = np.random.default_rng(0)
+    try:
+        for _ in range(2000):
+            vehicle.x = float(rng.uniform(-20, environment.SCREEN_WIDTH + 20))
+            vehicle.y = float(rng.uniform(-20, environment.SCREEN_HEIGHT + 20))
+            vehicle.angle = float(rng.uniform(0, 360))
+            readings = []
+            for field in (None, distance_field):
+                environment.distance_field = field
+                vehicle.update_sensors()
+                readings.append([sensor.distance for sensor in vehicle.sensors])
+            assert readings[0] == readings[1]
+    finally:
+        environment.distance_field = distance_field
+
+def test_changed_image_compiles_a_new_bundle(tmp_path):
+    image_path = str(tmp_path / "circuit_test.png")
+    cache_directory = str(tmp_path / "cache")
+    pygame.image.save(synthetic_surface(checkpoint_x=25), image_path)
+    first = load_track_bundle(image_path, (40, 30), COLORS, cache_directory)
+    assert first.start_position[:2] == (5, 10)
+    assert first.grid[25, 15] == CHECKPOINT
+    assert load_track_bundle(image_path, (40, 30), COLORS, cache_directory).directory == first.directory
+
+    # Same file name, new content: the stale bundle is not loaded
+    pygame.image.save(synthetic_surface(checkpoint_x=30), image_path)
+    second = load_track_bundle(image_path, (40, 30), COLORS, cache_directory)
+    assert second.directory != first.directory
+    assert second.grid[25, 15] == ROAD and second.grid[30, 15] == CHECKPOINT
+    assert sorted(os.listdir(cache_directory)) == sorted(os.path.basename(bundle.directory) for bundle in (first, second))
+
+    # Other colors or sizes are other bundles too
+    gray_road = load_track_bundle(image_path, (40, 30), ((128, 128, 128), (0, 0, 0), START_COLOR), cache_directory)
+    assert gray_road.directory != second.directory
+    assert gray_road.grid[30, 15] == ROAD and gray_road.grid[25, 15] == CHECKPOINT
+    assert load_track_bundle(image_path, (80, 60), COLORS, cache_directory).directory != second.directory
+
+def test_distance_field_cache_is_keyed_by_grid_and_range(tmp_path):
+    cache_directory = str(tmp_path)
+    grid = build_track_grid(synthetic_surface(), *COLORS)
+    field = load_distance_field(grid, 20, cache_directory)
+    np.testing.assert_array_equal(field, build_distance_field(grid, 20))
+    assert not field.flags.writeable
+    changed = grid.copy()
+    changed[20, 15] = OFF_ROAD
+    np.testing.assert_array_equal(load_distance_field(changed, 20, cache_directory), build_distance_field(changed, 20))
+    load_distance_field(grid, 40, cache_directory)
+    assert len([name for name in os.listdir(cache_directory) if name.endswith(".npy")]) == 3
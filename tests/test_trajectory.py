@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from logs.trajectory import TrajectoryLog, TrajectoryRecorder
+from models.environment import Environment
+from models.vehicle import Vehicle
+from visualization.replay import Replay
+from conftest import CIRCUITS
+
+@pytest.fixture(scope="module")
+def trajectory_file(tmp_path_factory):
+    """Two headless episodes of seeded random actions, on two circuits when there are several."""
+    path = str(tmp_path_factory.mktemp("trajectories") / "session.npz")
+    circuits = (CIRCUITS * 2)[:2]
+    environment = Environment(headless=True, circuits=circuits)
+    vehicle = Vehicle(environment)
+    recorder = TrajectoryRecorder(path, {"fps": 60})
+    rng = np.random.default_rng(0)
+    for circuit in circuits:
+        environment.reset(circuit)
+        vehicle.reset()
+        recorder.start_episode(vehicle)
+        for action in rng.choice(4, size=300, p=[0.55, 0.2, 0.2, 0.05]).tolist():
+            _, reward, done = vehicle.step(action)
+            recorder.record_step(action, reward, vehicle.score)
+            if done:
+                break
+        recorder.end_episode()
+    recorder.start_episode(vehicle)  # Unfinished, not written
+    recorder.close()
+    return path
+
+def test_recording_round_trip(trajectory_file):
+    log = TrajectoryLog(trajectory_file)
+    assert len(log) == 2
+    assert log.metadata["fps"] == 60 and log.metadata["format_version"] == 2
+    episodes = [log.episode(index) for index in range(2)]
+    assert [episode["circuit"] for episode in episodes] == (CIRCUITS * 2)[:2]
+    for episode in episodes:
+        assert 0 < len(episode["actions"]) <= 300
+        assert episode["actions"].dtype == np.uint8
+        assert len(episode["rewards"]) == len(episode["scores"]) == len(episode["actions"])
+        # Rewards and scores have one decimal, stored as tenths they come back exactly
+        assert episode["scores"][-1] == round(sum(episode["rewards"].tolist()), 1)
+
+def test_replay_reproduces_every_reward_and_score(trajectory_file):
+    replay = Replay(trajectory_file)
+    for episode in range(len(replay.log)):
+        assert replay.verify(episode) == -1
+        assert replay.vehicle.score == replay.log.episode(episode)["scores"][-1]
+
+def test_replay_detects_a_tampered_recording(trajectory_file, tmp_path):
+    with np.load(trajectory_file) as data:
+        arrays = dict(data)
+    episode_start, episode_end = arrays["episode_offsets"][1:3].tolist()
+    assert episode_end - episode_start > 5
+    arrays["rewards"][episode_start + 5] += 1
+    tampered_file = str(tmp_path / "tampered.npz")
+    np.savez_compressed(tampered_file, **arrays)
+
+    replay = Replay(tampered_file)
+    assert replay.verify(0) == -1
+    assert replay.verify(1) == 5
@@ -0,0 +1,93 @@
+import numpy as np
+import pygame
+import pytest
+
+from models.environment import Environment
+from models.track import OFF_ROAD
+from models.vehicle import Vehicle
+from conftest import CIRCUITS
+
+def reference_road_status(vehicle, x, y):
+    """Road status as computed before Vehicle.check_road_status was memoized: rotated pygame.Rect corners."""
+    rect = pygame.Rect(x - vehicle.width / 2, y - vehicle.height / 2, vehicle.width, vehicle.height)
+    on_road_count = sum(1 for vertex in vehicle.get_rotated_vertices(rect) if vehicle.is_on_road(*vertex))
+    if on_road_count == 4:
+        return "on_road"
+    if on_road_count > 0:
+        return "partially_off"
+    return "completely_off"
+
+def random_actions(seed, count):
+    """Seeded actions, mostly accelerating so the vehicle gets around the circuit."""
+    return np.random.default_rng(seed).choice(4, size=count, p=[0.55, 0.2, 0.2, 0.05]).tolist()
+
+@pytest.mark.parametrize("circuit", CIRCUITS)
+def test_step_matches_reference_sequence(circuit, get_environment):
+    environment = get_environment(circuit)
+    vehicle = Vehicle(environment, kernel_backend="python")
+    reference = Vehicle(environment, kernel_backend="python")
+    # The reference never reuses a road status
+    reference.check_road_status = lambda x, y: reference_road_status(reference, x, y)
+    episodes = 0
+    for action in random_actions(0, 3000):
+        next_state, reward, done = vehicle.step(action)
+        reference.handle_agent_action(action)
+        expected_reward = reference.calculate_reward()
+        expected_done = reference.collided or reference.clock.steps >= reference.max_steps
+        assert (next_state, reward, done) == (reference.get_state(), expected_reward, expected_done)
+        assert (vehicle.x, vehicle.y, vehicle.angle, vehicle.speed, vehicle.score) == \
+               (reference.x, reference.y, reference.angle, reference.speed, reference.score)
+        if done:
+            episodes += 1
+            vehicle.reset()
+            reference.reset()
+    assert episodes > 0
+
+@pytest.mark.parametrize("circuit", CIRCUITS)
+def test_memoized_road_status_is_fresh(circuit, get_environment):
+    environment = get_environment(circuit)
+    vehicle = Vehicle(environment, kernel_backend="python")
+    rng = np.random.default_rng(1)
+    for step, action in enumerate(random_actions(2, 3000)):
+        _, _, done = vehicle.step(action)
+        # The status memoized during the step is the one of the current position
+        assert vehicle.check_road_status(vehicle.x, vehicle.y) == reference_road_status(vehicle, vehicle.x, vehicle.y)
+        if done:
+            vehicle.reset()
+            assert vehicle.road_status == reference_road_status(vehicle, vehicle.x, vehicle.y)
+        elif step % 50 == 0:
+            # Teleport, then turn in place: the cache key changes with the position and with the angle
+            vehicle.x = float(rng.uniform(0, environment.SCREEN_WIDTH))
+            vehicle.y = float(rng.uniform(0, environment.SCREEN_HEIGHT))
+            assert vehicle.check_road_status(vehicle.x, vehicle.y) == reference_road_status(vehicle, vehicle.x, vehicle.y)
+            vehicle.angle = float(rng.uniform(0, 360))
+            assert vehicle.check_road_status(vehicle.x, vehicle.y) == reference_road_status(vehicle, vehicle.x, vehicle.y)
+
+@pytest.mark.parametrize("first, second", [(a, b) for a in CIRCUITS for b in CIRCUITS if a != b])
+def test_reset_forgets_road_status_of_previous_circuit(first, second):
+    environment = Environment(headless=True, circuits=[first, second])
+    vehicle = Vehicle(environment, kernel_backend="python")
+    # A pose on the road of the second circuit only, made its start pose: after the switch,
+    # reset() asks for the status of the same (x, y, angle) the vehicle had on the first circuit
+    candidates = np.argwhere((np.asarray(environment.tracks[first].grid) == OFF_ROAD) &
+                             (np.asarray(environment.tracks[second].grid) != OFF_ROAD))
+    for x, y in candidates[::7].tolist():
+        pose = (float(x), float(y), 90.0)
+        vehicle.x, vehicle.y, vehicle.angle = pose
+        if reference_road_status(vehicle, *pose[:2]) == "completely_off":
+            environment.reset(second)
+            vehicle.x, vehicle.y, vehicle.angle = pose
+            if reference_road_status(vehicle, *pose[:2]) == "on_road":
+                break
+            environment.reset(first)
+    else:
+        pytest.fail("No pose on the road of one circuit only")
+    environment.tracks[second].start_position = pose
+
+    environment.reset(first)
+    vehicle.x, vehicle.y, vehicle.angle = pose
+    assert vehicle.check_road_status(*pose[:2]) == "completely_off"
+    environment.reset(second)
+    vehicle.reset()
+    assert (vehicle.x, vehicle.y, vehicle.angle) == pose
+    assert vehicle.road_status == "on_road"
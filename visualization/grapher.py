@@ -1,143 +1,313 @@
 import matplotlib.pyplot as plt
 import numpy as np
+from logs.logger import read_metrics
+
+class MinMaxDecimator:
+    def __init__(self, max_buckets=2000):
+        """
+        Downsample a growing series for plotting, keeping the shape of the curve.
+
+        Points are grouped into buckets of `bucket_size` consecutive points and only the
+        minimum and maximum of each bucket are kept, so spikes survive the downsampling.
+        When there are more than `max_buckets` buckets, neighbours are merged and the
+        bucket size doubles, so the kept points stay bounded however long the series grows.
+
+        Args:
+            max_buckets (int): Maximum number of buckets (each keeps up to two points).
+        """
+        self.max_buckets = max_buckets
+        self.bucket_size = 1
+        self.min_x = self.min_y = self.max_x = self.max_y = np.zeros(0)
+        # Unfinished bucket: its points (or extremes standing for some of them), and how many points of the series they cover
+        self._pending_x = self._pending_y = np.zeros(0)
+        self._pending_count = 0
+
+    def extend(self, x, y):
+        """Add points to the series (x increasing)."""
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        # Grow the buckets first, so a large chunk never creates more than max_buckets buckets
+        while len(self.min_x) + (self._pending_count + len(y)) // self.bucket_size > self.max_buckets:
+            self._merge()
+        needed = self.bucket_size - self._pending_count  # Points that complete the unfinished bucket
+        if len(y) < needed:
+            self._add_pending(x, y, len(y))
+            return
+        first_x = np.concatenate((self._pending_x, x[:needed]))
+        first_y = np.concatenate((self._pending_y, y[:needed]))
+        self._append_buckets(first_x, first_y, len(first_y), [0])
+        x, y = x[needed:], y[needed:]
+        full = len(y) // self.bucket_size * self.bucket_size
+        if full:
+            self._append_buckets(x[:full], y[:full], self.bucket_size, np.arange(0, full, self.bucket_size))
+        self._pending_x = self._pending_y = np.zeros(0)
+        self._pending_count = 0
+        self._add_pending(x[full:], y[full:], len(y) - full)
+
+    def _append_buckets(self, x, y, size, offsets):
+        """Keep the minimum and maximum of each group of `size` consecutive points."""
+        bucket_y = y.reshape(-1, size)
+        low = offsets + np.argmin(bucket_y, axis=1)
+        high = offsets + np.argmax(bucket_y, axis=1)
+        self.min_x = np.concatenate((self.min_x, x[low]))
+        self.min_y = np.concatenate((self.min_y, y[low]))
+        self.max_x = np.concatenate((self.max_x, x[high]))
+        self.max_y = np.concatenate((self.max_y, y[high]))
+
+    def _add_pending(self, x, y, count):
+        """Add points standing for `count` points of the series to the unfinished bucket."""
+        self._pending_x = np.concatenate((self._pending_x, x))
+        self._pending_y = np.concatenate((self._pending_y, y))
+        self._pending_count += count
+
+    def _merge(self):
+        """Merge neighbouring buckets pairwise and double the bucket size."""
+        if len(self.min_x) % 2:
+            # An odd last bucket is the start of the next, unfinished bucket: its extremes stand for its points
+            extremes_x, extremes_y = (self.min_x[-1], self.max_x[-1]), (self.min_y[-1], self.max_y[-1])
+            self.min_x, self.min_y, self.max_x, self.max_y = self.min_x[:-1], self.min_y[:-1], self.max_x[:-1], self.max_y[:-1]
+            self._pending_x = np.concatenate((extremes_x, self._pending_x))
+            self._pending_y = np.concatenate((extremes_y, self._pending_y))
+            self._pending_count += self.bucket_size
+        if len(self.min_x):
+            keep_second = self.min_y[1::2] < self.min_y[::2]
+            self.min_x, self.min_y = self._merge_pairs(self.min_x, self.min_y, keep_second)
+            keep_second = self.max_y[1::2] > self.max_y[::2]
+            self.max_x, self.max_y = self._merge_pairs(self.max_x, self.max_y, keep_second)
+        self.bucket_size *= 2
+
+    @staticmethod
+    def _merge_pairs(x, y, keep_second):
+        """Keep one point of each pair of buckets."""
+        index = np.arange(0, len(x), 2) + keep_second
+        return x[index], y[index]
+
+    def points(self):
+        """
+        Get the decimated series.
+
+        Returns:
+            tuple: (x, y) arrays in x order.
+        """
+        pending = [np.argmin(self._pending_y), np.argmax(self._pending_y)] if len(self._pending_y) else []
+        x = np.concatenate((self.min_x, self.max_x, self._pending_x[pending]))
+        y = np.concatenate((self.min_y, self.max_y, self._pending_y[pending]))
+        x, index = np.unique(x, return_index=True)  # Sorted, a point both min and max is kept once
+        return x, y[index]
+
+class MovingAverage:
+    def __init__(self, window_size):
+        """
+        Compute a moving average chunk by chunk, without keeping the whole series.
+
+        Args:
+            window_size (int): Number of points averaged.
+        """
+        self.window_size = window_size
+        self._tail = np.zeros(0)  # Last window_size - 1 values seen
+
+    def extend(self, values):
+        """
+        Add values and get the averages of the windows that end on them.
+
+        Returns:
+            np.ndarray: One average per complete window ending in the new values.
+        """
+        values = np.concatenate((self._tail, np.asarray(values, dtype=np.float64)))
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        averages = (cumulative[self.window_size:] - cumulative[:-self.window_size]) / self.window_size
+        self._tail = values[max(len(values) - self.window_size + 1, 0):]
+        return averages
 
 class Grapher:
-    def __init__(self, log_file=None):
+    def __init__(self, log_file=None, max_points=4000, chunk_size=1 << 20, window_size=None):
         """
         Initialize the Grapher with the path to the log file.
-        
+
+        The log is read chunk by chunk (metrics logs are memory-mapped), the moving
+        average is computed incrementally and the plotted series are decimated to at most
+        `max_points` points, so plotting time does not grow with the size of the log.
+
         Args:
-            log_file (str): Path to the log file containing episode scores.
+            log_file (str): Path to the metrics log (or a plain-text score log of earlier versions).
+            max_points (int): Maximum number of points plotted per series.
+            chunk_size (int): Episodes processed at a time.
+            window_size (int): Moving average window. Defaults to min(100, episodes / 20)
+                at the first read, then stays fixed.
         """
         self.log_file = log_file
-        self.episodes = []  # List to store episode numbers
-        self.scores = []    # List to store scores
+        self.max_points = max_points
+        self.chunk_size = chunk_size
+        self.window_size = window_size
+        self.num_episodes = 0  # Episodes read so far
+        self.min_score = np.inf
+        self.max_score = -np.inf
+        self.last_scores = np.zeros(0)  # Last 100 scores, for the statistics box
+        self.scores = MinMaxDecimator(max_points // 2)
+        self.moving_average = None  # MovingAverage, created with the window size at the first read
+        self.average_scores = MinMaxDecimator(max_points // 2)
+        self.exploration_rates = MinMaxDecimator(max_points // 2)
+        self.last_steps = np.zeros(0)  # Steps of the last 100 episodes
 
     def read_log(self):
         """
-        Read the log file and extract episode numbers and scores.
-        Each line in the log file is expected to contain a single score.
+        Read the episodes added to the log file since the last read.
+
+        Returns:
+            int: Number of new episodes.
         """
-        if self.log_file:
-            with open(self.log_file, "r") as f:
-                for line in f:
-                    score = float(line.strip())
-                    self.scores.append(score)
-                    self.episodes.append(len(self.scores))  # Episode number is the index in the list
+        if not self.log_file:
+            return 0
+        records = read_metrics(self.log_file, start=self.num_episodes, memory_map=True)
+        if self.moving_average is None and len(records):
+            if self.window_size is None:
+                self.window_size = max(1, min(100, len(records) // 20))  # Adjust window size based on data length
+            self.moving_average = MovingAverage(self.window_size)
+        for start in range(0, len(records), self.chunk_size):
+            chunk = records[start:start + self.chunk_size]
+            episodes = chunk["episode"].astype(np.float64)
+            scores = np.array(chunk["score"])  # Pages in only this chunk of a memory-mapped log
+            self.scores.extend(episodes, scores)
+            averages = self.moving_average.extend(scores)
+            self.average_scores.extend(episodes[len(episodes) - len(averages):], averages)
+            self.min_score = min(self.min_score, scores.min())
+            self.max_score = max(self.max_score, scores.max())
+            self.last_scores = np.concatenate((self.last_scores, scores))[-100:]
+            epsilons = np.array(chunk["epsilon"])
+            known = ~np.isnan(epsilons)  # Unknown in plain-text logs of earlier versions
+            self.exploration_rates.extend(episodes[known], epsilons[known])
+            self.last_steps = np.concatenate((self.last_steps, chunk["steps"][known]))[-100:]
+        self.num_episodes += len(records)
+        return len(records)
 
-    def plot_progress(self):
+    def plot_progress(self, follow=False, refresh_interval=2.0):
         """
         Plot the agent's progress (scores) over episodes with improved readability.
         This method creates a line plot of scores vs. episode numbers, including a moving average.
+
+        Args:
+            follow (bool): Keep the window open and add the episodes appended to the log
+                (e.g. by a running training session) every refresh_interval seconds.
+            refresh_interval (float): Seconds between reads of the log in follow mode.
         """
+        if not self.num_episodes:
+            self.read_log()
+
         fig, ax = plt.subplots(figsize=(12, 8))
 
         # Plot raw data with reduced opacity
-        ax.plot(self.episodes, self.scores, color='lightblue', alpha=0.3, label='Raw scores')
+        raw_line, = ax.plot([], [], color='lightblue', alpha=0.3, label='Raw scores')
 
-        # Calculate and plot moving average
-        window_size = min(100, len(self.scores) // 20)  # Adjust window size based on data length
-        moving_avg = np.convolve(self.scores, np.ones(window_size)/window_size, mode='valid')
-        ax.plot(self.episodes[window_size-1:], moving_avg, color='blue', label=f'Moving average (window: {window_size})')
+        # Plot moving average
+        average_line, = ax.plot([], [], color='blue', label=f'Moving average (window: {self.window_size})')
 
         # Add min and max score lines
-        min_score = min(self.scores)
-        max_score = max(self.scores)
-        ax.axhline(min_score, color='red', linestyle='--', label=f'Min score: {min_score:.2f}')
-        ax.axhline(max_score, color='green', linestyle='--', label=f'Max score: {max_score:.2f}')
+        min_line = ax.axhline(0, color='red', linestyle='--')
+        max_line = ax.axhline(0, color='green', linestyle='--')
         # ax.axhline(0, color='gray', linestyle=':', label='Score 0')
 
         # Improve labels
         ax.set_xlabel("Episode Number", fontsize=12)
         ax.set_ylabel("Score", fontsize=12)
 
-        # Adjust x-axis ticks and remove whitespace
-        num_ticks = 10
-        step = max(1, len(self.episodes) // num_ticks)
-        ax.set_xticks(range(0, len(self.episodes) + 1, step))
-        ax.set_xlim(0, len(self.episodes))
-
         # Add grid for better readability
         ax.grid(True, linestyle=':', alpha=0.6)
 
-        # Add legend
-        ax.legend(loc='upper left', fontsize=10)
-
         # Add text box with statistics
-        stats_text = f"Total Episodes: {len(self.episodes)}\n"
-        stats_text += f"Avg Score (last 100): {np.mean(self.scores[-100:]):.2f}"
-        ax.text(0.02, 0.02, stats_text, transform=ax.transAxes, 
-                bbox=dict(facecolor='white', alpha=0.8), fontsize=10, 
-                verticalalignment='bottom')
+        stats_box = ax.text(0.02, 0.02, "", transform=ax.transAxes,
+                            bbox=dict(facecolor='white', alpha=0.8), fontsize=10,
+                            verticalalignment='bottom')
 
         # Remove title from plot and set as figure name
         fig.canvas.manager.set_window_title('Agent Progress: Score over Episodes')
 
+        def update_plot():
+            raw_line.set_data(*self.scores.points())
+            average_line.set_data(*self.average_scores.points())
+            min_line.set_ydata([self.min_score] * 2)
+            min_line.set_label(f'Min score: {self.min_score:.2f}')
+            max_line.set_ydata([self.max_score] * 2)
+            max_line.set_label(f'Max score: {self.max_score:.2f}')
+
+            # Adjust x-axis ticks and remove whitespace
+            num_ticks = 10
+            step = max(1, self.num_episodes // num_ticks)
+            ax.set_xticks(range(0, self.num_episodes + 1, step))
+            ax.set_xlim(0, max(self.num_episodes, 1))
+            ax.relim()
+            ax.autoscale_view(scalex=False)
+
+            # Add legend
+            ax.legend(loc='upper left', fontsize=10)
+
+            stats_text = f"Total Episodes: {self.num_episodes}\n"
+            stats_text += f"Avg Score (last 100): {np.mean(self.last_scores) if len(self.last_scores) else 0:.2f}"
+            stats_box.set_text(stats_text)
+
+        update_plot()
         plt.tight_layout()
-        plt.show()
+        if not follow:
+            plt.show()
+            return
+
+        # Follow mode: only the records appended since the last read are loaded
+        plt.show(block=False)
+        while plt.fignum_exists(fig.number):
+            plt.pause(refresh_interval)
+            if self.read_log():
+                update_plot()
+                fig.canvas.draw_idle()
 
-    def plot_exploration_rate_decay(self, target_epsilon, exploration_decay, initial_rate=1.0, extension_factor=1.2):
+    def plot_exploration_rate_decay(self, scheduler, steps_per_episode=None, extension_factor=1.2):
         """
-        Plot the exploration rate decay over iterations.
-        
+        Plot the exploration rate logged for every episode and the rest of the schedule.
+
         Args:
-            target_epsilon (float): The target exploration rate.
-            exploration_decay (float): The decay rate for the exploration.
-            initial_rate (float): The initial exploration rate (default: 1.0).
-            extension_factor (float): Factor to extend the plot beyond the target (default: 1.2).
+            scheduler (ExplorationScheduler): The schedule, restored from the saved model so
+                the projection starts where training stopped.
+            steps_per_episode (float): Learning steps per episode, to draw a per-step
+                schedule over episodes. Defaults to the mean of the last 100 logged episodes.
+            extension_factor (float): Factor to extend the plot beyond the logged episodes
+                or the end of the decay, whichever comes last.
         """
         # Read log file if not already done
-        if not self.episodes:
+        if not self.num_episodes:
             self.read_log()
-        
-        total_episodes = len(self.episodes)
-
-        def calculate_iterations(target_rate):
-            """Calculate the number of iterations to reach the target rate."""
-            if target_rate >= initial_rate:
-                return 0
-            if target_rate <= 0:
-                return float('inf')
-            return np.ceil(np.log(target_rate / initial_rate) / np.log(exploration_decay))
-
-        # Calculate iterations to target and extend
-        iterations_to_target = int(calculate_iterations(target_epsilon))
-        max_iterations = max(int(iterations_to_target * extension_factor), total_episodes)
-        
-        iterations = np.arange(max_iterations + 1)
-        exploration_rates = initial_rate * (exploration_decay ** iterations)
+        total_episodes = self.num_episodes
+        if steps_per_episode is None:
+            steps_per_episode = np.mean(self.last_steps) if len(self.last_steps) else 1
+        steps_per_episode = max(1, int(round(steps_per_episode)))
+        per_episode = 1 if scheduler.unit == "episode" else steps_per_episode
+
+        # Project the remaining schedule, one point per episode
+        episodes_to_min = int(np.ceil(scheduler.units_to_min() / per_episode))
+        future_episodes = max(int(max(total_episodes, episodes_to_min) * extension_factor) - total_episodes, 10)
+        future_rates = np.array(scheduler.preview(future_episodes * per_episode))[per_episode - 1::per_episode]
+        future_x = total_episodes + np.arange(1, len(future_rates) + 1)
 
-        # Create the plot
         plt.figure(figsize=(12, 6))
-        plt.plot(iterations, exploration_rates, label='Exploration Rate')
-        plt.axhline(y=target_epsilon, color='r', linestyle='--', label='Target Epsilon')
-        
+        logged_x, logged_rates = self.exploration_rates.points()
+        if len(logged_x):
+            plt.plot(logged_x, logged_rates, label='Logged exploration rate')
+        plt.plot(np.concatenate(([total_episodes], future_x)), np.concatenate(([scheduler.rate], future_rates)),
+                 linestyle='--', label=f'Schedule ({scheduler.schedule}, per {scheduler.unit})')
+        plt.axhline(y=scheduler.min_rate, color='r', linestyle=':', label='Minimum exploration rate')
+
         # Mark the total number of episodes from the log
         plt.axvline(x=total_episodes, color='g', linestyle='--', label='Total Episodes')
-        
-        plt.title(f'Exploration Rate Decay (Target: {target_epsilon}, Decay: {exploration_decay})')
-        plt.xlabel('Number of Iterations')
+
+        plt.title(f'Exploration Rate ({scheduler.schedule} schedule, current: {scheduler.rate:.3f})')
+        plt.xlabel('Episode Number')
         plt.ylabel('Exploration Rate')
         plt.legend()
         plt.grid(True)
-        
-        plt.yscale('linear')
-        plt.ylim(bottom=0, top=1.0)
-        plt.xlim(left=0, right=max_iterations)
-        
-        # Set Y-axis ticks
-        y_ticks = [0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
-        plt.yticks(y_ticks, [f'{tick:.1f}' for tick in y_ticks])
-        
-        # Adjust X-axis ticks
-        x_ticks = list(range(0, max_iterations + 1, max(1, max_iterations // 10)))
-        plt.xticks(x_ticks)
-        
-        # Add text with iteration count and total episodes
-        plt.text(0.05, 0.95, f'Iterations to reach target: {iterations_to_target}\nTotal episodes: {total_episodes}', 
+        plt.ylim(bottom=0, top=max(1.0, scheduler.initial_rate))
+        plt.xlim(left=0, right=future_x[-1])
+
+        # Add text with the episodes left until the minimum and the logged episodes
+        plt.text(0.05, 0.95, f'Episodes to reach the minimum: {episodes_to_min}\nTotal episodes: {total_episodes}',
                  transform=plt.gca().transAxes, bbox=dict(facecolor='white', alpha=0.8),
                  verticalalignment='top')
-        
+
         plt.tight_layout()
         plt.show()
 
@@ -1,15 +1,31 @@
 import os
+import sys
+import argparse
+
+# Add the parent directory to the path (for the logs package)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from grapher import Grapher
 
 def main():
+    parser = argparse.ArgumentParser(description="Plot the training scores.")
+    parser.add_argument("log_file", nargs="?", help="Log file (default: logs/q_learning/v1.metrics)")
+    parser.add_argument("--follow", action="store_true", help="Keep refreshing the plot while training writes to the log")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between refreshes with --follow")
+    args = parser.parse_args()
+
     # Get the absolute path of the "logs" directory
     parent_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    log_file = os.path.join(parent_directory, "logs/q_learning/v1.txt")
+    log_file = os.path.join(parent_directory, "logs/q_learning/v1.metrics")
+    if not os.path.exists(log_file):
+        log_file = os.path.join(parent_directory, "logs/q_learning/v1.txt")  # Log of an earlier version
+    if args.log_file:
+        log_file = args.log_file
     
     # Create a Grapher instance and plot progress
     grapher = Grapher(log_file)
     grapher.read_log()  # Read log data
-    grapher.plot_progress()  # Plot the data
+    grapher.plot_progress(follow=args.follow, refresh_interval=args.interval)  # Plot the data
 
 if __name__ == "__main__":
     main()
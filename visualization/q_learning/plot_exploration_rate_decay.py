@@ -1,5 +1,8 @@
 import sys
 import os
+import json
+import argparse
+import numpy as np
 
 # Add the grandparent directory to the path (for config.py)
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -9,17 +12,56 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from grapher import Grapher
-from config import QL_CONFIG
+from config import QL_CONFIG, DQN_CONFIG
+from machine_learning.exploration import ExplorationScheduler
+
+def read_exploration_state(directory, agent, name):
+    """
+    Read the exploration schedule state saved with a model, without touching the model files.
+
+    Args:
+        directory (str): Project root.
+        agent (str): "q_learning" (state in the Q-table metadata) or "dqn" (state in the .npz weights).
+        name (str): Name of the Q-table or of the network weights.
+
+    Returns:
+        dict: The saved state (see ExplorationScheduler.state_dict), None if the model or its state is missing.
+    """
+    if agent == "q_learning":
+        path = os.path.join(directory, "machine_learning", "q_learning", "q_tables", f"{name}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f).get("exploration")
+    path = os.path.join(directory, "machine_learning", "dqn", "models", f"{name}.npz")
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as model:
+        return json.loads(str(model["exploration"])) if "exploration" in model else None
 
 def main():
+    parser = argparse.ArgumentParser(description="Plot the logged exploration rate and the rest of the configured schedule.")
+    parser.add_argument("name", nargs="?", help="Q-table or network weights name (default: Q_TABLE_FILENAME or MODEL_FILENAME)")
+    parser.add_argument("--agent", choices=("q_learning", "dqn"), default="q_learning", help="Agent of the model (default: q_learning)")
+    args = parser.parse_args()
+    config = QL_CONFIG if args.agent == "q_learning" else DQN_CONFIG
+    name = args.name or (config["Q_TABLE_FILENAME"] if args.agent == "q_learning" else config["MODEL_FILENAME"])
+
     # Get the absolute path of the "logs" directory
     grandparent_directory = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    log_file = os.path.join(grandparent_directory, "logs/q_learning/v1.txt")
+    log_file = os.path.join(grandparent_directory, f"logs/{args.agent}/{name}.metrics")
+    if not os.path.exists(log_file):
+        log_file = os.path.join(grandparent_directory, f"logs/{args.agent}/{name}.txt")  # Log of an earlier version
+
+    # The schedule continues from the state saved with the model
+    scheduler = ExplorationScheduler.from_config(config)
+    state = read_exploration_state(grandparent_directory, args.agent, name)
+    if state is not None:
+        scheduler.load_state(state)
 
     # Initialize the grapher with the correct log file
     grapher = Grapher(log_file)
-    target_epsilon = QL_CONFIG["MIN_EXPLORATION_RATE"]
-    grapher.plot_exploration_rate_decay(target_epsilon, QL_CONFIG["EXPLORATION_DECAY"])
+    grapher.plot_exploration_rate_decay(scheduler)
 
 if __name__ == "__main__":
     main()
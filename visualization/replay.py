@@ -0,0 +1,145 @@
+import os
+import sys
+import time
+import argparse
+import pygame
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.environment import Environment
+from models.vehicle import Vehicle
+from logs.trajectory import TrajectoryLog
+
+class Replay:
+    def __init__(self, trajectory_file, headless=True):
+        """
+        Rebuild recorded episodes by feeding the recorded actions back through the Vehicle physics.
+
+        Args:
+            trajectory_file (str): Trajectory file written by TrajectoryRecorder.
+            headless (bool): Use SDL's dummy drivers (frames can still be saved to images).
+        """
+        self.log = TrajectoryLog(trajectory_file)
+        # Preload the recorded circuits (logs without circuit ran on the default one)
+        self.environment = Environment(headless=headless, circuits=[circuit for circuit in self.log.circuits if circuit] or None)
+        self.vehicle = Vehicle(self.environment)
+
+    def steps(self, episode):
+        """
+        Replay one episode, yielding the vehicle after every step.
+
+        Args:
+            episode (int): Index of the episode.
+
+        Yields:
+            tuple: (step, reward) with the vehicle (self.vehicle) updated to that step.
+        """
+        data = self.log.episode(episode)
+        self.environment.reset(data["circuit"])
+        self.vehicle.reset()
+        self.vehicle.x, self.vehicle.y, self.vehicle.angle, self.vehicle.speed, self.vehicle.max_speed = data["start_state"]
+        for step, action in enumerate(data["actions"].tolist()):
+            _, reward, _ = self.vehicle.step(action)
+            yield step, reward
+
+    def verify(self, episode):
+        """
+        Replay an episode headlessly and compare it with the recording.
+
+        Returns:
+            int: Index of the first step whose reward or score differs, -1 if the replay matches.
+        """
+        data = self.log.episode(episode)
+        for step, reward in self.steps(episode):
+            if round(reward, 1) != data["rewards"][step] or self.vehicle.score != data["scores"][step]:
+                return step
+        return -1
+
+    def render_frames(self, episode, frames, output_directory):
+        """
+        Replay an episode and save the requested frames as PNG images.
+
+        Args:
+            episode (int): Index of the episode.
+            frames (list): Steps to render.
+            output_directory (str): Directory of the images.
+
+        Returns:
+            list: Paths of the saved images.
+        """
+        self.environment.init_display()
+        os.makedirs(output_directory, exist_ok=True)
+        frames = set(frames)
+        num_steps = len(self.log.episode(episode)["actions"])
+        paths = []
+        for step, _ in self.steps(episode):
+            if step in frames:
+                self.environment.invalidate_display()  # Frames are not consecutive, draw everything
+                self.environment.render_frame(self.vehicle, (num_steps - step - 1) / self.vehicle.clock.fps)
+                path = os.path.join(output_directory, f"episode_{episode}_step_{step}.png")
+                pygame.image.save(self.environment.window, path)
+                paths.append(path)
+        return paths
+
+    def show(self, episode, speed=1.0):
+        """
+        Play an episode in the window.
+
+        Args:
+            episode (int): Index of the episode.
+            speed (float): Playback speed relative to the recorded FPS.
+        """
+        self.environment.init_display()
+        clock = pygame.time.Clock()
+        fps = self.log.metadata.get("fps", 60) * speed
+        num_steps = len(self.log.episode(episode)["actions"])
+        self.environment.invalidate_display()
+        for step, _ in self.steps(episode):
+            clock.tick(fps)
+            if any(event.type == pygame.QUIT for event in pygame.event.get()):
+                return
+            self.environment.render_frame(self.vehicle, (num_steps - step - 1) / self.vehicle.clock.fps)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded episodes (see RECORD_TRAJECTORIES in config.py).")
+    parser.add_argument("trajectory_file", help="Trajectory .npz file in logs/trajectories")
+    parser.add_argument("--episode", type=int, help="Episode to replay (default: verify every episode)")
+    parser.add_argument("--frames", help="Comma-separated steps of --episode to save as PNG images")
+    parser.add_argument("--output", default="replay_frames", help="Directory of the saved frames")
+    parser.add_argument("--show", action="store_true", help="Play --episode in a window")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed of --show")
+    args = parser.parse_args()
+
+    replay = Replay(args.trajectory_file, headless=not args.show)
+    if args.show or args.frames:
+        if args.episode is None:
+            parser.error("--show and --frames need --episode")
+        if args.frames:
+            frames = [int(frame) for frame in args.frames.split(",")]
+            for path in replay.render_frames(args.episode, frames, args.output):
+                print(f"Saved {path}")
+        if args.show:
+            replay.show(args.episode, args.speed)
+        pygame.quit()
+        return
+
+    # Full-speed headless replay, checking that the physics still reproduces the recording
+    episodes = range(len(replay.log)) if args.episode is None else [args.episode]
+    start_time = time.perf_counter()
+    total_steps = 0
+    mismatches = 0
+    for episode in episodes:
+        first_difference = replay.verify(episode)
+        total_steps += len(replay.log.episode(episode)["actions"])
+        if first_difference >= 0:
+            mismatches += 1
+            print(f"Episode {episode}: replay differs from the recording at step {first_difference}")
+    elapsed = time.perf_counter() - start_time
+    print(f"Replayed {len(episodes)} episodes ({total_steps} steps) in {elapsed:.2f}s "
+          f"({total_steps / max(elapsed, 1e-9):.0f} steps/sec), {mismatches} differ from the recording")
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()